@@ -0,0 +1,340 @@
+"""
+Headless HTTP/JSON API for the travel tools, for machine clients.
+
+Every tool is one endpoint. The request body is a JSON object with the
+tool's arguments, and the answer is the tool's result:
+
+    POST /flight         flight_search_tool      {"source", "destination", "preference", "departure_date", "flexibility_days"}
+    POST /hotel          hotel_search_tool       {"city", "price", "rating", "preference", "amenities"}
+    POST /weather        weather_lookup_tool     {"city", "start_date", "end_date"}
+    POST /places         location_search_tool    {"city", "category", "max_days"}
+    POST /budget         budget_estimation_tool  {"flight_price", "hotel_price_per_night", "number_of_days"}
+    POST /fare_calendar  fare_calendar_tool      {"source", "destination", "month"}
+
+    POST /batch    {"calls": [{"tool": "flight", "args": {...}}, ...]}
+                   -> {"results": [{"status": 200, "result": ...} | {"status": 400, "error": ...}, ...]}
+                   Many calls in one round trip. The weather calls of a batch with the
+                   same dates are answered with one multi-city forecast request.
+    GET  /healthz  {"status": "ok", ...} once the indexes are loaded, 503 if a data file cannot be read
+    GET  /metrics  the telemetry counters and span histograms in the Prometheus text format
+
+Arguments are checked against the tool's schema (400 with the reason if they
+do not fit), then the tool function is called directly, which skips the
+LangChain callback layer.
+
+The indexes are loaded once, before the worker processes are forked, so the
+workers share them. Each worker serves the one listening socket with a thread
+per connection (HTTP/1.1 keep-alive). Deltas are applied by every worker as
+they arrive, and the parent process compacts them now and then, like the app.
+/metrics and /healthz describe the worker that answers.
+
+With --stub-weather, weather comes from a local stub of the Open-Meteo APIs
+(see weather_stub.py), so the service runs without network access.
+
+Usage:
+    python api.py [--host HOST] [--port PORT] [--workers N] [--stub-weather]
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pydantic import ValidationError
+
+import telemetry
+import weather
+from budget import budget_estimation_tool
+from deltas import compact_periodically
+from flight import fare_calendar_tool, flight_search_tool, get_flight_index
+from hotels import get_hotel_index, hotel_search_tool
+from places import get_place_index, location_search_tool
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_CALLS = 1000
+LISTEN_BACKLOG = 1024 # connections waiting for accept(); the http.server default of 5 drops connections under load
+
+# endpoint -> tool
+TOOLS = {
+    "flight": flight_search_tool,
+    "hotel": hotel_search_tool,
+    "weather": weather.weather_lookup_tool,
+    "places": location_search_tool,
+    "budget": budget_estimation_tool,
+    "fare_calendar": fare_calendar_tool
+}
+
+
+class ApiError(Exception): # Answered with its status and message instead of a result
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_indexes(): # This loads the three indexes (or, once loaded, reloads a changed file and applies new deltas)
+    return [get_flight_index(), get_hotel_index(), get_place_index()]
+
+
+# ----------------------------------
+# Calling the tools
+# ----------------------------------
+def tool_arguments(name, args): # This checks the arguments of a tool call against the tool's schema
+    if name not in TOOLS:
+        raise ApiError(404, f"unknown tool {name!r}, expected one of {sorted(TOOLS)}")
+    if not isinstance(args, dict):
+        raise ApiError(400, "the arguments must be a JSON object")
+    try:
+        return TOOLS[name].args_schema.model_validate(args).model_dump()
+    except ValidationError as error:
+        problems = "; ".join(f"{'.'.join(map(str, problem['loc']))}: {problem['msg']}" for problem in error.errors())
+        raise ApiError(400, f"invalid arguments for {name}: {problems}") from error
+
+
+def call_tool(name, args):
+    """
+    Calls one tool with checked arguments.
+
+    Args:
+        name (str): Endpoint name, a key of TOOLS
+        args (dict): The tool arguments, as sent by the client
+
+    Returns:
+        dict | list: The tool result
+
+    Raises:
+        ApiError: 404 for an unknown tool, 400 for arguments that do not fit its schema
+    """
+    arguments = tool_arguments(name, args)
+    return TOOLS[name].func(**arguments)
+
+
+def _call_or_error(name, args): # One entry of a batch answer
+    try:
+        return {"status": 200, "result": call_tool(name, args)}
+    except ApiError as error:
+        return {"status": error.status, "error": str(error)}
+
+
+def call_batch(calls):
+    """
+    Calls many tools for one request, in order.
+
+    The weather calls with the same start and end date are answered together,
+    with one multi-city forecast request instead of one per city.
+
+    Args:
+        calls (list): {"tool": endpoint name, "args": dict}
+
+    Returns:
+        list: {"status": 200, "result"} or {"status", "error"} for every call, in order
+    """
+    if not isinstance(calls, list) or len(calls) > MAX_BATCH_CALLS:
+        raise ApiError(400, f"calls must be a list of at most {MAX_BATCH_CALLS} tool calls")
+    results = [None] * len(calls)
+    weather_groups = {} # (start_date, end_date) -> [(position, city)]
+    for position, call in enumerate(calls):
+        if not isinstance(call, dict):
+            results[position] = {"status": 400, "error": "a call must be a JSON object"}
+        elif call.get("tool") == "weather":
+            try:
+                args = tool_arguments("weather", call.get("args", {}))
+            except ApiError as error:
+                results[position] = {"status": error.status, "error": str(error)}
+                continue
+            weather_groups.setdefault((args["start_date"], args["end_date"]), []).append((position, args["city"]))
+        else:
+            results[position] = _call_or_error(call.get("tool"), call.get("args", {}))
+
+    for (start_date, end_date), group in weather_groups.items():
+        try:
+            forecasts = weather.lookup_weather_for_cities([city for _, city in group], start_date, end_date)
+            answers = [{"status": 200, "result": forecasts[city]} for _, city in group]
+        except ValueError as error: # e.g. dates that are not YYYY-MM-DD; only this group's calls fail
+            answers = [{"status": 400, "error": f"invalid arguments for weather: {error}"}] * len(group)
+        except Exception as error: # the other calls of the batch keep their results
+            answers = [{"status": 502, "error": f"weather lookup failed: {type(error).__name__}: {error}"}] * len(group)
+        for (position, _), answer in zip(group, answers):
+            results[position] = answer
+    return results
+
+
+def health(): # This returns the health answer, or raises ApiError(503) if a data file cannot be read
+    try:
+        load_indexes()
+    except (OSError, ValueError) as error:
+        raise ApiError(503, f"the indexes cannot be loaded: {error}") from error
+    return {"status": "ok", "pid": os.getpid()}
+
+
+# ----------------------------------
+# HTTP server
+# ----------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, so a client sends many requests over one connection
+    server_version = "TravelPlannerAPI"
+    disable_nagle_algorithm = True # headers and body are two writes; with Nagle the body waits for the client's delayed ACK (~40 ms)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            return self._answer("healthz", health)
+        if self.path == "/metrics":
+            return self._send(200, telemetry.prometheus_text().encode(), "text/plain; version=0.0.4")
+        self._answer("unknown", lambda: self._unknown_path())
+
+    def do_POST(self):
+        endpoint = self.path.strip("/")
+        if endpoint == "batch":
+            return self._answer("batch", lambda: {"results": call_batch(self._read_calls())})
+        if endpoint in TOOLS:
+            return self._answer(endpoint, lambda: call_tool(endpoint, self._read_json()))
+        self._answer("unknown", lambda: self._unknown_path())
+
+    def _unknown_path(self):
+        self.close_connection = True # a POST body we did not read would be taken for the next request
+        raise ApiError(404, f"no endpoint {self.command} {self.path}")
+
+    def _read_calls(self):
+        body = self._read_json()
+        return body.get("calls") if isinstance(body, dict) else None
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True # we cannot tell where the body ends
+            raise ApiError(400, "the Content-Length header must be a non-negative number")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True # the body is not read, so the connection cannot be reused
+            raise ApiError(413, f"the body is larger than {MAX_BODY_BYTES} bytes")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError as error:
+            raise ApiError(400, f"the body is not valid JSON: {error}") from error
+
+    def _answer(self, endpoint, compute): # This computes an answer, and records its time and status
+        with telemetry.span("api_request", endpoint=endpoint) as span:
+            try:
+                status, body = 200, compute()
+            except ApiError as error:
+                status, body = error.status, {"error": str(error)}
+            except Exception as error: # a failing tool answers 500, the worker keeps serving
+                status, body = 500, {"error": f"{type(error).__name__}: {error}"}
+            span.set("status", status)
+        telemetry.count("api_requests", endpoint=endpoint, status=status)
+        self._send(status, json.dumps(body).encode(), "application/json")
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args): # one log line per request would cost more than most answers
+        pass
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, host=HOST, port=PORT):
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def use_stub_weather(): # This starts a local weather stub and points the weather module at it, with a geocoding cache in memory
+    from weather_stub import start_stub_server
+
+    stub = start_stub_server()
+    weather.GEOCODING_URL = stub.geocoding_url
+    weather.FORECAST_URL = stub.forecast_url
+    weather.geocode_cache = weather.GeocodeCache(":memory:") # the made-up coordinates must not end up in geocode_cache.sqlite
+    return stub
+
+
+def _serve_worker(server): # The loop of one forked worker; it never returns into the parent's code
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C reaches the whole process group; the parent stops the workers
+    try:
+        server.serve_forever()
+    finally:
+        os._exit(0)
+
+
+def serve(host=HOST, port=PORT, workers=1, stub_weather=False):
+    """
+    Loads the indexes and serves the API until interrupted.
+
+    Args:
+        host (str): Interface to listen on
+        port (int): Port to listen on (0 picks a free one)
+        workers (int): Worker processes; more than one needs os.fork (Linux, macOS)
+        stub_weather (bool): Answer weather from a local stub instead of Open-Meteo
+    """
+    if stub_weather:
+        use_stub_weather()
+    telemetry.enable()
+    indexes = load_indexes() # before the fork, so the workers share the loaded pages
+    server = ApiServer(host, port)
+    if workers > 1 and not hasattr(os, "fork"):
+        print("this platform cannot fork, serving with one process", file=sys.stderr)
+        workers = 1
+    print(f"serving {server.url} with {workers} worker(s)", file=sys.stderr, flush=True)
+
+    if workers == 1:
+        compact_periodically(indexes)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _serve_worker(server)
+        children.append(pid)
+    # started after the fork: a thread running at fork time could leave a lock held in the workers
+    compact_periodically(indexes)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while children:
+            pid, _ = os.wait()
+            children.remove(pid)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children:
+            os.waitpid(pid, 0)
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--stub-weather", action="store_true", help="serve weather from a local Open-Meteo stub")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.stub_weather)
+
+
+if __name__ == "__main__":
+    main()
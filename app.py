@@ -7,16 +7,22 @@ import streamlit as st
 # Import date utilities to handle travel dates
 # ----------------------------------
 from datetime import date, timedelta
+from functools import wraps
+import json
+import time
 
 # ----------------------------------
 # Import all tools and data loaders
 # These come from the modular tool files
 # ----------------------------------
-from flight import load_flights, flight_search_tool
-from hotels import load_hotels, hotel_search_tool
-from places import load_places
-from weather import weather_lookup_tool
+from datastore import data_version
+from deltas import compact_periodically
+from flight import get_flight_index, flight_search_tool
+from hotels import get_hotel_index, hotel_search_tool
+from places import get_place_index, plan_city_itinerary
+from weather import UNAVAILABLE_MESSAGE, WeatherServiceError, weather_lookup_tool
 from budget import budget_estimation_tool
+import telemetry
 
 # ----------------------------------
 # Streamlit Page Configuration
@@ -27,20 +33,46 @@ st.set_page_config(page_title="Flight Planner", page_icon="✈️")
 # Main title shown on the page
 st.title("✈️ Flight Planner")
 
+# When this (full) rerun started, for the rerun-timing readout
+run_started = time.perf_counter()
+
 # ----------------------------------
 # Load all static data from JSON files
-# This avoids reloading files repeatedly
+# The catalog is built once per process and shared by every session.
+# It is keyed by the files' modification times, so an updated file
+# builds a new catalog on the next rerun.
+# ----------------------------------
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_catalog(version):
+    flight_index = get_flight_index()
+    get_place_index() # builds the ranked places once, before the first itinerary needs them
+    return {
+        "sources": flight_index.sources,
+        "destinations": flight_index.destinations,
+        "destinations_by_source": flight_index.destinations_by_source
+    }
+
+
+catalog = load_catalog(data_version("flights.json", "places.json"))
+
+# ----------------------------------
+# Fare and availability feeds append deltas to the data files,
+# which the indexes apply as they arrive. One background thread
+# per process folds them back into the files now and then.
 # ----------------------------------
-flights = load_flights()
-hotels = load_hotels()
-places = load_places()
+@st.cache_resource(show_spinner=False)
+def start_compaction():
+    return compact_periodically([get_flight_index(), get_hotel_index(), get_place_index()])
+
+
+start_compaction()
 
 # ----------------------------------
-# Extract unique source and destination cities
+# Source and destination cities
 # Used to populate dropdowns
 # ----------------------------------
-sources = sorted(set(f["from"] for f in flights))
-destinations = sorted(set(f["to"] for f in flights))
+sources = catalog["sources"]
+destinations = catalog["destinations"]
 
 # ----------------------------------
 # Initialize Streamlit Session State
@@ -52,11 +84,16 @@ defaults = {
     "weather_result": None,
     "budget_result": None,
     "final_destination": None,
+    "start_date": None, # the chosen departure date; the trip starts today without one
+    "flight_message": None,
+    "connections_to": None,
     "recommended": [],
     "recommended_prices": [],
+    "connections": [],
     "show_recommendation": False,
     "show_hotel_recommendation": False,
-    "days": 3
+    "days": 3,
+    "rerun_times": []
 }
 
 # Populate session state with default values if missing
@@ -65,94 +102,207 @@ for k, v in defaults.items():
         st.session_state[k] = v
 
 # ----------------------------------
-# Helper Function:
-# Suggest alternative destinations if no direct flights exist
+# Rerun timing
+# Every section below is a fragment: a widget inside it reruns only that
+# section, not the whole script. Each rerun of a section (and of the whole
+# page) records its server time, shown under the section and in the
+# sidebar. Section reruns are also "app_rerun" spans when telemetry is on.
 # ----------------------------------
-def recommend_destinations(flights, source):
-    return sorted(set(
-        f["to"] for f in flights
-        if f["from"].lower() == source.lower()
-    ))
+RERUN_HISTORY = 20 # reruns kept per session for the sidebar readout
+
+
+def record_rerun(section, started): # This stores how long a rerun took, and returns it in milliseconds
+    ms = (time.perf_counter() - started) * 1000
+    history = st.session_state.rerun_times
+    history.append({"section": section, "ms": round(ms, 1), "at": time.strftime("%H:%M:%S")})
+    del history[:-RERUN_HISTORY]
+    return ms
+
+
+def timed_fragment(section): # Decorator: turns a function into a fragment whose reruns are timed
+    def decorate(function):
+        @st.fragment
+        @wraps(function)
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            with telemetry.span("app_rerun", section=section):
+                function(*args, **kwargs)
+            st.caption(f"⏱️ {section} section: {record_rerun(section, started):.1f} ms")
+        return run
+    return decorate
 
 # ----------------------------------
-# Helper Function:
-# Suggest hotel prices if chosen budget has no hotels
+# Memoized section inputs
+# Shared by all sessions of the process, so changing an unrelated widget,
+# or a second user asking for the same city, does not compute them again.
 # ----------------------------------
-def recommend_hotel_prices(hotels, city):
-    return sorted(set(
-        int(h["price_per_night"])
-        for h in hotels
-        if h["city"].lower() == city.lower()
-    ))
+WEATHER_CACHE_SECONDS = 30 * 60 # like the forecast cache of weather.py
+
+
+@st.cache_data(show_spinner=False, ttl=WEATHER_CACHE_SECONDS, max_entries=512)
+def cached_weather(city, start_date, end_date):
+    result = weather_lookup_tool.run({"city": city, "start_date": start_date, "end_date": end_date})
+    if result == UNAVAILABLE_MESSAGE:
+        raise WeatherServiceError(result["message"]) # not cached, so the next rerun asks again
+    return result
+
+
+def load_weather(city, start_date, end_date): # The forecast list, or a dict with a message
+    try:
+        return cached_weather(city, start_date, end_date)
+    except WeatherServiceError:
+        return UNAVAILABLE_MESSAGE
+
+
+@st.cache_data(show_spinner=False, max_entries=512)
+def cached_itinerary(city, days, version): # version is the data_version of places.json, so changed places plan again
+    return plan_city_itinerary(city, days)
+
 
 # ----------------------------------
-# FLIGHT INPUT SECTION
-# User selects source, destination, and preference
+# Helper Function:
+# Suggest alternative destinations if no direct flights exist
 # ----------------------------------
-source = st.selectbox("Source City", sources)
-destination = st.selectbox("Destination City", destinations)
-preference = st.radio("Preference", ["fastest", "cheapest"])
+def recommend_destinations(source):
+    # Precomputed per source city in the catalog
+    return catalog["destinations_by_source"].get(source.strip().lower(), [])
 
 # ----------------------------------
-# FLIGHT SEARCH BUTTON
-# Calls flight search tool when clicked
+# Helper Function:
+# Suggest hotel prices if chosen budget has no hotels
 # ----------------------------------
-if st.button("Search Flight"):
-    result = flight_search_tool.run({
-        "source": source,
-        "destination": destination,
-        "preference": preference
-    })
+def recommend_hotel_prices(city, amenities=None):
+    # The hotel index keeps every city sorted by price already
+    return get_hotel_index().prices(city, amenities)
+
+# ----------------------------------
+# FLIGHT SECTION
+# User selects source, destination, and preference, searches a flight,
+# and picks a connection or another destination if there is no direct one.
+# A new flight changes what the other sections show, so it reruns the page.
+# ----------------------------------
+@timed_fragment("flight")
+def flight_section():
+    source = st.selectbox("Source City", sources)
+    destination = st.selectbox("Destination City", destinations)
+    preference = st.radio("Preference", ["fastest", "cheapest"])
+
+    # Optional travel date; empty means any departure date
+    departure_date = st.date_input("Departure date (optional)", value=None)
+    flexibility_days = st.number_input("Flexible by ± days", 0, 30, 0)
+    travel_dates = {
+        "departure_date": departure_date.isoformat() if departure_date else None,
+        "flexibility_days": flexibility_days
+    }
+
+    # FLIGHT SEARCH BUTTON
+    # Calls flight search tool when clicked
+    if st.button("Search Flight"):
+        result = flight_search_tool.run({
+            "source": source,
+            "destination": destination,
+            "preference": preference,
+            **travel_dates
+        })
+
+        # If flight is found, store result in session
+        if "flight" in result:
+            st.session_state.flight_result = result
+            st.session_state.final_destination = destination
+            st.session_state.start_date = departure_date
+            st.session_state.show_recommendation = False
+            st.rerun()
 
-    # If flight is found, store result in session
-    if "flight" in result:
-        st.session_state.flight_result = result
-        st.session_state.final_destination = destination
-        st.session_state.show_recommendation = False
-    else:
-        # If no flight found, recommend other destinations
+        # If no flight found, offer connecting itineraries and recommend other destinations
+        had_flight = st.session_state.flight_result is not None
         st.session_state.flight_result = None
-        st.session_state.recommended = recommend_destinations(flights, source)
+        st.session_state.flight_message = result["message"]
+        st.session_state.connections = result.get("connections", [])
+        st.session_state.connections_to = destination
+        st.session_state.recommended = recommend_destinations(source)
         st.session_state.show_recommendation = True
+        if had_flight: # the hotel and budget sections go away
+            st.rerun()
+
+    # FLIGHT RECOMMENDATION
+    # Shown only when no direct flights exist
+    if st.session_state.show_recommendation:
+        st.info(st.session_state.flight_message)
+        st.warning("No direct flights. Try these destinations:")
+
+        # Connecting itineraries found by the flight search tool
+        if st.session_state.connections:
+            labels = [
+                " → ".join([c["legs"][0]["from"]] + [leg["to"] for leg in c["legs"]])
+                + f" (₹{c['total_price']}, {c['stops']} stop{'' if c['stops'] == 1 else 's'})"
+                for c in st.session_state.connections
+            ]
+            choice = st.selectbox(
+                "Connecting Itinerary",
+                range(len(labels)),
+                format_func=lambda i: labels[i]
+            )
 
-# ----------------------------------
-# FLIGHT RECOMMENDATION SECTION
-# Shown only when no direct flights exist
-# ----------------------------------
-if st.session_state.show_recommendation:
-    st.warning("No direct flights. Try these destinations:")
+            if st.button("Book Connecting Itinerary"):
+                itinerary = st.session_state.connections[choice]
+
+                # Stored in the same shape as a direct flight, so the budget section can use it
+                st.session_state.flight_result = {
+                    "flight": {
+                        "airline": " + ".join(leg["airline"] for leg in itinerary["legs"]),
+                        "price": itinerary["total_price"],
+                        "duration_minutes": itinerary["total_duration_minutes"],
+                        "departure_time": itinerary["departure_time"]
+                    },
+                    "connection": itinerary,
+                    "message": f"Connecting itinerary from {source} to {st.session_state.connections_to}."
+                }
+                st.session_state.final_destination = st.session_state.connections_to
+                st.session_state.start_date = departure_date
+                st.session_state.show_recommendation = False
+                st.rerun()
+
+        rec_city = st.selectbox(
+            "Recommended Destination",
+            st.session_state.recommended
+        )
 
-    rec_city = st.selectbox(
-        "Recommended Destination",
-        st.session_state.recommended
-    )
+        if st.button("Search Recommended Flight"):
+            result = flight_search_tool.run({
+                "source": source,
+                "destination": rec_city,
+                "preference": preference,
+                **travel_dates
+            })
 
-    if st.button("Search Recommended Flight"):
-        result = flight_search_tool.run({
-            "source": source,
-            "destination": rec_city,
-            "preference": preference
-        })
+            # Like the main search: only a direct flight is stored, otherwise its message and connections are shown
+            if "flight" in result:
+                st.session_state.flight_result = result
+                st.session_state.final_destination = rec_city
+                st.session_state.start_date = departure_date
+                st.session_state.show_recommendation = False
+            else:
+                st.session_state.flight_message = result["message"]
+                st.session_state.connections = result.get("connections", [])
+                st.session_state.connections_to = rec_city
+            st.rerun()
 
-        st.session_state.flight_result = result
-        st.session_state.final_destination = rec_city
-        st.session_state.show_recommendation = False
+    # FLIGHT OUTPUT
+    # Displays selected flight details
+    if st.session_state.flight_result:
+        st.divider()
+        st.subheader("✈️ Flight Selected")
+        st.json(st.session_state.flight_result)
 
-# ----------------------------------
-# FLIGHT OUTPUT SECTION
-# Displays selected flight details
-# ----------------------------------
-if st.session_state.flight_result:
-    st.divider()
-    st.subheader("✈️ Flight Selected")
-    st.json(st.session_state.flight_result)
+
+flight_section()
 
 # ----------------------------------
-# HOTEL SEARCH SECTION
+# HOTEL SECTION
 # Activated only after flight selection
 # ----------------------------------
-if st.session_state.flight_result:
-
+@timed_fragment("hotel")
+def hotel_section():
     st.divider()
     st.subheader("🏨 Hotel Search")
 
@@ -162,12 +312,20 @@ if st.session_state.flight_result:
         1000, 8000, 3000, 500
     )
 
+    # User selects the amenities the hotel must have (all of them)
+    amenities = st.multiselect(
+        "Required amenities",
+        get_hotel_index().amenities,
+        key="amenities"
+    )
+
     if st.button("Search Hotels"):
         hotel = hotel_search_tool.run({
             "city": st.session_state.final_destination,
             "price": max_price,
             "rating": 1,
-            "preference": "cheapest"
+            "preference": "cheapest",
+            "amenities": amenities
         })
 
         # If hotel found, save it
@@ -178,45 +336,52 @@ if st.session_state.flight_result:
             # Else recommend price ranges
             st.session_state.hotel_result = None
             st.session_state.recommended_prices = recommend_hotel_prices(
-                hotels,
-                st.session_state.final_destination
+                st.session_state.final_destination,
+                amenities
             )
             st.session_state.show_hotel_recommendation = True
 
-# ----------------------------------
-# HOTEL PRICE RECOMMENDATION
-# ----------------------------------
-if st.session_state.show_hotel_recommendation:
-    st.warning("No hotels in this price range. Try these prices:")
+    # HOTEL PRICE RECOMMENDATION
+    if st.session_state.show_hotel_recommendation and not st.session_state.recommended_prices:
+        # Not even a higher price helps, so it is the amenities
+        st.warning("No hotels with all of these amenities. Try fewer amenities.")
 
-    price = st.selectbox(
-        "Recommended Hotel Price",
-        st.session_state.recommended_prices
-    )
+    elif st.session_state.show_hotel_recommendation:
+        st.warning("No hotels in this price range. Try these prices:")
 
-    if st.button("Search Hotel with Recommended Price"):
-        hotel = hotel_search_tool.run({
-            "city": st.session_state.final_destination,
-            "price": price,
-            "rating": 1,
-            "preference": "cheapest"
-        })
+        price = st.selectbox(
+            "Recommended Hotel Price",
+            st.session_state.recommended_prices
+        )
 
-        st.session_state.hotel_result = hotel
-        st.session_state.show_hotel_recommendation = False
+        if st.button("Search Hotel with Recommended Price"):
+            hotel = hotel_search_tool.run({
+                "city": st.session_state.final_destination,
+                "price": price,
+                "rating": 1,
+                "preference": "cheapest",
+                "amenities": st.session_state.get("amenities", [])
+            })
 
-# ----------------------------------
-# HOTEL OUTPUT SECTION
-# ----------------------------------
-if st.session_state.hotel_result:
-    st.subheader("🏨 Hotel Selected")
-    st.json(st.session_state.hotel_result)
+            st.session_state.hotel_result = hotel
+            st.session_state.show_hotel_recommendation = False
+
+    # HOTEL OUTPUT
+    if st.session_state.hotel_result:
+        st.subheader("🏨 Hotel Selected")
+        st.json(st.session_state.hotel_result)
+
+
+if st.session_state.flight_result:
+    hotel_section()
 
 # ----------------------------------
 # PLACES + WEATHER SECTION
+# The forecast and the itinerary are memoized per city and days,
+# so only a change of the number of days computes them again.
 # ----------------------------------
-if st.session_state.final_destination:
-
+@timed_fragment("weather and itinerary")
+def places_section():
     st.divider()
     city = st.session_state.final_destination
     st.subheader(f"📍 Exploring {city}")
@@ -228,54 +393,48 @@ if st.session_state.final_destination:
     )
     st.session_state.days = days
 
-    # Calculate start and end dates
-    start = date.today()
+    # Calculate start and end dates, from the chosen departure date
+    start = st.session_state.start_date or date.today()
     end = start + timedelta(days=days - 1)
 
     # Fetch weather data
-    weather = weather_lookup_tool.run({
-        "city": city,
-        "start_date": start.isoformat(),
-        "end_date": end.isoformat()
-    })
+    st.session_state.weather_result = load_weather(city, start.isoformat(), end.isoformat())
 
-    st.session_state.weather_result = weather
+    # WEATHER OUTPUT
+    if st.session_state.weather_result:
+        st.subheader("🌤️ Weather Forecast")
 
-# ----------------------------------
-# WEATHER OUTPUT SECTION
-# ----------------------------------
-if st.session_state.weather_result:
-    st.subheader("🌤️ Weather Forecast")
-
-    for d in st.session_state.weather_result:
-        st.markdown(
-            f"**{d['date']}** – {d['condition']} ({d['temp_range']})"
-        )
+        # The tool returns a message instead of a forecast list when it cannot help
+        if isinstance(st.session_state.weather_result, dict):
+            st.info(st.session_state.weather_result["message"])
+        else:
+            for d in st.session_state.weather_result:
+                st.markdown(
+                    f"**{d['date']}** – {d['condition']} ({d['temp_range']})"
+                )
 
-# ----------------------------------
-# PLACES / ITINERARY SECTION
-# ----------------------------------
-if st.session_state.final_destination:
+    # PLACES / ITINERARY
     st.subheader("🗺️ Day-wise Itinerary")
 
-    city_places = [
-        p for p in places
-        if p["city"].lower()
-        == st.session_state.final_destination.lower()
-    ]
+    # Best rated places first, several per day within the daily time budget
+    itinerary = cached_itinerary(city, days, data_version("places.json"))
+
+    for day, day_places in itinerary.items():
+        st.markdown(f"### {day}")
+        if not day_places:
+            st.write("Free day")
+        for p in day_places:
+            st.write(f"**{p['name']}** ({p['type']}) ⭐ {p['rating']}")
+
 
-    for i, p in enumerate(
-        city_places[:st.session_state.days], 1
-    ):
-        st.markdown(f"### Day {i}: {p['name']}")
-        st.write(p["type"])
-        st.write(f"⭐ {p['rating']}")
+if st.session_state.final_destination:
+    places_section()
 
 # ----------------------------------
-# BUDGET CALCULATION SECTION
+# BUDGET SECTION
 # ----------------------------------
-if st.session_state.flight_result:
-
+@timed_fragment("budget")
+def budget_section():
     st.divider()
     st.subheader("💰 Budget Estimation")
 
@@ -298,18 +457,60 @@ if st.session_state.flight_result:
             })
         )
 
-# ----------------------------------
-# FINAL BUDGET OUTPUT
-# ----------------------------------
-if st.session_state.budget_result:
-    st.subheader("💵 Final Trip Cost")
+    # FINAL BUDGET OUTPUT
+    if st.session_state.budget_result:
+        st.subheader("💵 Final Trip Cost")
 
-    st.markdown(
-        f"""
+        st.markdown(
+            f"""
 **Flight:** ₹{st.session_state.budget_result['flight_cost']}  
 **Hotel:** ₹{st.session_state.budget_result['hotel_cost']}  
 **Local:** ₹{st.session_state.budget_result['local_expenses']}  
 
 ### ✅ **Total: ₹{st.session_state.budget_result['total_cost']}**
 """
-    )
+        )
+
+
+if st.session_state.flight_result:
+    budget_section()
+
+# ----------------------------------
+# RERUN TIMING READOUT
+# The server time of this page run and of the recent section reruns of
+# this session (section reruns show up here on the next page run)
+# ----------------------------------
+with st.sidebar.expander("⏱️ Rerun times", expanded=True):
+    st.metric("This page run", f"{record_rerun('page', run_started):.1f} ms")
+    st.dataframe(list(reversed(st.session_state.rerun_times)), hide_index=True)
+
+# ----------------------------------
+# DEBUG PANEL
+# Timings, cache counters and rows scanned by the tools,
+# shown only when telemetry is enabled (TRAVEL_PLANNER_TELEMETRY=1)
+# ----------------------------------
+if telemetry.enabled():
+    with st.sidebar.expander("🛠️ Debug: telemetry"):
+        st.caption("Spans (since the last reset)")
+        st.dataframe([
+            {"span": name, "count": stats["count"], "mean ms": round(stats["mean_ms"], 3), "total s": round(stats["total_seconds"], 3)}
+            for name, stats in telemetry.span_summary().items()
+        ])
+
+        st.caption("Counters")
+        st.dataframe([
+            {"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels.items()), "value": value}
+            for name, labels, value in telemetry.counters()
+        ])
+
+        st.caption("Recent spans (newest first)")
+        st.dataframe([
+            {"span": s.name, "ms": round(s.seconds * 1000, 3), "attributes": json.dumps(s.attributes), "error": s.error}
+            for s in reversed(telemetry.recent_spans(50))
+        ])
+
+        st.download_button("Prometheus metrics", telemetry.prometheus_text(), file_name="metrics.prom")
+        st.download_button("OTLP traces (JSON)", json.dumps(telemetry.otlp_traces()), file_name="traces.json")
+        st.download_button("OTLP metrics (JSON)", json.dumps(telemetry.otlp_metrics()), file_name="metrics.json")
+        if st.button("Reset telemetry"):
+            telemetry.reset()
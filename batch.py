@@ -0,0 +1,246 @@
+"""
+Offline batch planner: trip requests in, plans out, both as JSON lines.
+
+Every input line is one trip request with the fields of planner.TRIP_DEFAULTS
+(source and destination are required), plus optionally:
+
+    budget   the most the whole trip may cost; the hotel price per night is
+             then whatever the flight and daily expenses leave of it
+    id       copied to the output line
+
+    {"id": 1, "source": "Hyderabad", "destination": "Delhi", "preference": "cheapest", "budget": 20000, "days": 3}
+
+Each output line holds the flight, hotel, places and budget tool results of one
+request, in input order. No weather is fetched, so a run needs no network.
+
+The requests are planned in chunks by a pool of worker processes. The indexes
+are loaded once before the pool starts; with the fork start method (Linux) the
+workers share those pages, elsewhere each worker loads them once. Only a few
+chunks per worker are in flight at any time, so memory does not grow with the
+input. After every chunk, a checkpoint file next to the output records how
+much input is done. An interrupted run continues from there when it is
+started again with the same arguments.
+
+Usage:
+    python batch.py INPUT.jsonl OUTPUT.jsonl [--workers N] [--chunk-size N] [--restart]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from budget import DAILY_EXPENSE, budget_estimation_tool
+from flight import flight_search_tool, get_flight_index
+from hotels import get_hotel_index, hotel_search_tool
+from places import get_place_index, location_search_tool
+from planner import flight_price, make_trip
+
+CHUNK_SIZE = 256 # requests per task sent to a worker
+CHUNKS_IN_FLIGHT = 4 # per worker, which bounds memory whatever the input size
+
+
+def load_indexes(): # This loads the three indexes (a no-op in a forked worker, which has them already)
+    get_flight_index()
+    get_hotel_index()
+    get_place_index()
+
+
+# ----------------------------------
+# Planning one request (runs in the workers)
+# The tools are called through .func, which skips LangChain's per-call
+# argument validation and callbacks; over millions of requests that layer
+# costs more than the lookups themselves.
+# ----------------------------------
+def plan_request(request):
+    """
+    Plans one trip request with the flight, hotel, places and budget tools.
+
+    Args:
+        request (dict): Trip fields (see planner.TRIP_DEFAULTS), plus optional "budget" and "id"
+
+    Returns:
+        dict: {"status": "success" | "failed", "flight", "hotel", "places", "budget", "message"}
+
+    Raises:
+        ValueError: If the request is missing fields, has unknown ones, or ones of the wrong type
+    """
+    request = dict(request)
+    budget = request.pop("budget", None)
+    trip = make_trip(request)
+    plan = {"status": "failed", "flight": None, "hotel": None, "places": None, "budget": None}
+
+    flight = flight_search_tool.func(
+        trip["source"], trip["destination"], trip["preference"], trip["start_date"], trip["flexibility_days"]
+    )
+    plan["flight"] = flight
+    plan["places"] = location_search_tool.func(trip["destination"], trip["category"], trip["days"])
+    if "flight" not in flight and "connections" not in flight:
+        plan["message"] = flight["message"]
+        return plan
+
+    nights = trip["days"] - 1
+    hotel_price = trip["hotel_price"]
+    if budget is not None and nights > 0: # whatever is left of the budget after the flight and daily expenses goes to the hotel
+        left = budget - flight_price(flight) - DAILY_EXPENSE * trip["days"]
+        hotel_price = min(hotel_price, left // nights) if "hotel_price" in request else left // nights
+        if hotel_price <= 0:
+            plan["message"] = f"The flight and daily expenses alone exceed the budget of {budget}."
+            return plan
+
+    if nights > 0:
+        hotel = hotel_search_tool.func(
+            trip["destination"], hotel_price, trip["hotel_rating"], trip["hotel_preference"], trip["amenities"] or None
+        )
+        plan["hotel"] = hotel
+        if "hotel" not in hotel:
+            plan["message"] = hotel["message"]
+            return plan
+        night_price = hotel["hotel"]["price"]
+    else:
+        night_price = 0 # a one day trip needs no hotel
+
+    plan["budget"] = budget_estimation_tool.func(flight_price(flight), night_price, trip["days"])
+    if budget is not None and plan["budget"]["total_cost"] > budget: # e.g. a one day trip, whose budget the hotel price cannot absorb
+        plan["message"] = f"The trip costs {plan['budget']['total_cost']}, more than the budget of {budget}."
+        return plan
+    plan["status"] = "success"
+    plan["message"] = f"{trip['days']} days in {trip['destination']} for {plan['budget']['total_cost']}."
+    return plan
+
+
+def plan_lines(numbered_lines): # This plans a chunk of (line number, input line) pairs, and returns the output lines
+    output = []
+    for number, line in numbered_lines:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            request_id = request.pop("id", None)
+            result = {"line": number, "id": request_id, **plan_request(request)}
+        except Exception as error: # a bad request gets an error line, the run goes on (raising would stop every resume at this line)
+            result = {"line": number, "status": "error", "message": f"{type(error).__name__}: {error}"}
+        output.append(json.dumps(result) + "\n")
+    return output
+
+
+# ----------------------------------
+# Reading, writing and checkpoints (runs in the parent)
+# ----------------------------------
+def read_chunks(path, offset, first_line, chunk_size):
+    """
+    Yields the input in chunks, from a byte offset.
+
+    Yields:
+        tuple: ([(line number, line)], byte offset after the chunk, number of the chunk's last line)
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk, number = [], first_line
+        for raw in f:
+            offset += len(raw)
+            number += 1
+            if raw.strip():
+                chunk.append((number, raw.decode("utf-8")))
+            if len(chunk) >= chunk_size:
+                yield chunk, offset, number
+                chunk = []
+        if chunk:
+            yield chunk, offset, number
+
+
+def checkpoint_path(output_path):
+    return output_path + ".checkpoint"
+
+
+def read_checkpoint(output_path, input_path): # The checkpoint of an earlier run with the same input, or None
+    try:
+        with open(checkpoint_path(output_path), "r") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("input") == os.path.abspath(input_path) else None
+
+
+def write_checkpoint(output_path, checkpoint): # written next to the output and moved into place, so it is never half written
+    temporary = checkpoint_path(output_path) + ".writing"
+    with open(temporary, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, checkpoint_path(output_path))
+
+
+def _pool_context(): # fork shares the loaded indexes with the workers; other platforms start fresh workers
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+def run_batch(input_path, output_path, workers=None, chunk_size=CHUNK_SIZE, restart=False, progress=sys.stderr):
+    """
+    Plans every request of a JSON-lines file into a JSON-lines output file, resuming from a checkpoint.
+
+    Args:
+        input_path (str): Requests, one JSON object per line
+        output_path (str): Plans, one JSON object per line, in input order
+        workers (int | None): Worker processes (default: the number of CPUs)
+        chunk_size (int): Requests per task
+        restart (bool): Ignore an existing checkpoint and start from the first line
+        progress (file | None): Where to report progress
+
+    Returns:
+        int: The number of lines written in this run
+    """
+    checkpoint = None if restart else read_checkpoint(output_path, input_path)
+    if checkpoint is None:
+        checkpoint = {"input": os.path.abspath(input_path), "input_offset": 0, "lines": 0, "output_bytes": 0}
+
+    load_indexes() # before the pool starts, so forked workers inherit them
+    written, started = 0, time.perf_counter()
+    with open(output_path, "ab") as out:
+        out.truncate(checkpoint["output_bytes"]) # drops anything written after the last checkpoint
+        out.seek(checkpoint["output_bytes"])
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=load_indexes) as pool:
+            in_flight = deque()
+            chunks = read_chunks(input_path, checkpoint["input_offset"], checkpoint["lines"], chunk_size)
+            limit = (workers or os.cpu_count() or 1) * CHUNKS_IN_FLIGHT
+            while True:
+                for chunk, offset, lines in chunks: # top up the window of chunks in flight
+                    in_flight.append((pool.submit(plan_lines, chunk), offset, lines))
+                    if len(in_flight) >= limit:
+                        break
+                if not in_flight:
+                    break
+
+                # the oldest chunk is written first, so the output keeps the input order and the checkpoint stays a prefix
+                future, offset, lines = in_flight.popleft()
+                output = future.result()
+                out.write("".join(output).encode("utf-8"))
+                out.flush()
+                written += len(output)
+                checkpoint.update(input_offset=offset, lines=lines, output_bytes=out.tell())
+                write_checkpoint(output_path, checkpoint)
+                if progress is not None:
+                    rate = written / max(time.perf_counter() - started, 1e-9)
+                    print(f"{checkpoint['lines']} lines done, {rate:.0f} plans/s", file=progress, end="\r")
+
+    if progress is not None:
+        print(file=progress)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an earlier run")
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.workers, args.chunk_size, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Load generator for the HTTP API (api.py).
+
+Unless --url points at a running server, it starts api.py on a free port
+with the local weather stub (--stub-weather), so the run needs no network.
+Client processes, each with a few keep-alive connections, then send a
+seeded random mix of flight, hotel, places, budget and weather requests
+(or /batch requests of --batch calls each) for --seconds, after a warm-up.
+
+It reports the requests per second and the latency percentiles, overall and
+per endpoint, and can write them as JSON. The clients share the machine
+with the server, so on a small machine they take CPU time from it; the
+numbers are a lower bound of what the server can do.
+
+Usage:
+    python benchmarks/api_load.py [--url URL | --workers N] [--connections C] [--processes P]
+                                  [--seconds S] [--batch N] [--seed S] [--output FILE]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tool_latency import percentiles # noqa: E402
+
+# endpoint -> share of the requests
+MIX = {"flight": 0.3, "hotel": 0.3, "places": 0.2, "budget": 0.1, "weather": 0.1}
+AMENITIES = ["wifi", "pool", "gym", "parking", "breakfast", "spa"]
+
+
+def data_cities(): # The city names of the local data files, for the random requests
+    from datastore import data_path
+
+    with open(data_path("flights.json"), "r") as f:
+        flights = json.load(f)
+    return sorted({flight["from"] for flight in flights} | {flight["to"] for flight in flights})
+
+
+def random_call(cities, rng): # This returns one random (endpoint, arguments)
+    endpoint = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    if endpoint == "flight":
+        source, destination = rng.sample(cities, 2)
+        return endpoint, {"source": source, "destination": destination, "preference": rng.choice(["cheapest", "fastest"])}
+    if endpoint == "hotel":
+        return endpoint, {
+            "city": rng.choice(cities), "price": rng.randrange(1000, 12001, 500), "rating": rng.randint(1, 5),
+            "preference": rng.choice(["cheapest", "highest_rating"]), "amenities": rng.sample(AMENITIES, rng.randint(0, 2))
+        }
+    if endpoint == "places":
+        return endpoint, {"city": rng.choice(cities), "category": "all", "max_days": rng.randint(1, 5)}
+    if endpoint == "budget":
+        return endpoint, {
+            "flight_price": rng.randint(1500, 15000), "hotel_price_per_night": rng.randint(800, 12000),
+            "number_of_days": rng.randint(1, 10)
+        }
+    start = date.today() + timedelta(days=rng.randint(0, 7))
+    return endpoint, {
+        "city": rng.choice(cities), "start_date": start.isoformat(), "end_date": (start + timedelta(days=rng.randint(0, 4))).isoformat()
+    }
+
+
+# ----------------------------------
+# Clients (run in the client processes)
+# ----------------------------------
+def run_connection(url, cities, settings, seed, warm_until, stop_at, samples):
+    rng = random.Random(seed)
+    address = urlsplit(url)
+    connection = http.client.HTTPConnection(address.hostname, address.port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    while True:
+        if settings["batch"] > 1:
+            endpoint = "batch"
+            calls = [random_call(cities, rng) for _ in range(settings["batch"])]
+            body = {"calls": [{"tool": name, "args": args} for name, args in calls]}
+        else:
+            endpoint, body = random_call(cities, rng)
+
+        started = time.perf_counter()
+        if started >= stop_at:
+            break
+        try:
+            connection.request("POST", "/" + endpoint, json.dumps(body), headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException): # the server closed the connection or timed out; count it and reconnect
+            connection.close()
+            status = "error"
+        if started >= warm_until:
+            samples.append((endpoint, time.perf_counter() - started, status))
+    connection.close()
+
+
+def run_client(url, cities, settings, connections, seed): # This runs one client process, and returns its samples
+    samples = [] # list.append is atomic, so the threads share one list
+    warm_until = time.perf_counter() + settings["warmup"]
+    stop_at = warm_until + settings["seconds"]
+    threads = [
+        threading.Thread(target=run_connection, args=(url, cities, settings, seed * 1000 + i, warm_until, stop_at, samples))
+        for i in range(connections)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+# ----------------------------------
+# Driving (runs in the parent)
+# ----------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers): # This starts api.py with the weather stub, and waits until it answers /healthz
+    url = f"http://127.0.0.1:{free_port()}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "api.py"), "--port", str(urlsplit(url).port), "--workers", str(workers), "--stub-weather"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"api.py exited with status {server.returncode}")
+        try:
+            with urlopen(url + "/healthz", timeout=1) as response:
+                if response.status == 200:
+                    return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("api.py did not become healthy within 60 s")
+
+
+def summarize(samples, seconds, batch): # This turns the samples of all clients into the report
+    by_endpoint = {}
+    for endpoint, elapsed, status in samples:
+        by_endpoint.setdefault(endpoint, []).append((elapsed, status))
+
+    def stats(entries):
+        return {
+            **percentiles([elapsed for elapsed, _ in entries]),
+            "rps": len(entries) / seconds,
+            "errors": sum(1 for _, status in entries if status != 200)
+        }
+
+    report = {"overall": stats([(elapsed, status) for _, elapsed, status in samples])}
+    report["overall"]["calls_per_second"] = report["overall"]["rps"] * batch
+    report["endpoints"] = {endpoint: stats(entries) for endpoint, entries in sorted(by_endpoint.items())}
+    return report
+
+
+def print_report(report):
+    overall = report["overall"]
+    print(f"{overall['count']} requests, {overall['rps']:.0f} requests/s ({overall['calls_per_second']:.0f} tool calls/s),"
+          f" {overall['errors']} errors")
+    print(f"  {'all':<10} p50 {overall['p50_ms']:8.3f} ms  p99 {overall['p99_ms']:8.3f} ms  max {overall['max_ms']:8.3f} ms")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"  {endpoint:<10} p50 {stats['p50_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms  {stats['rps']:8.0f} requests/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="a running API server (default: start api.py with the weather stub)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes of the started server")
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive connections in total")
+    parser.add_argument("--processes", type=int, default=None, help="client processes (default: up to 4)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--batch", type=int, default=1, help="tool calls per /batch request (1 sends single calls)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(args.workers)
+    try:
+        cities = data_cities()
+        settings = {"seconds": args.seconds, "warmup": args.warmup, "batch": args.batch}
+        processes = max(1, min(args.processes or 4, args.connections))
+        shares = [args.connections // processes + (i < args.connections % processes) for i in range(processes)]
+        with Pool(processes) as pool:
+            results = pool.starmap(run_client, [(url, cities, settings, share, args.seed + i) for i, share in enumerate(shares)])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = summarize([sample for samples in results for sample in samples], args.seconds, args.batch)
+    report["settings"] = {
+        "url": args.url, "workers": None if args.url else args.workers, "connections": args.connections,
+        "processes": processes, "seconds": args.seconds, "batch": args.batch, "seed": args.seed
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
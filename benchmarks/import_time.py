@@ -0,0 +1,95 @@
+"""
+Import-time benchmark for the modules app.py depends on.
+
+Every module is imported in a fresh interpreter, started from an empty
+temporary directory (so relative paths would fail), with all socket
+connections and DNS lookups disabled (so any network I/O at import time
+would show up). Reports the median import time per module and exits
+with status 1 if a module fails to import, tries to use the network or
+prints anything while it is imported.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["telemetry", "deltas", "datastore", "records", "snapshot", "connections", "fares", "flight", "hotels", "places", "budget", "weather", "planner", "batch", "api"]
+
+CHILD = """
+import importlib, json, socket, sys, time
+
+attempts = []
+
+def blocked(*args, **kwargs):
+    attempts.append(repr(args)[:200])
+    raise OSError("network access is disabled while importing")
+
+socket.socket.connect = blocked
+socket.socket.connect_ex = blocked
+socket.create_connection = blocked
+socket.getaddrinfo = blocked
+
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "network_attempts": attempts}}))
+"""
+
+
+def measure(module, repeat): # This imports a module `repeat` times, each time in a new interpreter
+    runs = []
+    with tempfile.TemporaryDirectory() as empty_dir:
+        for _ in range(repeat):
+            child = subprocess.run(
+                [sys.executable, "-c", CHILD.format(root=ROOT, module=module)],
+                cwd=empty_dir, capture_output=True, text=True
+            )
+            if child.returncode != 0:
+                return {"module": module, "error": child.stderr.strip().splitlines()[-1:]}
+            lines = child.stdout.strip().splitlines()
+            run = json.loads(lines[-1])
+            run["printed"] = lines[:-1] # anything printed while importing is a side effect too
+            runs.append(run)
+
+    return {
+        "module": module,
+        "median_seconds": statistics.median(run["seconds"] for run in runs),
+        "network_attempts": sorted({attempt for run in runs for attempt in run["network_attempts"]}),
+        "printed_output": any(run["printed"] for run in runs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeat) for module in MODULES]
+    failed = [r for r in results if "error" in r or r["network_attempts"] or r["printed_output"]]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            if "error" in r:
+                print(f"{r['module']:<12} FAILED  {r['error']}")
+            else:
+                network = "network I/O!" if r["network_attempts"] else "no network I/O"
+                printed = ", printed output!" if r["printed_output"] else ""
+                print(f"{r['module']:<12} {r['median_seconds'] * 1000:8.1f} ms  {network}{printed}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Seeded synthetic data in the shape of flights.json, hotels.json and places.json.
+
+The same seed and sizes always give the same files, so benchmark runs on
+different commits measure the same data. Rows are generated with NumPy in
+chunks and written one per line, so millions of rows never need to be in
+memory as Python dicts at once.
+
+Usage:
+    python benchmarks/synthetic.py OUT_DIR [--flights N] [--hotels N] [--places N] [--cities N] [--seed S]
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+CHUNK_ROWS = 100_000
+
+# The cities of the bundled data come first, so their names also work in the synthetic data
+KNOWN_CITIES = ["Delhi", "Mumbai", "Bangalore", "Chennai", "Hyderabad", "Kolkata", "Goa", "Jaipur"]
+AIRLINES = ["IndiGo", "Air India", "SpiceJet", "Vistara", "Akasa Air", "Go First"]
+HOTEL_NAMES = ["Grand Palace Hotel", "Comfort Suites", "Budget Stay Inn", "Royal Heritage", "City Lodge", "Sea View Resort"]
+AMENITIES = ["wifi", "pool", "breakfast", "parking", "spa", "gym"]
+PLACE_ADJECTIVES = ["Famous", "Beautiful", "Historic", "Old", "Grand", "Hidden"]
+PLACE_TYPES = ["museum", "fort", "temple", "market", "beach", "lake", "park", "monument"]
+PLACE_NOUNS = ["Fort", "Temple", "Market", "Beach", "Lake", "Park", "Museum", "Palace"]
+
+FIRST_DEPARTURE = np.datetime64("2025-01-01T00:00:00")
+
+
+def city_names(count): # The bundled cities, then "City 9", "City 10", ... up to count cities
+    return KNOWN_CITIES[:count] + [f"City {i}" for i in range(len(KNOWN_CITIES) + 1, count + 1)]
+
+
+def _chunks(rows): # This yields (first row, rows in chunk) pairs
+    for start in range(0, rows, CHUNK_ROWS):
+        yield start, min(CHUNK_ROWS, rows - start)
+
+
+def generate_flights(rows, cities, rng): # This yields flight dicts, chunk by chunk
+    for start, size in _chunks(rows):
+        source = rng.integers(0, len(cities), size)
+        destination = (source + rng.integers(1, len(cities), size)) % len(cities) # never the same city
+        departure = FIRST_DEPARTURE + rng.integers(0, 365 * 24 * 60, size).astype("timedelta64[m]")
+        arrival = departure + (rng.integers(12, 73, size) * 5).astype("timedelta64[m]") # 1 to 6 hours
+        airline = rng.integers(0, len(AIRLINES), size)
+        price = rng.integers(1500, 15001, size)
+        departure, arrival = np.datetime_as_string(departure, unit="s"), np.datetime_as_string(arrival, unit="s")
+        for i in range(size):
+            yield {
+                "flight_id": f"FL{start + i + 1:07d}",
+                "airline": AIRLINES[airline[i]],
+                "from": cities[source[i]],
+                "to": cities[destination[i]],
+                "departure_time": str(departure[i]),
+                "arrival_time": str(arrival[i]),
+                "price": int(price[i])
+            }
+
+
+def generate_hotels(rows, cities, rng): # This yields hotel dicts, chunk by chunk
+    for start, size in _chunks(rows):
+        city = rng.integers(0, len(cities), size)
+        name = rng.integers(0, len(HOTEL_NAMES), size)
+        stars = rng.integers(1, 6, size)
+        price = rng.integers(800, 12001, size)
+        has = rng.random((size, len(AMENITIES))) < 0.5
+        order = np.argsort(rng.random((size, len(AMENITIES))), axis=1) # amenities are listed in a random order, like in hotels.json
+        for i in range(size):
+            yield {
+                "hotel_id": f"HOT{start + i + 1:07d}",
+                "name": HOTEL_NAMES[name[i]],
+                "city": cities[city[i]],
+                "stars": int(stars[i]),
+                "price_per_night": int(price[i]),
+                "amenities": [AMENITIES[a] for a in order[i] if has[i, a]]
+            }
+
+
+def generate_places(rows, cities, rng): # This yields place dicts, chunk by chunk
+    for start, size in _chunks(rows):
+        city = rng.integers(0, len(cities), size)
+        adjective = rng.integers(0, len(PLACE_ADJECTIVES), size)
+        noun = rng.integers(0, len(PLACE_NOUNS), size)
+        kind = rng.integers(0, len(PLACE_TYPES), size)
+        rating = rng.integers(30, 51, size) / 10 # 3.0 to 5.0
+        for i in range(size):
+            yield {
+                "place_id": f"PLC{start + i + 1:07d}",
+                "name": f"{PLACE_ADJECTIVES[adjective[i]]} {PLACE_NOUNS[noun[i]]}",
+                "city": cities[city[i]],
+                "type": PLACE_TYPES[kind[i]],
+                "rating": float(rating[i])
+            }
+
+
+def write_json_list(path, records): # This writes records as a JSON list, one record per line
+    with open(path, "w") as f:
+        f.write("[")
+        for i, record in enumerate(records):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(record))
+        f.write("\n]\n")
+
+
+def write_dataset(directory, flights=1000, hotels=1000, places=1000, cities=50, seed=0):
+    """
+    Writes flights.json, hotels.json and places.json into a directory.
+
+    Args:
+        directory (str): Output directory (created if missing)
+        flights (int): Number of flights
+        hotels (int): Number of hotels
+        places (int): Number of places
+        cities (int): Number of cities (at least 2)
+        seed (int): Random seed; every file gets its own stream, so changing one size does not change the others
+
+    Returns:
+        list: The city names used
+    """
+    os.makedirs(directory, exist_ok=True)
+    names = city_names(max(cities, 2))
+    flight_rng, hotel_rng, place_rng = (np.random.default_rng([seed, stream]) for stream in range(3))
+    write_json_list(os.path.join(directory, "flights.json"), generate_flights(flights, names, flight_rng))
+    write_json_list(os.path.join(directory, "hotels.json"), generate_hotels(hotels, names, hotel_rng))
+    write_json_list(os.path.join(directory, "places.json"), generate_places(places, names, place_rng))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--hotels", type=int, default=1000)
+    parser.add_argument("--places", type=int, default=1000)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_dataset(args.directory, args.flights, args.hotels, args.places, args.cities, args.seed)
+
+
+if __name__ == "__main__":
+    main()
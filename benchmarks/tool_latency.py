@@ -0,0 +1,233 @@
+"""
+Latency and memory benchmark for the tool layer, on synthetic data.
+
+For every size, benchmarks/synthetic.py writes a seeded data set into a
+temporary directory, and a fresh interpreter (with TRAVEL_PLANNER_DATA_DIR
+pointing at it) measures:
+
+- cold loading, the way app.py starts: importing the tool modules and
+  building the flight, hotel and place indexes (time and peak RSS)
+- flight_search_tool, hotel_search_tool, location_search_tool,
+  budget_estimation_tool and weather_lookup_tool latency percentiles, over
+  seeded random queries (weather against a local Open-Meteo stub)
+- the peak RSS of the whole run
+
+The results (plus commit, Python version and settings) are written as JSON,
+and --compare prints the change against an earlier results file.
+
+Usage:
+    python benchmarks/tool_latency.py [--sizes 1000,100000] [--queries N] [--seed S]
+                                      [--snapshot] [--output FILE] [--compare OLD_FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import AMENITIES, PLACE_TYPES, city_names, write_dataset # noqa: E402
+
+TOOLS = ["flight_search_tool", "hotel_search_tool", "location_search_tool", "budget_estimation_tool", "weather_lookup_tool"]
+
+
+# ----------------------------------
+# Measuring (runs in the child interpreter)
+# ----------------------------------
+def peak_rss_mb(): # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(seconds): # Latency summary in milliseconds
+    ordered = sorted(seconds)
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": at(0.50),
+        "p90_ms": at(0.90),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def tool_queries(cities, count, rng): # Seeded random inputs for every tool
+    from datetime import date, timedelta
+
+    today = date.today()
+    queries = {tool: [] for tool in TOOLS}
+    for _ in range(count):
+        source, destination = rng.sample(cities, 2)
+        queries["flight_search_tool"].append({
+            "source": source, "destination": destination, "preference": rng.choice(["cheapest", "fastest"])
+        })
+        queries["hotel_search_tool"].append({
+            "city": rng.choice(cities), "price": rng.randrange(1000, 12001, 500), "rating": rng.randint(1, 5),
+            "preference": rng.choice(["cheapest", "highest_rating"]), "amenities": rng.sample(AMENITIES, rng.randint(0, 3))
+        })
+        queries["location_search_tool"].append({
+            "city": rng.choice(cities), "category": rng.choice(PLACE_TYPES + ["all"]), "max_days": rng.randint(1, 7)
+        })
+        queries["budget_estimation_tool"].append({
+            "flight_price": rng.randint(1500, 15000), "hotel_price_per_night": rng.randint(800, 12000),
+            "number_of_days": rng.randint(1, 10)
+        })
+        start = today + timedelta(days=rng.randint(0, 7))
+        queries["weather_lookup_tool"].append({
+            "city": rng.choice(cities), "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=rng.randint(0, 6))).isoformat()
+        })
+    return queries
+
+
+def run_child(settings): # This measures one data set; the data directory and the stub URLs are already in the environment
+    import random
+
+    started = time.perf_counter()
+    import budget, flight, hotels, places, weather # noqa: E401
+    flight.get_flight_index()
+    hotels.get_hotel_index()
+    places.get_place_index()
+    cold_load = {"seconds": time.perf_counter() - started, "peak_rss_mb": peak_rss_mb()}
+
+    tools = {
+        "flight_search_tool": flight.flight_search_tool,
+        "hotel_search_tool": hotels.hotel_search_tool,
+        "location_search_tool": places.location_search_tool,
+        "budget_estimation_tool": budget.budget_estimation_tool,
+        "weather_lookup_tool": weather.weather_lookup_tool
+    }
+    rng = random.Random(settings["seed"])
+    queries = tool_queries(city_names(settings["cities"]), settings["queries"], rng)
+    latency = {}
+    for name in TOOLS:
+        seconds = []
+        for query in queries[name]:
+            start = time.perf_counter()
+            tools[name].run(query)
+            seconds.append(time.perf_counter() - start)
+        latency[name] = percentiles(seconds)
+
+    return {"cold_load": cold_load, "latency": latency, "peak_rss_mb": peak_rss_mb()}
+
+
+# ----------------------------------
+# Driving (runs in the parent)
+# ----------------------------------
+def measure_size(size, args, stub): # This generates one data set and measures it in a fresh interpreter
+    with tempfile.TemporaryDirectory() as data_dir:
+        started = time.perf_counter()
+        write_dataset(data_dir, flights=size, hotels=size, places=size, cities=args.cities, seed=args.seed)
+        shutil.copy(os.path.join(ROOT, "weather.txt"), data_dir)
+        generated = time.perf_counter() - started
+        if args.snapshot:
+            subprocess.run([sys.executable, os.path.join(ROOT, "snapshot.py")], check=True, capture_output=True,
+                           env={**os.environ, "TRAVEL_PLANNER_DATA_DIR": data_dir})
+
+        settings = {"seed": args.seed, "cities": args.cities, "queries": args.queries}
+        env = {
+            **os.environ,
+            "TRAVEL_PLANNER_DATA_DIR": data_dir,
+            "OPEN_METEO_GEOCODING_URL": stub.geocoding_url,
+            "OPEN_METEO_FORECAST_URL": stub.forecast_url
+        }
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(settings)],
+            cwd=data_dir, env=env, capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            return {"rows": size, "error": child.stderr.strip().splitlines()[-3:]}
+        return {"rows": size, "generate_seconds": generated, **json.loads(child.stdout.strip().splitlines()[-1])}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new): # This prints the relative change of every metric between two results files
+    def change(before, after):
+        return f"{(after - before) / before * 100:+7.1f}%" if before else "    n/a"
+
+    old_sizes = {result["rows"]: result for result in old["results"] if "error" not in result}
+    for result in new["results"]:
+        before = old_sizes.get(result["rows"])
+        if before is None or "error" in result:
+            continue
+        print(f"{result['rows']} rows (vs {(old.get('commit') or 'unknown')[:10]})")
+        print(f"  {'cold load':<24} {change(before['cold_load']['seconds'], result['cold_load']['seconds'])} time"
+              f"  {change(before['cold_load']['peak_rss_mb'], result['cold_load']['peak_rss_mb'])} peak RSS")
+        for tool in TOOLS:
+            a, b = before["latency"][tool], result["latency"][tool]
+            print(f"  {tool:<24} {change(a['p50_ms'], b['p50_ms'])} p50  {change(a['p99_ms'], b['p99_ms'])} p99")
+
+
+def print_results(report):
+    for result in report["results"]:
+        if "error" in result:
+            print(f"{result['rows']} rows: FAILED {result['error']}")
+            continue
+        load = result["cold_load"]
+        print(f"{result['rows']} rows: cold load {load['seconds']:.2f} s, {load['peak_rss_mb']:.0f} MB peak RSS"
+              f" ({result['peak_rss_mb']:.0f} MB at the end)")
+        for tool in TOOLS:
+            stats = result["latency"][tool]
+            print(f"  {tool:<24} p50 {stats['p50_ms']:8.3f} ms  p90 {stats['p90_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms")
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(run_child(json.loads(sys.argv[2]))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated row counts (per data file)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per tool and size")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snapshot", action="store_true", help="load from binary snapshots instead of the JSON files")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.json"))
+    parser.add_argument("--compare", help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    from weather_stub import start_stub_server
+
+    stub = start_stub_server()
+    try:
+        results = [measure_size(int(size), args, stub) for size in args.sizes.split(",")]
+    finally:
+        stub.stop()
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"queries": args.queries, "cities": args.cities, "seed": args.seed, "snapshot": args.snapshot},
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_results(report)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), report)
+    sys.exit(1 if any("error" in result for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
+from typing import Annotated
 
+import numpy as np
+from pydantic import Field
 
+import telemetry
+
+DAILY_EXPENSE = 1500 # default local expenses per day
+MAX_TRIP_DAYS = 60 # longer trips are a mistake in the request, and would keep the itinerary planner busy for good
+
+
+@telemetry.traced()
 def calculate_budget(
     flight_price: int,
     hotel_price_per_night: int,
     number_of_days: int,
-    daily_expense: int = 1500
+    daily_expense: int = DAILY_EXPENSE
 ):
 
 # This function will create a logic to calculate total expense, we will assign an default value to daily_expense (1500)
@@ -28,39 +38,135 @@ def calculate_budget(
 
 
 
+# ----------------------------------
+# Batch budget estimation
+# The same arithmetic as calculate_budget, for whole arrays of flights, hotels
+# and trip lengths at once, using NumPy broadcasting.
+# ----------------------------------
+GRID_CHUNK_SIZE = 4_000_000 # totals computed per step in cheapest_combos, which bounds its memory use
+
+
+def daily_expense_rates(cities, rates, default=DAILY_EXPENSE):
+    """
+    Looks up the daily expense rate of every city.
+
+    Args:
+        cities (list): City of every hotel
+        rates (dict): City name -> daily expense (case insensitive)
+        default (int): Rate for cities without an entry
+
+    Returns:
+        numpy.ndarray: One rate per city
+    """
+    rates = {city.strip().lower(): rate for city, rate in rates.items()}
+    return np.array([rates.get(city.strip().lower(), default) for city in cities], dtype=np.int64)
+
+
+def budget_grid(flight_prices, hotel_prices, days, daily_expense=DAILY_EXPENSE):
+    """
+    Calculates the total cost of every flight x hotel x trip length combination.
+
+    Args:
+        flight_prices (array): F flight prices
+        hotel_prices (array): H nightly hotel prices
+        days (array): D trip lengths in days
+        daily_expense (int or array): One rate, or H rates (the rate of each hotel's city)
+
+    Returns:
+        numpy.ndarray: Totals with shape (F, H, D)
+    """
+    flights = np.asarray(flight_prices, dtype=np.int64)[:, None, None]
+    hotels = np.asarray(hotel_prices, dtype=np.int64)[None, :, None]
+    days = np.asarray(days, dtype=np.int64)[None, None, :]
+    expense = np.asarray(daily_expense, dtype=np.int64)
+    if expense.ndim == 1: # per-hotel rates go along the hotel axis
+        expense = expense[None, :, None]
+
+    return flights + hotels * (days - 1) + expense * days
+
+
+def _n_smallest(totals, positions, n): # Keeps the n smallest totals, breaking ties by grid position
+    if len(totals) > n:
+        kth = np.partition(totals, n - 1)[n - 1] # partition instead of a full sort; every tie of the n-th total is kept
+        keep = totals <= kth
+        totals, positions = totals[keep], positions[keep]
+    order = np.lexsort((positions, totals))[:n]
+    return totals[order], positions[order]
+
+
+@telemetry.traced()
+def cheapest_combos(flight_prices, hotel_prices, days, budget, n=10, daily_expense=DAILY_EXPENSE):
+    """
+    Finds the n cheapest flight x hotel x trip length combinations that fit a budget.
+
+    Args:
+        flight_prices (array): F flight prices
+        hotel_prices (array): H nightly hotel prices
+        days (array): D trip lengths in days
+        budget (int): Maximum total cost
+        n (int): Number of combinations to return
+        daily_expense (int or array): One rate, or H rates (the rate of each hotel's city)
+
+    Returns:
+        list: Cheapest first, each with the flight, hotel and days index and the total cost
+    """
+    if n <= 0:
+        return []
+    flight_prices = np.asarray(flight_prices, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    per_flight = max(1, len(hotel_prices) * len(days))
+    chunk = max(1, GRID_CHUNK_SIZE // per_flight) # flights per step
+    telemetry.current_span().set("rows", len(flight_prices) * len(hotel_prices) * len(days))
+
+    best_totals = np.empty(0, dtype=np.int64)
+    best_positions = np.empty(0, dtype=np.int64) # flat positions in the full (F, H, D) grid
+    for start in range(0, len(flight_prices), chunk):
+        totals = budget_grid(flight_prices[start:start + chunk], hotel_prices, days, daily_expense).ravel()
+        positions = np.flatnonzero(totals <= budget)
+        totals, positions = _n_smallest(totals[positions], positions + start * per_flight, n)
+        best_totals, best_positions = _n_smallest(
+            np.concatenate([best_totals, totals]),
+            np.concatenate([best_positions, positions]),
+            n
+        )
+
+    # best_totals is sorted cheapest first, ties in grid order
+    shape = (len(flight_prices), len(hotel_prices), len(days))
+    flight_index, hotel_index, days_index = np.unravel_index(best_positions, shape)
+    return [
+        {
+            "flight": int(f),
+            "hotel": int(h),
+            "days": int(days[d]),
+            "total_cost": int(total)
+        }
+        for f, h, d, total in zip(flight_index, hotel_index, days_index, best_totals)
+    ]
+
+
+
 # now we will wrapp this logic inside an lang chain framework, as a tool
 
 from langchain.tools import tool
 @tool
+@telemetry.traced("budget_estimation_tool")
 def budget_estimation_tool(
     flight_price: int,
     hotel_price_per_night: int,
-    number_of_days: int
+    number_of_days: Annotated[int, Field(ge=1, le=MAX_TRIP_DAYS)]
 ):
     """
     Calculates total trip budget including flight, hotel, and daily expenses.
     """
-    daily_expense = 1500
-
-    hotel_nights = number_of_days - 1
-    hotel_cost = hotel_price_per_night * hotel_nights
-    local_expenses = daily_expense * number_of_days
-    total_cost = flight_price + hotel_cost + local_expenses
-
-    return {
-        "flight_cost": flight_price,
-        "hotel_cost": hotel_cost,
-        "local_expenses": local_expenses,
-        "total_cost": total_cost
-    }
-
+    return calculate_budget(flight_price, hotel_price_per_night, number_of_days, DAILY_EXPENSE)
 
 
-# Here we can test the tool
-output = budget_estimation_tool.run({
-    "flight_price": 6500,
-    "hotel_price_per_night": 3000,
-    "number_of_days": 3
-})
+if __name__ == "__main__":
+    # Here we can test the tool
+    output = budget_estimation_tool.run({
+        "flight_price": 6500,
+        "hotel_price_per_night": 3000,
+        "number_of_days": 3
+    })
 
-print(output)
+    print(output)
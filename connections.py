@@ -0,0 +1,207 @@
+import heapq
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+# ----------------------------------
+# Connection search over the flight graph
+# Cities are the nodes and every flight is a timed edge (it can only be taken
+# if we reach its departure city early enough). The search is a time-dependent
+# A* that returns the k best itineraries by total price or total elapsed time.
+# ----------------------------------
+
+MIN_CONNECTION_MINUTES = 60 # minimum time between landing and the next departure
+MAX_LAYOVER_MINUTES = 24 * 60 # longest wait we accept at a connecting airport (None = no limit)
+MAX_LEGS = 3
+
+
+def to_epoch_seconds(value): # This function accepts an ISO string, a datetime or epoch seconds and returns epoch seconds
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None: # naive times are read as UTC, like FlightTable does
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class ConnectionGraph: # This class builds the per-source adjacency lists of a FlightTable once, and answers itinerary queries
+    def __init__(self, table):
+        self.table = table
+        n_cities = len(table.cities)
+
+        # per-source adjacency: the rows leaving each city, sorted by departure time, so a bisect finds the next flights
+        order = np.lexsort((table.departure, table.from_code))
+        if table.alive is not None: # rows replaced or deleted by deltas are not edges
+            order = order[table.alive[order]]
+        starts = np.searchsorted(table.from_code[order], np.arange(n_cities + 1))
+        self.adjacency = [order[starts[c]:starts[c + 1]] for c in range(n_cities)]
+        self.adjacency_departures = [table.departure[rows] for rows in self.adjacency]
+
+        # city level graph with the cheapest price and shortest duration per route, used for the A* lower bounds
+        self.reverse_edges = [[] for _ in range(n_cities)] # to city -> [(from city, min price, min duration)]
+        if len(order):
+            live = slice(None) if table.alive is None else table.alive
+            route_code = table.from_code[live].astype(np.int64) * n_cities + table.to_code[live]
+            route_order = np.argsort(route_code, kind="stable")
+            codes, starts = np.unique(route_code[route_order], return_index=True)
+            min_price = np.minimum.reduceat(table.price[live][route_order], starts)
+            min_duration = np.minimum.reduceat(table.duration[live][route_order], starts)
+            for code, price, duration in zip(codes.tolist(), min_price.tolist(), min_duration.tolist()):
+                self.reverse_edges[code % n_cities].append((code // n_cities, price, duration))
+        self._bounds = {} # (destination code, objective) -> lower bound to destination for every city
+
+    def lower_bounds(self, destination, objective): # Static Dijkstra backwards from the destination, ignoring departure times
+        key = (destination, objective)
+        if key not in self._bounds:
+            bound = [math.inf] * len(self.table.cities)
+            bound[destination] = 0
+            heap = [(0, destination)]
+            while heap:
+                cost, city = heapq.heappop(heap)
+                if cost > bound[city]:
+                    continue
+                for previous, price, duration in self.reverse_edges[city]:
+                    new_cost = cost + (price if objective == "price" else duration)
+                    if new_cost < bound[previous]:
+                        bound[previous] = new_cost
+                        heapq.heappush(heap, (new_cost, previous))
+            self._bounds[key] = bound
+        return self._bounds[key]
+
+    def search(
+        self,
+        source,
+        destination,
+        k=3,
+        objective="price",
+        min_connection_minutes=MIN_CONNECTION_MINUTES,
+        max_layover_minutes=MAX_LAYOVER_MINUTES,
+        max_legs=MAX_LEGS,
+        earliest_departure=None,
+        latest_departure=None
+    ):
+        """
+        Finds the k best itineraries from source to destination.
+
+        Args:
+            source (str): Source city
+            destination (str): Destination city
+            k (int): Number of itineraries to return
+            objective (str): 'price' (total fare) or 'elapsed' (first departure to last arrival)
+            min_connection_minutes (int): Minimum time between two legs
+            max_layover_minutes (int | None): Maximum time between two legs
+            max_legs (int): Maximum number of flights in one itinerary
+            earliest_departure, latest_departure: Optional window for the first departure
+                (ISO string, datetime or epoch seconds)
+
+        Returns:
+            list: Itineraries, best first
+        """
+        table = self.table
+        source_code, target = table.code(source), table.code(destination)
+        if source_code is None or target is None or source_code == target or k <= 0:
+            return []
+
+        bound = self.lower_bounds(target, objective)
+        if bound[source_code] == math.inf:
+            return []
+
+        min_gap = min_connection_minutes * 60
+        max_gap = None if max_layover_minutes is None else max_layover_minutes * 60
+        departure, arrival, price, duration = table.departure, table.arrival, table.price, table.duration
+
+        # a label is one partial itinerary: (f = g + h, tie breaker, g, rows of its legs, set of visited cities)
+        heap = []
+        counter = 0
+
+        def push(cost, rows, visited):
+            nonlocal counter
+            city = int(table.to_code[rows[-1]])
+            heapq.heappush(heap, (cost + bound[city], counter, cost, rows, visited))
+            counter += 1
+
+        departures = self.adjacency_departures[source_code]
+        low = 0 if earliest_departure is None else np.searchsorted(departures, to_epoch_seconds(earliest_departure), "left")
+        high = len(departures) if latest_departure is None else np.searchsorted(departures, to_epoch_seconds(latest_departure), "right")
+        for row in self.adjacency[source_code][low:high].tolist():
+            next_city = int(table.to_code[row])
+            if bound[next_city] == math.inf or (max_legs == 1 and next_city != target):
+                continue
+            cost = int(price[row]) if objective == "price" else float(duration[row])
+            push(cost, (row,), frozenset((source_code, next_city)))
+
+        results = []
+        settled = {} # city -> [(arrival, first departure, legs, visited cities)] of the labels already expanded there
+        while heap and len(results) < k:
+            _, _, cost, rows, visited = heapq.heappop(heap)
+            last = rows[-1]
+            city = int(table.to_code[last])
+            if city == target:
+                results.append(self._itinerary(rows))
+                continue
+            if len(rows) >= max_legs:
+                continue
+
+            landed, first_departure = int(arrival[last]), int(departure[rows[0]])
+            if self._dominated(settled.setdefault(city, []), landed, first_departure, len(rows), visited, k, objective, max_gap):
+                continue
+            settled[city].append((landed, first_departure, len(rows), visited))
+
+            departures = self.adjacency_departures[city]
+            low = np.searchsorted(departures, landed + min_gap, "left")
+            high = len(departures) if max_gap is None else np.searchsorted(departures, landed + max_gap, "right")
+            last_leg = len(rows) + 1 == max_legs
+            for row in self.adjacency[city][low:high].tolist():
+                next_city = int(table.to_code[row])
+                if next_city in visited or bound[next_city] == math.inf or (last_leg and next_city != target):
+                    continue
+                if objective == "price":
+                    new_cost = cost + int(price[row])
+                else:
+                    new_cost = (int(arrival[row]) - first_departure) / 60
+                push(new_cost, rows + (row,), visited | {next_city})
+
+        return results
+
+    @staticmethod
+    def _dominated(labels, landed, first_departure, legs, visited, k, objective, max_gap):
+        # labels are expanded in cost order, so an earlier label at the same city is never more expensive.
+        # It can do everything this one can if it landed no later (exactly as early when the layover is capped),
+        # used no more legs, passed through no city this one has not (a visited city cannot be flown to again)
+        # and, for elapsed time, did not leave earlier. k such labels make this one useless.
+        count = 0
+        for other_landed, other_departure, other_legs, other_visited in labels:
+            if other_legs > legs or not other_visited <= visited:
+                continue
+            if (other_landed != landed) if max_gap is not None else (other_landed > landed):
+                continue
+            if objective != "price" and other_departure < first_departure:
+                continue
+            count += 1
+            if count >= k:
+                return True
+        return False
+
+    def _itinerary(self, rows): # This turns the rows of a finished label into the itinerary output
+        records = self.table.records
+        legs = [
+            {
+                "airline": flight.airline,
+                "from": flight.from_city,
+                "to": flight.to_city,
+                "departure_time": flight.departure_time,
+                "arrival_time": flight.arrival_time,
+                "price": flight.price
+            }
+            for flight in (records[row] for row in rows)
+        ]
+        return {
+            "legs": legs,
+            "stops": len(legs) - 1,
+            "total_price": sum(leg["price"] for leg in legs),
+            "total_duration_minutes": float(self.table.arrival[rows[-1]] - self.table.departure[rows[0]]) / 60,
+            "departure_time": legs[0]["departure_time"],
+            "arrival_time": legs[-1]["arrival_time"]
+        }
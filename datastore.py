@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import warnings
+from collections.abc import Sequence
+
+import telemetry
+from deltas import delta_path, delta_size, locked, read_deltas
+
+# The data files live next to this module, unless TRAVEL_PLANNER_DATA_DIR points somewhere else
+DATA_DIR = os.environ.get("TRAVEL_PLANNER_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+
+def data_path(name): # This returns the full path of a data file, independent of the current working directory
+    return os.path.join(DATA_DIR, name)
+
+# ----------------------------------
+# Shared base class for the in-memory indexes over the JSON data files
+# Each index loads its file once and reloads it only when the file's
+# modification time changes. When snapshot.py has compiled an up-to-date
+# binary snapshot of the file, the index is built from its memory-mapped
+# columns instead of the JSON. Lines appended to the file's delta file (see
+# deltas.py) are applied to the live structures, without a reload.
+# ----------------------------------
+
+def data_version(*names): # This returns the modification times of data files and the sizes of their delta files, usable as a cache key
+    return tuple((os.stat(data_path(name)).st_mtime_ns, delta_size(delta_path(data_path(name)))) for name in names)
+
+
+class RowView(Sequence): # A read-only view of some rows of a record list, in a given order, without copying the records
+    def __init__(self, records, rows):
+        self.records = records
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return RowView(self.records, self.rows[i])
+        return self.records[self.rows[i]]
+
+
+class ExtendedRecords(Sequence): # The records of a loaded file followed by the records added by deltas, without copying the loaded ones
+    def __init__(self, base, added):
+        self.base = base
+        self.added = added
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+            if row < 0:
+                raise IndexError("row out of range")
+        return self.base[row] if row < len(self.base) else self.added[row - len(self.base)]
+
+
+def extend_records(records, added): # This returns records followed by added, as a new sequence (records itself is not changed)
+    if isinstance(records, ExtendedRecords):
+        return ExtendedRecords(records.base, records.added + list(added))
+    return ExtendedRecords(records, list(added))
+
+
+def write_json(path, records): # This replaces a JSON data file in one step, so readers never see a half written file
+    temporary = path + ".writing"
+    with open(temporary, "w") as f:
+        json.dump(records, f, indent=4)
+    os.replace(temporary, path)
+
+
+class JsonFileIndex:
+    """
+    Base class of the indexes over the JSON data files.
+
+    Readers use an index without taking its lock, while another thread may be
+    reloading it or applying deltas. So _build, _build_snapshot and _apply_delta
+    compute the new structures on the side and only assign them to the index at
+    the end, all together: readers see the old index or the new one, never half
+    of each.
+    """
+
+    snapshot_name = None # the dataset name in snapshot.py, for indexes that can be built from a snapshot
+    id_field = None # the key of a row, for indexes that apply deltas (see deltas.py)
+    record_type = None # the record type of the rows (see records.py), to check the deltas
+
+    def __init__(self, path):
+        self.path = path
+        self.delta_path = delta_path(path)
+        self._mtime = None
+        self._delta_offset = 0 # bytes of the delta file applied so far
+        self._ids = None # id -> row, built when the first delta arrives
+        self._removed = set() # rows replaced or deleted by deltas since the last build
+        self._lock = threading.Lock()
+
+    @property
+    def records(self): # Subclasses return all their rows here, including the ones replaced by deltas
+        raise NotImplementedError
+
+    def _build(self, records): # Subclasses build their lookup structures from the loaded records here
+        raise NotImplementedError
+
+    def _build_snapshot(self, snapshot): # Subclasses with a snapshot_name build the same structures from a snapshot here
+        raise NotImplementedError
+
+    def _apply_delta(self, removed, added):
+        """
+        Subclasses with an id_field update their structures for one batch of deltas here.
+
+        The added rows come after the current records, so the records and every
+        structure that is not touched stay valid.
+
+        Args:
+            removed (list): Rows that were replaced or deleted
+            added (list): New rows, as dicts from the JSON file
+        """
+        raise NotImplementedError
+
+    def live_records(self): # This returns the records without the rows replaced or deleted by deltas
+        return self.refresh()._live_records()
+
+    def _live_records(self):
+        records, removed = self.records, self._removed
+        if not removed:
+            return records
+        return RowView(records, [row for row in range(len(records)) if row not in removed])
+
+    def _load(self, mtime): # This function (re)builds the index from the snapshot if there is a current one, else from the json file
+        with telemetry.span("load_index", file=os.path.basename(self.path)) as span:
+            snapshot = None
+            if self.snapshot_name:
+                from snapshot import open_snapshot # imported here, because snapshot.py imports this module
+                snapshot = open_snapshot(self.snapshot_name, self.path)
+
+            if snapshot is not None:
+                self._build_snapshot(snapshot)
+                span.set("source", "snapshot")
+                span.set("rows", snapshot.rows)
+            else:
+                with telemetry.span("json_load"):
+                    with open(self.path, "r") as f:
+                        records = json.load(f)
+                self._build(records)
+                span.set("source", "json")
+                span.set("rows", len(records))
+        telemetry.count("index_loads", file=os.path.basename(self.path))
+        self._mtime = mtime
+        self._delta_offset, self._ids, self._removed = 0, None, set()
+        if self.id_field:
+            self._apply_deltas() # the deltas not compacted yet are replayed on top of the file
+
+    def _apply_deltas(self): # This applies the delta lines appended since the last call
+        changes, offset = read_deltas(self.delta_path, self._delta_offset, self.id_field, self.record_type)
+        if changes:
+            with telemetry.span("apply_delta", file=os.path.basename(self.path)) as span:
+                records = self.records
+                if self._ids is None:
+                    self._ids = {getattr(record, self.id_field): row for row, record in enumerate(records)}
+                removed = [self._ids[key] for key in changes if key in self._ids]
+                added = [record for record in changes.values() if record is not None]
+                start = len(records)
+                try:
+                    self._apply_delta(removed, added)
+                except Exception as error: # nothing was swapped in yet; the batch is skipped, so it cannot stop every later refresh
+                    warnings.warn(f"skipped {len(changes)} deltas of {self.delta_path} after byte {self._delta_offset}: {error}")
+                    telemetry.count("delta_rows_skipped", len(changes), file=os.path.basename(self.path))
+                    self._delta_offset = offset
+                    return
+
+                for key in changes:
+                    self._ids.pop(key, None)
+                self._ids.update((record[self.id_field], start + i) for i, record in enumerate(added))
+                self._removed = self._removed | set(removed) # a new set, live_records may be reading the old one
+                span.set("rows", len(changes))
+            telemetry.count("delta_rows", len(changes), file=os.path.basename(self.path))
+        self._delta_offset = offset
+
+    def refresh(self): # This function reloads the data only when the file's modification time has changed, and applies new deltas
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime: # another thread may have reloaded while we waited for the lock
+                    self._load(mtime)
+        elif self.id_field and delta_size(self.delta_path) != self._delta_offset:
+            # one thread applies the deltas, the others keep reading the current structures instead of waiting for it
+            if self._lock.acquire(blocking=False):
+                try:
+                    if delta_size(self.delta_path) < self._delta_offset: # the delta file was emptied without compacting through this index
+                        self._load(os.stat(self.path).st_mtime_ns)
+                    else:
+                        self._apply_deltas()
+                finally:
+                    self._lock.release()
+        return self
+
+    def compact(self):
+        """
+        Writes the records with all deltas applied back to the data file, and empties the delta file.
+
+        The index is rebuilt from the same records first, without the replaced rows,
+        and readers keep using the current structures until the swap.
+
+        Returns:
+            bool: False if there were no deltas to compact
+        """
+        if not self.id_field or not delta_size(self.delta_path):
+            return False
+        self.refresh()
+        with self._lock, locked(self.delta_path) as deltas:
+            self._apply_deltas() # lines appended before we got the lock; nothing can be appended while we hold it
+            if not self._delta_offset:
+                return False
+            with telemetry.span("compact", file=os.path.basename(self.path)) as span:
+                records = [record.to_dict() for record in self._live_records()]
+                self._build(records)
+                write_json(self.path, records)
+                deltas.truncate(0)
+                self._mtime = os.stat(self.path).st_mtime_ns
+                self._delta_offset, self._ids, self._removed = 0, None, set()
+                span.set("rows", len(records))
+        telemetry.count("compactions", file=os.path.basename(self.path))
+
+        if self.snapshot_name:
+            from snapshot import SNAPSHOT_DIR, build_snapshot
+            if os.path.exists(os.path.join(SNAPSHOT_DIR, self.snapshot_name, "meta.json")): # a snapshot of the old file would be ignored from now on
+                build_snapshot(self.snapshot_name, self.path)
+        return True
@@ -0,0 +1,197 @@
+"""
+Change-data deltas for flights.json, hotels.json and places.json.
+
+Fare and availability feeds do not rewrite the data files. They append JSON
+lines to a delta file next to them (flights.delta.jsonl, hotels.delta.jsonl,
+places.delta.jsonl):
+
+    {"op": "upsert", "record": {"flight_id": "FL0001", "airline": "IndiGo", ..., "price": 2999}}
+    {"op": "delete", "id": "FL0002"}
+
+An upsert carries the whole row, and replaces the row with the same id (or
+adds it). A delete removes the row with that id. The indexes notice when a
+delta file grows and apply only the new lines to their live structures (see
+JsonFileIndex.refresh), instead of reloading the whole file.
+
+Compaction writes the rows with all deltas applied back to the base file and
+empties the delta file, so the delta file stays short. The app compacts
+every COMPACT_SECONDS; the command line can do it once or periodically.
+
+Usage:
+    python deltas.py append flights < changes.jsonl   # checks the lines and appends them to flights.delta.jsonl
+    python deltas.py compact [--every SECONDS]        # compacts all three datasets, once or periodically
+"""
+
+import json
+import os
+import sys
+import threading
+import warnings
+from contextlib import contextmanager
+
+from records import Flight, Hotel, Place
+
+try:
+    import fcntl # appends and compaction lock the delta file, so no line is lost in between
+except ImportError: # not on Windows, where a single writer is assumed
+    fcntl = None
+
+# dataset -> (data file, id field, record type)
+DATASETS = {
+    "flights": ("flights.json", "flight_id", Flight),
+    "hotels": ("hotels.json", "hotel_id", Hotel),
+    "places": ("places.json", "place_id", Place)
+}
+COMPACT_SECONDS = float(os.environ.get("TRAVEL_PLANNER_COMPACT_SECONDS", 600))
+
+
+def delta_path(path): # This returns the delta file of a data file, e.g. flights.json -> flights.delta.jsonl
+    return os.path.splitext(path)[0] + ".delta.jsonl"
+
+
+def delta_size(path): # The size of a delta file in bytes, 0 if there is none
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+@contextmanager
+def locked(path): # This opens a delta file for appending, holding an exclusive lock on it
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def check_op(op, id_field, record_type=None):
+    """
+    Checks one delta operation.
+
+    Args:
+        op (dict): {"op": "upsert", "record": {...}} or {"op": "delete", "id": "..."}
+        id_field (str): The key of a row, e.g. "flight_id"
+        record_type (type | None): The record type of the rows (see records.py), to check upserted records
+
+    Returns:
+        tuple: (id, record), with record None for a delete
+
+    Raises:
+        ValueError: If the operation is malformed
+    """
+    if not isinstance(op, dict):
+        raise ValueError(f"a delta must be a JSON object, not {op!r}")
+    kind = op.get("op")
+    if kind == "upsert":
+        record = op.get("record")
+        if not isinstance(record, dict) or not isinstance(record.get(id_field), str):
+            raise ValueError(f"an upsert needs a record with a string {id_field!r}: {op!r}")
+        if record_type is not None:
+            record_type.check(record)
+        return record[id_field], record
+    if kind == "delete":
+        if not isinstance(op.get("id"), str):
+            raise ValueError(f"a delete needs a string 'id': {op!r}")
+        return op["id"], None
+    raise ValueError(f"unknown delta op {kind!r}, expected 'upsert' or 'delete'")
+
+
+def read_deltas(path, offset, id_field, record_type=None):
+    """
+    Reads the complete delta lines appended after an offset.
+
+    A line that is still being written (no newline yet) is left for the next call.
+    A malformed line is skipped with a warning; raising would stop every reader
+    at the same line for good.
+
+    Args:
+        path (str): Delta file
+        offset (int): Byte offset of the first unread line
+        id_field (str): The key of a row
+        record_type (type | None): The record type of the rows, to check upserted records
+
+    Returns:
+        tuple: (dict of id -> record or None in the order the ids last changed, offset after the last complete line)
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return {}, offset
+    data = data[:data.rfind(b"\n") + 1]
+
+    # only the last operation per id matters, so a batch collapses to one change per id
+    changes = {}
+    for number, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            key, record = check_op(json.loads(line), id_field, record_type)
+        except ValueError as error: # includes JSON decode errors
+            warnings.warn(f"skipped delta {path}, line {number} after byte {offset}: {error}")
+            continue
+        changes.pop(key, None)
+        changes[key] = record
+    return changes, offset + len(data)
+
+
+def append_deltas(path, ops, id_field, record_type=None): # This checks delta operations and appends them to the delta file of a data file, returns the count
+    lines = []
+    for op in ops:
+        check_op(op, id_field, record_type)
+        lines.append(json.dumps(op) + "\n")
+    with locked(delta_path(path)) as f:
+        f.writelines(lines)
+    return len(lines)
+
+
+def compact_periodically(indexes, interval=COMPACT_SECONDS): # This compacts the indexes every interval seconds on a daemon thread, until the returned event is set
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            for index in indexes:
+                try:
+                    index.compact()
+                except Exception as error: # a failed compaction leaves the base and delta files as they were, so we try again next time
+                    warnings.warn(f"compacting {index.path} failed: {error}")
+
+    threading.Thread(target=run, name="delta-compaction", daemon=True).start()
+    return stop
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    append = commands.add_parser("append", help="append delta lines from stdin")
+    append.add_argument("dataset", choices=sorted(DATASETS))
+    compact = commands.add_parser("compact", help="fold the deltas into the data files")
+    compact.add_argument("--every", type=float, help="keep compacting every SECONDS")
+    args = parser.parse_args()
+
+    if args.command == "append":
+        from datastore import data_path
+        file_name, id_field, record_type = DATASETS[args.dataset]
+        count = append_deltas(data_path(file_name), (json.loads(line) for line in sys.stdin if line.strip()), id_field, record_type)
+        print(f"appended {count} deltas to {delta_path(data_path(file_name))}")
+        return
+
+    from flight import get_flight_index
+    from hotels import get_hotel_index
+    from places import get_place_index
+    indexes = [get_flight_index(), get_hotel_index(), get_place_index()]
+    if args.every:
+        compact_periodically(indexes, args.every).wait()
+    for index in indexes:
+        print(f"{index.path}: {'compacted' if index.compact() else 'no deltas'}")
+
+
+if __name__ == "__main__":
+    main()
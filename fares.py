@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# ----------------------------------
+# Fare calendar
+# The cheapest fare and the shortest flight of every route, per departure
+# day, so "which day this month is cheapest" is one lookup instead of one
+# flight search per day. Days are UTC days, like the departure times of
+# the FlightTable.
+# ----------------------------------
+
+DAY_SECONDS = 24 * 60 * 60
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(day): # This returns the number of days since 1970-01-01 of a date
+    return (day - EPOCH).days
+
+
+class RouteFares: # This class holds the per-day minimums of one route, sorted by day
+    def __init__(self, table, route):
+        # the route's rows are already sorted by departure, so every day is one run of rows (a route has at least one row)
+        days = route.departures // DAY_SECONDS
+        starts = np.flatnonzero(np.diff(days, prepend=days[0] - 1))
+        self.days = days[starts]
+        self.min_price = np.minimum.reduceat(table.price[route.by_departure], starts)
+        self.min_duration = np.minimum.reduceat(table.duration[route.by_departure], starts)
+        self.flights = np.diff(np.append(starts, len(days))) # number of flights per day
+
+    def between(self, first, last): # This returns the positions of the days first..last (day numbers, inclusive)
+        return slice(np.searchsorted(self.days, first, "left"), np.searchsorted(self.days, last, "right"))
+
+
+class FareCalendar: # This class holds the RouteFares of every route of a FlightIndex
+    def __init__(self, routes, fares):
+        self.source = routes # the route map this calendar was built from, to tell when it is out of date
+        self.fares = fares # (normalized from, normalized to) -> RouteFares
+
+    @classmethod
+    def build(cls, table, routes):
+        return cls(routes, {key: RouteFares(table, route) for key, route in routes.items()})
+
+    def updated(self, table, routes, changed): # This returns a new calendar in which only the changed routes are computed again
+        fares = dict(self.fares)
+        for key in changed:
+            if key in routes:
+                fares[key] = RouteFares(table, routes[key])
+            else:
+                fares.pop(key, None)
+        return FareCalendar(routes, fares)
+
+    def days(self, key, first, last):
+        """
+        Returns the per-day minimums of a route between two dates.
+
+        Args:
+            key (tuple): (normalized from, normalized to)
+            first (date): First day
+            last (date): Last day (inclusive)
+
+        Returns:
+            list: {"date", "min_price", "min_duration_minutes", "flights"} for every day with a flight, in date order
+        """
+        fares = self.fares.get(key)
+        if fares is None:
+            return []
+        cut = fares.between(day_number(first), day_number(last))
+        return [
+            {
+                "date": (EPOCH + timedelta(days=day)).isoformat(),
+                "min_price": price,
+                "min_duration_minutes": duration,
+                "flights": flights
+            }
+            for day, price, duration, flights in zip(
+                fares.days[cut].tolist(), fares.min_price[cut].tolist(), fares.min_duration[cut].tolist(), fares.flights[cut].tolist()
+            )
+        ]
+
+    def month(self, key, year, month): # The per-day minimums of a route for one calendar month
+        first = date(year, month, 1)
+        following = date(year + month // 12, month % 12 + 1, 1)
+        return self.days(key, first, following - timedelta(days=1))
@@ -1,52 +1,354 @@
-import json
+import warnings
+from datetime import date, datetime, timedelta, timezone
+from typing import Annotated, Optional
 
-def load_flights(): # Here we create a function which loads the required json file
-    with open("flights.json", "r") as f:
-        return json.load(f)  
+import numpy as np
+from pydantic import Field
 
+from connections import ConnectionGraph, to_epoch_seconds
+import telemetry
+from datastore import JsonFileIndex, data_path, extend_records
+from fares import FareCalendar
+from records import Flight
 
+def load_flights(): # Here we create a function which returns the flights, as the index's read-only Flight records
+    return get_flight_index().live_records()
 
-# Now we filter flights based on source and destination
-def filter_flights(source, destination): # here we create a function which filters the flights
-    flights = load_flights() # here we call the load fucntion, because we need the json file which contains the flight data
-    return [
-        flight for flight in flights
-        if flight["from"].strip().lower() == source.strip().lower()
-        and flight["to"].strip().lower() == destination.strip().lower() # Now we return the flights source and destination
-    ]
 
 
+def normalize_city(city): # This function gives one canonical key for a city name, so "  Delhi" and "delhi" match
+    return city.strip().lower()
 
 
-# Now we will create a function to rank flights from Cheapest or Fastest
+def parse_epoch_seconds(times): # This function converts a list of ISO date time strings into a NumPy array of epoch seconds
+    try:
+        with warnings.catch_warnings(): # numpy warns (but converts to UTC correctly) when a string carries a utc offset
+            warnings.simplefilter("ignore", UserWarning)
+            return np.array(times, dtype="datetime64[s]").astype(np.int64) # numpy parses the whole column in one go
+    except ValueError:
+        # strings numpy cannot parse fall back to datetime, one row at a time
+        return np.array([_epoch_seconds(t) for t in times], dtype=np.int64)
 
-# Before the function, first we have to calculate the duration based on departure time and arrival time
 
-from datetime import datetime
+def _epoch_seconds(time): # naive times are read as UTC, the same way numpy reads them
+    moment = datetime.fromisoformat(time)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
 
-def calculate_duration(departure_time, arrival_time):
-    departure = datetime.fromisoformat(departure_time) # it converts the date time string into date time python object
-    arrival = datetime.fromisoformat(arrival_time)
-    duration = arrival - departure # here we will calculate the duration
-    return duration.total_seconds() / 60  # we will convert the duration into minutes
 
+class FlightTable: # This class stores the flights column by column in NumPy arrays
+    def __init__(self, flights):
+        self.records = flights # the Flight records, used to build the tool output
+        self.cities = sorted({normalize_city(f.from_city) for f in flights} | {normalize_city(f.to_city) for f in flights})
+        self.city_codes = {city: code for code, city in enumerate(self.cities)} # normalized city name -> integer code
+        names = {}
+        for f in flights:
+            names.setdefault(normalize_city(f.from_city), f.from_city)
+            names.setdefault(normalize_city(f.to_city), f.to_city)
+        self.city_names = [names[city] for city in self.cities] # the spelling used in the file, for display
 
+        self.from_code = np.array([self.city_codes[normalize_city(f.from_city)] for f in flights], dtype=np.int32)
+        self.to_code = np.array([self.city_codes[normalize_city(f.to_city)] for f in flights], dtype=np.int32)
+        self.departure = parse_epoch_seconds([f.departure_time for f in flights])
+        self.arrival = parse_epoch_seconds([f.arrival_time for f in flights])
+        self.duration = (self.arrival - self.departure) / 60 # duration in minutes, computed once for every flight
+        self.price = np.array([f.price for f in flights], dtype=np.int64)
+        self.alive = None # boolean mask of the rows not replaced or deleted by deltas, None while all rows are
 
+    @classmethod
+    def from_snapshot(cls, snapshot): # This builds the table from the memory-mapped columns of a snapshot, without copying them
+        table = cls.__new__(cls)
+        table.records = snapshot.records(Flight) # decoded one flight at a time, only when a flight is looked at
+        table.cities = snapshot.dictionary("cities")
+        table.city_codes = {city: code for code, city in enumerate(table.cities)}
+        table.city_names = snapshot.dictionary("city_names")
+        table.from_code = snapshot.column("from_code")
+        table.to_code = snapshot.column("to_code")
+        table.departure = snapshot.column("departure")
+        table.arrival = snapshot.column("arrival")
+        table.duration = snapshot.column("duration")
+        table.price = snapshot.column("price")
+        table.alive = None
+        return table
 
-def select_best_flight(flights, preference='cheapest'): # This function selects best flight based on user preference (cheapest or fastest)
-    if not flights: # This if block returns "None", if the list of flights is empty instead of runtime error
-        return None
+    def extend(self, flights, removed=()): # This returns a new table with flights appended and the removed rows marked dead; this table is not changed
+        table = FlightTable.__new__(FlightTable)
+        table.records = extend_records(self.records, flights)
+        table.cities, table.city_codes, table.city_names = list(self.cities), dict(self.city_codes), list(self.city_names)
+        for f in flights:
+            for name in (f.from_city, f.to_city):
+                if normalize_city(name) not in table.city_codes: # new cities get the next codes, so the existing codes stay valid
+                    table.city_codes[normalize_city(name)] = len(table.cities)
+                    table.cities.append(normalize_city(name))
+                    table.city_names.append(name)
 
-    if preference == "fastest": # If user preference is fastest flight, then this if block will be executed
-        return min(
-            flights,
-            key=lambda x: calculate_duration(
-                x["departure_time"], x["arrival_time"] # here we call the function to calculate the duration
-            )
-        ) # this will return the flight with minimum duration
+        added = {
+            "from_code": np.array([table.city_codes[normalize_city(f.from_city)] for f in flights], dtype=np.int32),
+            "to_code": np.array([table.city_codes[normalize_city(f.to_city)] for f in flights], dtype=np.int32),
+            "departure": parse_epoch_seconds([f.departure_time for f in flights]),
+            "arrival": parse_epoch_seconds([f.arrival_time for f in flights]),
+            "price": np.array([f.price for f in flights], dtype=np.int64)
+        }
+        added["duration"] = (added["arrival"] - added["departure"]) / 60
+        for name, values in added.items():
+            setattr(table, name, np.concatenate((getattr(self, name), values.astype(getattr(self, name).dtype, copy=False))))
+
+        table.alive = np.ones(len(table), dtype=bool)
+        if self.alive is not None:
+            table.alive[:len(self)] = self.alive
+        table.alive[np.asarray(removed, dtype=np.int64)] = False
+        return table
+
+    def __len__(self):
+        return len(self.records)
+
+    def code(self, city): # This returns the integer code of a city, or None if no flight touches it
+        return self.city_codes.get(normalize_city(city))
+
+    def select(self, source, destination): # This returns the row numbers of all flights from source to destination
+        source_code, destination_code = self.code(source), self.code(destination)
+        if source_code is None or destination_code is None:
+            return np.empty(0, dtype=np.int64)
+        matches = (self.from_code == source_code) & (self.to_code == destination_code)
+        return np.flatnonzero(matches if self.alive is None else matches & self.alive)
+
+    def best_row(self, rows, preference="cheapest"): # This returns the row of the best flight among the given rows, or None
+        if len(rows) == 0:
+            return None
+        column = self.duration if preference == "fastest" else self.price
+        return int(rows[np.argmin(column[rows])]) # argmin returns the first minimum, just like min() did
+
+
+class FlightRoute: # This class holds the rows of one (from, to) route, plus its precomputed orderings
+    def __init__(self, rows, by_price, by_duration, by_departure, departures):
+        self.rows = rows # row numbers into the FlightTable, in file order
+        self.by_price = by_price # row numbers, cheapest first
+        self.by_duration = by_duration # row numbers, fastest first
+        self.by_departure = by_departure # row numbers, earliest departure first
+        self.departures = departures # the departure times (epoch seconds) of by_departure, for binary search
+
+    def departing(self, earliest=None, latest=None): # This returns the rows departing between earliest and latest (inclusive), earliest first
+        low = 0 if earliest is None else np.searchsorted(self.departures, earliest, "left")
+        high = len(self.departures) if latest is None else np.searchsorted(self.departures, latest, "right")
+        return self.by_departure[low:high]
+
+
+# The arrays returned by route_arrays, in order (snapshot.py stores them under these names)
+ROUTE_COLUMNS = ("route_codes", "route_starts", "in_file_order", "by_price", "by_duration", "by_departure", "route_departures")
+
+
+def route_arrays(table): # This function sorts all rows of a FlightTable by route in one vectorized pass
+    route_code = table.from_code.astype(np.int64) * len(table.cities) + table.to_code
+    # lexsort sorts by the last key first, and it is stable, so ties keep the file order
+    in_file_order = np.argsort(route_code, kind="stable")
+    by_price = np.lexsort((table.price, route_code))
+    by_duration = np.lexsort((table.duration, route_code))
+    by_departure = np.lexsort((table.departure, route_code))
+    route_departures = table.departure[by_departure] # one gather here, so each route's departure times are a slice
+
+    codes, starts = np.unique(route_code[in_file_order], return_index=True)
+    return codes, starts, in_file_order, by_price, by_duration, by_departure, route_departures
+
+
+def split_routes(table, codes, starts, in_file_order, by_price, by_duration, by_departure, route_departures): # This function cuts the sorted rows into one FlightRoute per route
+    ends = np.append(starts[1:], len(table))
+    routes = {}
+    for code, start, end in zip(codes.tolist(), starts.tolist(), ends.tolist()):
+        key = (table.cities[code // len(table.cities)], table.cities[code % len(table.cities)])
+        routes[key] = FlightRoute(
+            in_file_order[start:end], by_price[start:end], by_duration[start:end], by_departure[start:end], route_departures[start:end]
+        )
+    return routes
+
+
+def route_of_rows(table, rows): # This builds the FlightRoute of some rows given in file order, sorted the same way as split_routes sorts
+    by_departure = rows[np.argsort(table.departure[rows], kind="stable")]
+    return FlightRoute(
+        rows,
+        rows[np.argsort(table.price[rows], kind="stable")],
+        rows[np.argsort(table.duration[rows], kind="stable")],
+        by_departure,
+        table.departure[by_departure]
+    )
+
+
+MAX_FLEXIBILITY_DAYS = 30 # a wider window is as good as "any day", and a huge one would leave the calendar
+
+
+def departure_window(departure_date=None, flexibility_days=0):
+    """
+    Turns a departure date and a number of flexible days into a departure time window.
+
+    Args:
+        departure_date (str | date | None): The day to fly (ISO date), None for any day
+        flexibility_days (int): Days the flight may leave before or after that day (at most MAX_FLEXIBILITY_DAYS)
+
+    Returns:
+        tuple: (earliest, latest) departure in epoch seconds, both inclusive, or (None, None) for any day
+
+    Raises:
+        ValueError: If the date is not YYYY-MM-DD (OverflowError for a date at the very end of the calendar)
+    """
+    if departure_date is None or departure_date == "":
+        return None, None
+    if isinstance(departure_date, str):
+        departure_date = date.fromisoformat(departure_date[:10])
+    flexibility = timedelta(days=min(max(0, int(flexibility_days or 0)), MAX_FLEXIBILITY_DAYS))
+    first, last = departure_date - flexibility, departure_date + flexibility
+    # the times in flights.json are read as UTC (see parse_epoch_seconds), so the days are UTC days too
+    return to_epoch_seconds(datetime(first.year, first.month, first.day)), to_epoch_seconds(datetime(last.year, last.month, last.day)) + 24 * 60 * 60 - 1
+
+
+def group_routes(table): # This function groups all rows of a FlightTable by route, each route sorted by price and duration
+    if len(table) == 0:
+        return {}
+    return split_routes(table, *route_arrays(table))
 
-    return min(flights, key=lambda x: x["price"]) # if user preference is cheapest, this will return cheaper flight
 
+class FlightIndex(JsonFileIndex): # This class loads flights.json once and answers (from, to) lookups from a hash map
+    snapshot_name = "flights"
+    id_field = "flight_id"
+    record_type = Flight
+
+    def __init__(self, path=None):
+        super().__init__(path or data_path("flights.json"))
+        self.table = FlightTable([])
+        self.routes = {} # (normalized from, normalized to) -> FlightRoute
+        self.sources = [] # city names with departing flights, sorted
+        self.destinations = [] # city names with arriving flights, sorted
+        self.destinations_by_source = {} # normalized from -> sorted city names reachable with one flight
+        self._graph = None # ConnectionGraph, built on first use
+        self._fares = None # FareCalendar, built on first use and then kept up to date with the deltas
+
+    @property
+    def records(self):
+        return self.table.records
+
+    flights = records
+
+    def _build(self, records): # This function builds the columnar table and the route map
+        table = FlightTable([Flight.from_dict(record) for record in records])
+        self._install(table, group_routes(table))
+
+    def _build_snapshot(self, snapshot): # The snapshot already holds the table columns and the sorted routes
+        table = FlightTable.from_snapshot(snapshot)
+        routes = split_routes(table, *(snapshot.column(name) for name in ROUTE_COLUMNS)) if len(table) else {}
+        self._install(table, routes)
+
+    def _apply_delta(self, removed, added): # Only the routes of the removed and added flights are sorted again
+        start = len(self.table)
+        table = self.table.extend([Flight.from_dict(record) for record in added], removed)
+        changed = {} # route -> (removed rows, added rows)
+        for row in removed:
+            key = (table.cities[table.from_code[row]], table.cities[table.to_code[row]])
+            changed.setdefault(key, ([], []))[0].append(row)
+        for row in range(start, len(table)):
+            key = (table.cities[table.from_code[row]], table.cities[table.to_code[row]])
+            changed.setdefault(key, ([], []))[1].append(row)
+
+        routes = dict(self.routes)
+        for key, (gone, new) in changed.items():
+            rows = routes[key].rows if key in routes else np.empty(0, dtype=np.int64)
+            rows = np.concatenate((rows[~np.isin(rows, gone)], np.array(new, dtype=rows.dtype)))
+            if len(rows):
+                routes[key] = route_of_rows(table, rows)
+            else:
+                routes.pop(key, None)
+        self._install(table, routes, changed)
+
+    def _install(self, table, routes, changed=None): # changed: the routes a delta touched, None for a full build
+        fares = self._fares
+        if changed is None or fares is None or fares.source is not self.routes:
+            fares = None
+        else:
+            fares = fares.updated(table, routes, changed)
+
+        # the dropdown lists of the app are derived here once, instead of on every rerun
+        names = dict(zip(table.cities, table.city_names))
+        sources = sorted({names[source] for source, _ in routes})
+        destinations = sorted({names[destination] for _, destination in routes})
+        destinations_by_source = {}
+        for source, destination in routes:
+            destinations_by_source.setdefault(source, []).append(names[destination])
+        for reachable in destinations_by_source.values():
+            reachable.sort()
+
+        self.table, self.routes, self._graph, self._fares = table, routes, None, fares
+        self.sources, self.destinations, self.destinations_by_source = sources, destinations, destinations_by_source
+
+    def destinations_from(self, source): # This returns the cities reachable from source with one flight, sorted
+        self.refresh()
+        return self.destinations_by_source.get(normalize_city(source), [])
+
+    def route(self, source, destination): # This returns the FlightRoute for a source and destination, or None
+        self.refresh()
+        return self.routes.get((normalize_city(source), normalize_city(destination)))
+
+    def find(self, source, destination): # This returns the matching flights in file order
+        route = self.route(source, destination)
+        if not route:
+            return []
+        records = self.table.records
+        return [records[row] for row in route.rows.tolist()]
+
+    def best(self, source, destination, preference="cheapest", earliest_departure=None, latest_departure=None):
+        """
+        Finds the best direct flight, optionally within a departure window.
+
+        Args:
+            source (str): Source city
+            destination (str): Destination city
+            preference (str): 'cheapest' or 'fastest'
+            earliest_departure, latest_departure: Optional window for the departure, both inclusive
+                (ISO string, datetime or epoch seconds)
+
+        Returns:
+            tuple | None: (flight, duration in minutes), or None if no flight matches
+        """
+        route = self.route(source, destination)
+        telemetry.count("route_lookups", result="hit" if route else "miss")
+        if not route:
+            return None
+        table = self.table
+        if earliest_departure is None and latest_departure is None:
+            row = int(route.by_duration[0] if preference == "fastest" else route.by_price[0])
+            return table.records[row], float(table.duration[row])
+
+        # two binary searches find the flights of the window, then one pass over just those picks the best
+        rows = route.departing(to_epoch_seconds(earliest_departure), to_epoch_seconds(latest_departure))
+        telemetry.count("rows_scanned", len(rows), dataset="flights")
+        if not len(rows):
+            return None
+        values = (table.duration if preference == "fastest" else table.price)[rows]
+        row = int(rows[values == values.min()].min()) # the earliest in the file on ties, like by_price and by_duration
+        return table.records[row], float(table.duration[row])
+
+    def fare_calendar(self): # This returns the FareCalendar of the loaded flights
+        self.refresh()
+        table, routes, fares = self.table, self.routes, self._fares
+        if fares is None or fares.source is not routes:
+            with telemetry.span("build_fare_calendar"):
+                fares = self._fares = FareCalendar.build(table, routes)
+        return fares
+
+    def connections(self, source, destination, preference="cheapest", k=3, **options): # This returns the k best connecting itineraries
+        self.refresh()
+        with telemetry.span("connection_search") as span:
+            graph = self._graph
+            if graph is None or graph.table is not self.table: # the adjacency lists are built once per loaded table
+                with telemetry.span("build_connection_graph"):
+                    graph = self._graph = ConnectionGraph(self.table)
+            objective = "elapsed" if preference == "fastest" else "price"
+            found = graph.search(source, destination, k=k, objective=objective, **options)
+            span.set("itineraries", len(found))
+            return found
+
+
+_flight_index = FlightIndex()
+
+def get_flight_index(): # This returns the shared flight index, reloaded if flights.json has changed
+    return _flight_index.refresh()
 
 
 
@@ -55,37 +357,93 @@ from langchain.tools import tool
 
 @tool # this decorator wraps the function into an object called tool, which the agent can use.
 # it also adds extra behaviour like: argument handling, structured output.
-def flight_search_tool(source: str, destination: str, preference: str): 
+@telemetry.traced("flight_search_tool")
+def flight_search_tool(source: str, destination: str, preference: str, departure_date: Optional[str] = None,
+                       flexibility_days: Annotated[int, Field(ge=0, le=MAX_FLEXIBILITY_DAYS)] = 0):
     """
     Finds the best flight given a source, destination, and user preference (cheapest or fastest).
+    Optionally, only flights departing on departure_date (YYYY-MM-DD), or up to flexibility_days days before or after it.
     """ # This doctstring tells the agent what the tool does.
-    flights = filter_flights(source, destination) # this calls the funstion to filter the flight based on source and destination
-    best = select_best_flight(flights, preference) # this calls the function to select the best flight based on user preference
-    if not best:
+    index = get_flight_index()
+    try:
+        earliest, latest = departure_window(departure_date, flexibility_days)
+    except (TypeError, ValueError):
+        return {"message": f"Departure date must look like YYYY-MM-DD (e.g. 2025-05-13), not {departure_date!r}."}
+    except OverflowError:
+        return {"message": f"Departure date {departure_date} is out of range."}
+    when = ""
+    if earliest is not None:
+        flexibility_days = min(max(0, int(flexibility_days or 0)), MAX_FLEXIBILITY_DAYS)
+        when = f" on {departure_date}" + (f" (±{flexibility_days} days)" if flexibility_days else "")
+    # the index keeps each route pre-sorted by price, duration and departure time, so this is a lookup (or two binary searches)
+    found = index.best(source, destination, preference, earliest, latest)
+    if not found:
+        # no direct flight, so we look for connecting itineraries (whose first flight leaves in the same window)
+        connections = index.connections(source, destination, preference, earliest_departure=earliest, latest_departure=latest)
+        if connections:
+            return {
+                "connections": connections,
+                "message": f"No direct flights from {source} to {destination}{when}, but found {len(connections)} connecting itineraries."
+            }
         result = {
-            "message": f"No flights found from {source} to {destination}."
+            "message": f"No flights found from {source} to {destination}{when}."
         }
         return result
-        
-    duration = calculate_duration(best["departure_time"], best["arrival_time"])
+
+    best, duration = found
     result = {
         "flight": {
-            "airline": best["airline"],
-            "price": best["price"],
+            "airline": best.airline,
+            "price": best.price,
             "duration_minutes": duration,
-            "departure_time": best["departure_time"]
+            "departure_time": best.departure_time
         },
-        "message": f"Best flight from {source} to {destination}: {best['airline']} at ${best['price']}."
+        "message": f"Best flight from {source} to {destination}: {best.airline} at ${best.price}."
     } # this will the return the best flight information like airline, price, duration in minutes and departure time
 
     return result
 
 
-# This gives the structured output
-output = flight_search_tool.invoke({
-    "source": "Hyderabad",
-    "destination": "Delhi",
-    "preference": "fastest"
-})
+@tool
+@telemetry.traced("fare_calendar_tool")
+def fare_calendar_tool(source: str, destination: str, month: str):
+    """
+    Gives the cheapest fare and the shortest flight time for every day of a month (YYYY-MM) on a direct route,
+    and the cheapest day. Use it for flexible-date questions like "which day this month is cheapest".
+    """
+    try:
+        year, month_number = (int(part) for part in month.strip()[:7].split("-"))
+        if not 1 <= month_number <= 12:
+            raise ValueError
+    except ValueError:
+        return {"message": f"Month must look like 2025-01, not {month!r}."}
+    try: # the month and the one after it must both be dates, e.g. not 9999-12
+        date(year, month_number, 1), date(year + month_number // 12, month_number % 12 + 1, 1)
+    except ValueError:
+        return {"message": f"Month {month} is out of range."}
+
+    key = (normalize_city(source), normalize_city(destination))
+    days = get_flight_index().fare_calendar().month(key, year, month_number) # precomputed per route and day, so this is one lookup
+    label = f"{year:04d}-{month_number:02d}"
+    if not days:
+        return {"message": f"No direct flights from {source} to {destination} in {label}."}
+
+    cheapest = min(days, key=lambda day: day["min_price"]) # the earliest day on ties
+    fastest = min(days, key=lambda day: day["min_duration_minutes"])
+    return {
+        "calendar": days,
+        "cheapest_day": cheapest,
+        "fastest_day": fastest,
+        "message": f"Cheapest day from {source} to {destination} in {label}: {cheapest['date']} at ${cheapest['min_price']}."
+    }
+
+
+if __name__ == "__main__":
+    # This gives the structured output
+    output = flight_search_tool.invoke({
+        "source": "Hyderabad",
+        "destination": "Delhi",
+        "preference": "fastest"
+    })
 
-print(output)
\ No newline at end of file
+    print(output)
@@ -1,63 +1,292 @@
-import json
+from bisect import bisect_left, bisect_right
+from typing import List, Optional
 
-def load_hotels(): # Here we create a function which loads the required json file
-    with open("hotels.json", "r") as f:
-        return json.load(f)  
+import numpy as np
 
+import telemetry
+from datastore import JsonFileIndex, RowView, data_path, extend_records
+from records import Hotel
 
-def filter_hotels(city, rating, price): # This function will filter the hotels based on city, rating and price per night
-    hotels = load_hotels() # This will load the json file with the hotel data
-    return [
-        hotel for hotel in hotels
-        if hotel["city"].lower() == city.lower()
-        and int(hotel["stars"]) >= rating
-        and int(hotel["price_per_night"]) <= price  # This will return the hotels with given city, higher rating and lower price per night
-    ]
+def load_hotels(): # Here we create a function which returns the hotels, as the index's read-only Hotel records
+    return get_hotel_index().live_records()
 
 
-def rank_hotels(hotels, preference='cheapest'): # This function will rank the hotels based on high rating and low price
-    if not hotels:
-        return None
-    if preference == "highest_rating": # this if block will be executed if user preference is higher rating
-        return max(hotels, key=lambda x: x['stars']) # this will return the hotel with maximun rating
+def amenity_key(amenity): # This gives one canonical key for an amenity name, so " WiFi" and "wifi" match
+    return amenity.strip().lower()
 
-    return min(hotels, key=lambda x: x['price_per_night']) # if user preference is cheaper price, this will return cheaper hotels
 
+def amenity_masks(amenity_lists):
+    """
+    Numbers every amenity, and turns amenity lists into bitmasks.
+
+    Args:
+        amenity_lists (list): Distinct amenity lists (each hotel refers to one of them)
+
+    Returns:
+        tuple: (amenity key -> bit number, uint64 array with one row of 64-bit words per list)
+    """
+    bits = {}
+    for amenities in amenity_lists:
+        for amenity in amenities:
+            bits.setdefault(amenity_key(amenity), len(bits))
+
+    masks = np.zeros((len(amenity_lists), max(1, (len(bits) + 63) // 64)), dtype=np.uint64) # more than 64 amenities take more words
+    for row, amenities in enumerate(amenity_lists):
+        for amenity in amenities:
+            bit = bits[amenity_key(amenity)]
+            masks[row, bit // 64] |= np.uint64(1 << (bit % 64))
+    return bits, masks
+
+
+def amenity_query(bits, words, amenities): # This returns the bitmask of the requested amenities, or None if no hotel has one of them
+    query = np.zeros(words, dtype=np.uint64)
+    for amenity in amenities:
+        bit = bits.get(amenity_key(amenity))
+        if bit is None:
+            return None
+        query[bit // 64] |= np.uint64(1 << (bit % 64))
+    return query
+
+
+class CityHotels: # This class holds the hotels of one city, sorted by price, with structures for rating and amenity queries
+    def __init__(self, positions, prices, stars, masks, amenity_bits, records):
+        # the entries are sorted by price, then file order; positions are the rows of the hotels in hotels.json
+        self.prices = prices # ascending, for bisect range cuts
+        self.positions = positions
+        self.stars = stars
+        self.masks = masks # amenity bitmask of every entry, one row of uint64 words each
+        self.amenity_bits = amenity_bits # amenity key -> bit number, shared by all cities of one index build
+        self.hotels = RowView(records, positions)
+
+        # best_rated[i] is the entry with the most stars among the i+1 cheapest hotels (earliest in the file on ties)
+        self.best_rated = []
+        best = None
+        for i in range(len(positions)):
+            if best is None or (self.stars[i], -self.positions[i]) > (self.stars[best], -self.positions[best]):
+                best = i
+            self.best_rated.append(best)
+
+        # per-star thresholds: for every star level s, the entries with stars >= s, still sorted by price
+        self.star_levels = sorted(set(self.stars))
+        self.by_stars = [[i for i in range(len(positions)) if self.stars[i] >= level] for level in self.star_levels]
+        self.by_stars_prices = [[self.prices[i] for i in entries_at_level] for entries_at_level in self.by_stars]
+
+    def _level(self, rating): # This returns the position of the lowest star level >= rating, or None
+        level = bisect_left(self.star_levels, rating)
+        return level if level < len(self.star_levels) else None
+
+    def with_amenities(self, entries, amenities): # This keeps the entries that have all the amenities, in the same order
+        query = amenity_query(self.amenity_bits, self.masks.shape[1], amenities)
+        if query is None or not len(entries):
+            return []
+        entries = np.asarray(entries)
+        telemetry.count("rows_scanned", len(entries), dataset="hotels")
+        # one vectorized AND over the bitmasks of all entries, instead of list membership tests per hotel
+        keep = ((self.masks[entries] & query) == query).all(axis=1)
+        return entries[keep].tolist()
+
+    def within(self, rating, price, amenities=None): # This returns the entries with stars >= rating, price <= price and the amenities, cheapest first
+        level = self._level(rating)
+        if level is None:
+            return []
+        entries = self.by_stars[level][:bisect_right(self.by_stars_prices[level], price)]
+        return self.with_amenities(entries, amenities) if amenities else entries
+
+    def cheapest(self, rating, price, amenities=None): # This returns the cheapest hotel with stars >= rating, price <= price and the amenities, or None
+        if amenities:
+            entries = self.within(rating, price, amenities)
+            return self.hotels[entries[0]] if entries else None
+        level = self._level(rating)
+        if level is None or not self.by_stars[level] or self.by_stars_prices[level][0] > price:
+            return None
+        return self.hotels[self.by_stars[level][0]]
+
+    def highest_rated(self, rating, price, amenities=None): # This returns the highest rated hotel with price <= price (and stars >= rating, and the amenities), or None
+        if amenities:
+            entries = self.within(rating, price, amenities)
+            if not entries:
+                return None
+            best = max(entries, key=lambda i: (self.stars[i], -self.positions[i])) # earliest in the file on ties, like best_rated
+            return self.hotels[best]
+        cut = bisect_right(self.prices, price)
+        if cut == 0:
+            return None
+        best = self.best_rated[cut - 1]
+        return self.hotels[best] if self.stars[best] >= rating else None
+
+
+class HotelIndex(JsonFileIndex): # This class loads hotels.json once and keeps one CityHotels per city
+    snapshot_name = "hotels"
+    id_field = "hotel_id"
+    record_type = Hotel
+
+    def __init__(self, path=None):
+        super().__init__(path or data_path("hotels.json"))
+        self.hotels = []
+        self.cities = {} # lower case city name -> CityHotels
+        self.amenities = [] # every amenity key in the file, sorted
+        self.amenity_bits = {} # amenity key -> bit number
+
+    @property
+    def records(self):
+        return self.hotels
+
+    def _build(self, records):
+        records = [Hotel.from_dict(record) for record in records]
+        names, amenity_lists = {}, {}
+        city_codes = np.array([names.setdefault(hotel.city, len(names)) for hotel in records], dtype=np.int64)
+        stars = np.array([int(hotel.stars) for hotel in records], dtype=np.int64)
+        prices = np.array([int(hotel.price_per_night) for hotel in records], dtype=np.int64)
+        # the amenity tuples are interned, so there is one code per distinct list
+        amenity_codes = np.array([amenity_lists.setdefault(hotel.amenities, len(amenity_lists)) for hotel in records], dtype=np.int64)
+        self._build_columns(list(names), city_codes, stars, prices, list(amenity_lists), amenity_codes, records)
+
+    def _build_snapshot(self, snapshot):
+        self._build_columns(
+            snapshot.dictionary("city"),
+            snapshot.column("city"),
+            snapshot.column("stars"),
+            snapshot.column("price_per_night"),
+            snapshot.dictionary("amenities"),
+            snapshot.column("amenities"),
+            snapshot.records(Hotel)
+        )
+
+    def _build_columns(self, city_names, city_codes, stars, prices, amenity_lists, amenity_codes, records): # the codes index into the names and lists
+        amenity_bits, list_masks = amenity_masks(amenity_lists)
+        masks = list_masks[amenity_codes] if len(amenity_codes) else np.zeros((0, list_masks.shape[1]), dtype=np.uint64)
+
+        keys = {}
+        key_of_name = np.array([keys.setdefault(name.lower(), len(keys)) for name in city_names], dtype=np.int64)
+        city_keys = key_of_name[city_codes] if len(city_codes) else np.empty(0, dtype=np.int64)
+
+        # one stable sort orders every city by price, then file order
+        order = np.lexsort((prices, city_keys))
+        found, starts = np.unique(city_keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        names = list(keys)
+        cities = {}
+        for key, start, end in zip(found.tolist(), starts.tolist(), ends.tolist()):
+            rows = order[start:end]
+            cities[names[key]] = CityHotels(rows.tolist(), prices[rows].tolist(), stars[rows].tolist(), masks[rows], amenity_bits, records)
+
+        self.hotels, self.cities, self.amenities, self.amenity_bits = records, cities, sorted(amenity_bits), amenity_bits
+
+    def _apply_delta(self, removed, added): # Only the cities of the removed and added hotels are rebuilt
+        start = len(self.hotels)
+        records = extend_records(self.hotels, [Hotel.from_dict(record) for record in added])
+        amenity_bits = self.amenity_bits
+        for row in range(start, len(records)):
+            for amenity in records[row].amenities:
+                if amenity_key(amenity) not in amenity_bits:
+                    if amenity_bits is self.amenity_bits: # a new dict, the cities we do not rebuild keep the old one
+                        amenity_bits = dict(amenity_bits)
+                    amenity_bits[amenity_key(amenity)] = len(amenity_bits)
+        words = max(1, (len(amenity_bits) + 63) // 64)
+
+        changed = {} # lower case city name -> (removed rows, added rows)
+        for row in removed:
+            changed.setdefault(records[row].city.lower(), (set(), []))[0].add(row)
+        for row in range(start, len(records)):
+            changed.setdefault(records[row].city.lower(), (set(), []))[1].append(row)
+
+        cities = dict(self.cities)
+        for city, (gone, new) in changed.items():
+            old = cities.get(city)
+            keep = [i for i, position in enumerate(old.positions) if position not in gone] if old else []
+            positions = [old.positions[i] for i in keep] + new
+            prices = [old.prices[i] for i in keep] + [int(records[row].price_per_night) for row in new]
+            stars = [old.stars[i] for i in keep] + [int(records[row].stars) for row in new]
+            masks = np.zeros((len(positions), words), dtype=np.uint64)
+            if keep:
+                masks[:len(keep), :old.masks.shape[1]] = old.masks[keep]
+            for i, row in enumerate(new, len(keep)):
+                for amenity in records[row].amenities:
+                    bit = amenity_bits[amenity_key(amenity)]
+                    masks[i, bit // 64] |= np.uint64(1 << (bit % 64))
+
+            if not positions:
+                cities.pop(city, None)
+                continue
+            order = sorted(range(len(positions)), key=lambda i: (prices[i], positions[i])) # by price, then file order, like _build_columns
+            cities[city] = CityHotels(
+                [positions[i] for i in order], [prices[i] for i in order], [stars[i] for i in order], masks[order], amenity_bits, records
+            )
+
+        self.hotels, self.cities, self.amenities, self.amenity_bits = records, cities, sorted(amenity_bits), amenity_bits
+
+    def city(self, city): # This returns the CityHotels of a city, or None
+        self.refresh()
+        return self.cities.get(city.lower())
+
+    def find(self, city, rating, price, amenities=None): # This returns the matching hotels in file order
+        city_hotels = self.city(city)
+        if not city_hotels:
+            return []
+        entries = sorted(city_hotels.within(rating, price, amenities), key=lambda i: city_hotels.positions[i])
+        return [city_hotels.hotels[i] for i in entries]
+
+    @telemetry.traced("hotel_index_best")
+    def best(self, city, rating, price, preference="cheapest", amenities=None): # This returns the best hotel for a query, or None
+        city_hotels = self.city(city)
+        telemetry.count("city_lookups", result="hit" if city_hotels else "miss")
+        if not city_hotels:
+            return None
+        if preference == "highest_rating":
+            return city_hotels.highest_rated(rating, price, amenities)
+        return city_hotels.cheapest(rating, price, amenities)
+
+    def prices(self, city, amenities=None): # This returns the distinct nightly prices in a city (of hotels with the amenities), lowest first
+        city_hotels = self.city(city)
+        if not city_hotels:
+            return []
+        if amenities:
+            return sorted({city_hotels.prices[i] for i in city_hotels.within(float("-inf"), float("inf"), amenities)})
+        return sorted(set(city_hotels.prices))
+
+
+_hotel_index = HotelIndex()
+
+def get_hotel_index(): # This returns the shared hotel index, reloaded if hotels.json has changed
+    return _hotel_index.refresh()
 
 
 from langchain.tools import tool
 @tool # then we will wrap the tool in langchain framework just like we did with the flight search tool
-def hotel_search_tool(city: str, price: int, rating: int, preference: str):
+@telemetry.traced("hotel_search_tool")
+def hotel_search_tool(city: str, price: int, rating: int, preference: str, amenities: Optional[List[str]] = None):
     """
-    Finds the Best Hotels based on city with Highest Rating or Lowest Price_Per_Night
+    Finds the Best Hotels based on city with Highest Rating or Lowest Price_Per_Night.
+    Optionally, only hotels that have all of the given amenities (e.g. ["wifi", "pool", "breakfast"]).
     """
-    hotels = filter_hotels(city, rating, price)
-    best_hotels = rank_hotels(hotels, preference)
+    best_hotels = get_hotel_index().best(city, rating, price, preference, amenities) # answered from the per-city price, star and amenity structures
     
 
     if not best_hotels:
+        wanted = f" with {', '.join(amenities)}" if amenities else ""
         result = {
-            "message": f"No hotels found in {city} within price ${price} and rating {rating}+."
+            "message": f"No hotels found in {city} within price ${price} and rating {rating}+{wanted}."
         }
         return result
 
     return {
         "hotel": {
-            "name": best_hotels['name'],
-            "price": best_hotels["price_per_night"],
-            "rating": best_hotels['stars'],
-            "amenities": best_hotels['amenities']  
+            "name": best_hotels.name,
+            "price": best_hotels.price_per_night,
+            "rating": best_hotels.stars,
+            "amenities": list(best_hotels.amenities) # the record keeps them as a shared tuple
         },
-        "message": f"Best hotel in {city}: {best_hotels['name']} at ${best_hotels['price_per_night']} per night."
+        "message": f"Best hotel in {city}: {best_hotels.name} at ${best_hotels.price_per_night} per night."
     }
 
 
-# Now we can test the tool
-output = hotel_search_tool.run({
-    "city": "Delhi",
-    "price": 4783,
-    "rating": 2,
-    "preference": "cheapest"
-})
+if __name__ == "__main__":
+    # Now we can test the tool
+    output = hotel_search_tool.run({
+        "city": "Delhi",
+        "price": 4783,
+        "rating": 2,
+        "preference": "cheapest"
+    })
 
-print(output)
\ No newline at end of file
+    print(output)
@@ -0,0 +1,143 @@
+from budget import DAILY_EXPENSE, calculate_budget
+from flight import get_flight_index
+from hotels import get_hotel_index
+
+# ----------------------------------
+# Joint trip optimizer
+# Searches flight x hotel x trip length combinations for every destination
+# reachable from a source city, and returns the Pareto frontier of total cost
+# (lower is better), flight duration (lower is better), hotel stars (higher is
+# better) and days (more is better, so a longer trip that costs more is not
+# thrown away for a shorter one).
+# Flights and hotels come from the same indexes (and filters) as
+# flight_search_tool and hotel_search_tool, and the cost from calculate_budget.
+# ----------------------------------
+
+
+def pareto_flights(index, route): # This keeps the flights of a route that no cheaper flight beats on duration
+    table = index.table
+    kept, best_duration = [], None
+    for row in route.by_price.tolist(): # cheapest first, so a flight is only worth keeping if it is faster than all before it
+        duration = float(table.duration[row])
+        if best_duration is None or duration < best_duration:
+            kept.append((int(table.price[row]), duration, row))
+            best_duration = duration
+    return kept
+
+
+def pareto_hotels(city_hotels, rating, price): # This keeps the hotels that no cheaper hotel beats on stars
+    kept, best_stars = [], None
+    for i in city_hotels.within(rating, price): # cheapest first, like pareto_flights
+        stars = city_hotels.stars[i]
+        if best_stars is None or stars > best_stars:
+            kept.append((city_hotels.prices[i], stars, city_hotels.hotels[i]))
+            best_stars = stars
+    return kept
+
+
+def pareto_frontier(candidates):
+    """
+    Keeps the candidates that no other candidate beats on cost, duration, stars and days at once.
+
+    Args:
+        candidates (list): (cost, duration, stars, days, payload) tuples
+
+    Returns:
+        list: The non-dominated candidates, cheapest first
+    """
+    # after sorting, every candidate that could dominate another one comes before it
+    candidates = sorted(candidates, key=lambda c: (c[0], c[1], -c[2], -c[3]))
+    star_levels = sorted({c[2] for c in candidates})
+    day_levels = sorted({c[3] for c in candidates})
+    fastest = {} # (stars, days) -> shortest duration kept so far with at least that many stars and days
+
+    frontier = []
+    for candidate in candidates:
+        _, duration, stars, days, _ = candidate
+        best = fastest.get((stars, days))
+        if best is not None and best <= duration: # something cheaper (or as cheap) is as fast, with as many stars and days
+            continue
+        frontier.append(candidate)
+        for star_level in star_levels:
+            if star_level > stars:
+                break
+            for day_level in day_levels:
+                if day_level > days:
+                    break
+                if fastest.get((star_level, day_level)) is None or duration < fastest[(star_level, day_level)]:
+                    fastest[(star_level, day_level)] = duration
+    return frontier
+
+
+def optimize_trips(source, budget, days, rating=1, max_hotel_price=None, daily_expense=DAILY_EXPENSE, destinations=None):
+    """
+    Finds the best trips from a source city within a total budget.
+
+    Args:
+        source (str): Source city
+        budget (int): Maximum total cost (flight + hotel + local expenses)
+        days (int | iterable): Trip length in days, or the lengths to consider (e.g. range(2, 6))
+        rating (int): Minimum hotel stars
+        max_hotel_price (int | None): Maximum price per night (None = only limited by the budget)
+        daily_expense (int): Local expenses per day
+        destinations (list | None): Destinations to consider (None = every city with a flight from source)
+
+    Returns:
+        list: Pareto-optimal trips, cheapest first
+    """
+    flight_index = get_flight_index()
+    hotel_index = get_hotel_index()
+    lengths = sorted({int(days)} if isinstance(days, int) else {int(length) for length in days})
+    if not lengths or lengths[0] < 1:
+        raise ValueError(f"days must be one or more trip lengths of at least 1 day, not {days!r}")
+    if max_hotel_price is None:
+        max_hotel_price = budget # a hotel can never cost more per night than the whole budget
+
+    if destinations is None:
+        destinations = flight_index.destinations_from(source)
+
+    candidates = []
+    for destination in destinations:
+        route = flight_index.route(source, destination)
+        city_hotels = hotel_index.city(destination)
+        if not route or not city_hotels:
+            continue
+
+        flights = pareto_flights(flight_index, route)
+        hotels = pareto_hotels(city_hotels, rating, max_hotel_price)
+        if not hotels:
+            continue
+
+        for length in lengths:
+            nights = length - 1
+            local = daily_expense * length
+            for flight_price, duration, row in flights:
+                if flight_price + hotels[0][0] * nights + local > budget: # flights are sorted by price, so no later one fits either
+                    break
+                for hotel_price, stars, hotel in hotels:
+                    cost = flight_price + hotel_price * nights + local
+                    if cost > budget: # hotels are sorted by price too
+                        break
+                    candidates.append((cost, duration, stars, length, (destination, row, hotel)))
+
+    trips = []
+    for cost, duration, stars, length, (destination, row, hotel) in pareto_frontier(candidates):
+        flight = flight_index.table.records[row]
+        trips.append({
+            "destination": destination,
+            "flight": {
+                "airline": flight.airline,
+                "price": flight.price,
+                "duration_minutes": duration,
+                "departure_time": flight.departure_time
+            },
+            "hotel": {
+                "name": hotel.name,
+                "price": hotel.price_per_night,
+                "rating": hotel.stars,
+                "amenities": list(hotel.amenities)
+            },
+            "days": length,
+            "budget": calculate_budget(flight.price, hotel.price_per_night, length, daily_expense)
+        })
+    return trips
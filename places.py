@@ -1,33 +1,225 @@
-import json
+import heapq
+from itertools import islice
+from typing import Annotated
 
-def load_places(): # This function loads the json file which contains the location data
-    with open("places.json", "r") as f:
-        return json.load(f)  
+import numpy as np
+from pydantic import Field
 
+import telemetry
+from budget import MAX_TRIP_DAYS
+from datastore import JsonFileIndex, RowView, data_path, extend_records
+from records import Place
 
-def filter_locations(city, category): # This function filters the locations based on city and category
-    places = load_places()
-    return [
-        place for place in places
-        if place['city'].strip().lower() == city.strip().lower()
-        and place['type'].strip().lower() == category.strip().lower()
-    ]
+def load_places(): # This function returns the location data, as the index's read-only Place records
+    return get_place_index().live_records()
+
+
+# How long a visit usually takes, per type of place (in hours), used to pack several places into a day
+VISIT_HOURS = {
+    "museum": 3,
+    "fort": 2.5,
+    "temple": 1.5,
+    "market": 2,
+    "beach": 3,
+    "lake": 1.5,
+    "park": 1.5,
+    "monument": 1.5
+}
+DEFAULT_VISIT_HOURS = 2
+HOURS_PER_DAY = 8
+
+
+def normalize(text): # This gives one canonical key for city and category names
+    return text.strip().lower()
+
+
+def _normalized_codes(names, codes): # This maps codes into names onto codes into the distinct normalized names
+    keys = {}
+    key_of_name = np.array([keys.setdefault(normalize(name), len(keys)) for name in names], dtype=np.int64)
+    return key_of_name[codes] if len(codes) else np.empty(0, dtype=np.int64)
+
+
+def _distinct(names): # The distinct normalized names, numbered like _normalized_codes numbers them
+    return list(dict.fromkeys(normalize(name) for name in names))
+
+
+class PlaceIndex(JsonFileIndex): # This class loads places.json once and keeps the places of every (city, category) ranked
+    snapshot_name = "places"
+    id_field = "place_id"
+    record_type = Place
+
+    def __init__(self, path=None):
+        super().__init__(path or data_path("places.json"))
+        self.places = []
+        self.by_city = {} # city -> places in file order
+        self.by_city_category = {} # (city, category) -> places in file order
+        self.ranked = {} # (city, category) -> [(-rating, position)], best first
+        self.categories = {} # city -> categories of its places
+
+    @property
+    def records(self):
+        return self.places
+
+    def _build(self, records):
+        records = [Place.from_dict(record) for record in records]
+        cities, types = {}, {}
+        city_codes = np.array([cities.setdefault(place.city, len(cities)) for place in records], dtype=np.int64)
+        type_codes = np.array([types.setdefault(place.type, len(types)) for place in records], dtype=np.int64)
+        ratings = np.array([place.rating for place in records], dtype=np.float64)
+        self._build_columns(list(cities), city_codes, list(types), type_codes, ratings, records)
+
+    def _build_snapshot(self, snapshot):
+        self._build_columns(
+            snapshot.dictionary("city"),
+            snapshot.column("city"),
+            snapshot.dictionary("type"),
+            snapshot.column("type"),
+            snapshot.column("rating"),
+            snapshot.records(Place)
+        )
+
+    def _build_columns(self, city_names, city_codes, type_names, type_codes, ratings, records): # the codes index into the names
+        city_keys, category_keys = _normalized_codes(city_names, city_codes), _normalized_codes(type_names, type_codes)
+        cities, categories_of = _distinct(city_names), _distinct(type_names)
+
+        # stable sorts, so ties keep the file order
+        file_order = np.lexsort((category_keys, city_keys)) # by city, then category, then file order
+        by_rating = np.lexsort((-ratings, category_keys, city_keys)) # by city, then category, then best rated first
+        keys = city_keys * len(categories_of) + category_keys
+        found, starts = np.unique(keys[file_order], return_index=True)
+        ends = np.append(starts[1:], len(keys))
+
+        by_city, by_city_category, ranked, categories = {}, {}, {}, {}
+        for key, start, end in zip(found.tolist(), starts.tolist(), ends.tolist()):
+            city, category = cities[key // len(categories_of)], categories_of[key % len(categories_of)]
+            rows = by_rating[start:end].tolist()
+            ranked[(city, category)] = list(zip((-ratings[rows]).tolist(), rows))
+            by_city_category[(city, category)] = RowView(records, file_order[start:end].tolist())
+            categories.setdefault(city, []).append(category)
+        by_city_rows = np.argsort(city_keys, kind="stable")
+        city_found, city_starts = np.unique(city_keys[by_city_rows], return_index=True)
+        city_ends = np.append(city_starts[1:], len(city_keys))
+        for key, start, end in zip(city_found.tolist(), city_starts.tolist(), city_ends.tolist()):
+            by_city[cities[key]] = RowView(records, by_city_rows[start:end].tolist())
+
+        self.places, self.by_city, self.by_city_category, self.ranked, self.categories = (
+            records, by_city, by_city_category, ranked, categories
+        )
 
+    def _apply_delta(self, removed, added): # Only the (city, category) groups of the removed and added places are ranked again
+        start = len(self.places)
+        records = extend_records(self.places, [Place.from_dict(record) for record in added])
+        gone, new = {}, {} # (city, category) -> rows
+        for row in removed:
+            gone.setdefault((normalize(records[row].city), normalize(records[row].type)), set()).add(row)
+        for row in range(start, len(records)):
+            new.setdefault((normalize(records[row].city), normalize(records[row].type)), []).append(row)
 
+        by_city, by_city_category, ranked, categories = dict(self.by_city), dict(self.by_city_category), dict(self.ranked), dict(self.categories)
+        for city in {city for city, _ in gone} | {city for city, _ in new}:
+            city_gone = set().union(*(rows for (c, _), rows in gone.items() if c == city))
+            city_new = sorted(row for (c, _), rows in new.items() if c == city for row in rows)
+            rows = [row for row in (by_city[city].rows if city in by_city else []) if row not in city_gone] + city_new
+            if rows:
+                by_city[city] = RowView(records, rows)
+            else:
+                by_city.pop(city, None)
 
+        for key in gone.keys() | new.keys():
+            city, category = key
+            rows = by_city_category[key].rows if key in by_city_category else []
+            rows = [row for row in rows if row not in gone.get(key, ())] + new.get(key, [])
+            if rows:
+                by_city_category[key] = RowView(records, rows)
+                ranked[key] = sorted((-records[row].rating, row) for row in rows)
+                if category not in categories.get(city, []):
+                    categories[city] = categories.get(city, []) + [category]
+            else:
+                by_city_category.pop(key, None)
+                ranked.pop(key, None)
+                categories[city] = [c for c in categories.get(city, []) if c != category]
+                if not categories[city]:
+                    del categories[city]
 
-def rank_places(places): # This function will rank the location based on higher rating
-    if not places:
-        return []
+        self.places, self.by_city, self.by_city_category, self.ranked, self.categories = (
+            records, by_city, by_city_category, ranked, categories
+        )
 
-    return sorted(places, key=lambda x: x['rating'], reverse=True)
+    def in_city(self, city): # This returns the places of a city in file order
+        self.refresh()
+        return list(self.by_city.get(normalize(city), []))
 
+    def in_category(self, city, category): # This returns the places of a city and category in file order
+        self.refresh()
+        return list(self.by_city_category.get((normalize(city), normalize(category)), []))
 
-    
-def max_places(places, max_days): # This function is to return the maximum number of places to visit in a day
-    return places[:max_days]
+    def iter_ranked(self, city, category=None):
+        """
+        Yields the places of a city (and category) from the highest rating down, lazily.
 
+        Without a category, the ranked lists of all the city's categories are merged
+        with a heap, so taking the top k only touches about k entries.
+        """
+        self.refresh()
+        places, city = self.places, normalize(city)
+        if category:
+            lists = [self.ranked.get((city, normalize(category)), [])]
+        else:
+            lists = [self.ranked[(city, c)] for c in self.categories.get(city, [])]
+        for _, position in heapq.merge(*lists):
+            yield places[position]
 
+    def top(self, city, category=None, k=5): # This returns the k best rated places (ties keep the file order)
+        return list(islice(self.iter_ranked(city, category), k))
+
+
+_place_index = PlaceIndex()
+
+def get_place_index(): # This returns the shared place index, reloaded if places.json has changed
+    return _place_index.refresh()
+
+
+@telemetry.traced()
+def plan_itinerary(places, days, hours_per_day=HOURS_PER_DAY):
+    """
+    Packs places into days, best ranked first, under a daily time budget.
+
+    Args:
+        places (iterable): Place records in ranking order (it is only read as far as needed)
+        days (int): Number of days
+        hours_per_day (float): Time available for visits each day
+
+    Returns:
+        dict: "Day 1" ... "Day N" -> list of places
+    """
+    itinerary = {f"Day {i+1}": [] for i in range(days)}
+    hours_left = [hours_per_day] * days
+    shortest_visit = min([DEFAULT_VISIT_HOURS, *VISIT_HOURS.values()])
+    seen_names = set()
+    scanned = 0
+
+    for place in places:
+        scanned += 1
+        if all(left < shortest_visit for left in hours_left): # no day can take another place
+            break
+        name = normalize(place.name)
+        if name in seen_names: # the same place name is only visited once per trip
+            continue
+        hours = VISIT_HOURS.get(normalize(place.type), DEFAULT_VISIT_HOURS)
+        for day in range(days): # the first day with enough time left gets the place
+            if hours_left[day] >= hours:
+                hours_left[day] -= hours
+                itinerary[f"Day {day+1}"].append(place)
+                seen_names.add(name)
+                break
+
+    telemetry.current_span().set("rows", scanned)
+    telemetry.count("rows_scanned", scanned, dataset="places")
+    return itinerary
+
+
+def plan_city_itinerary(city, days, category=None, hours_per_day=HOURS_PER_DAY): # The itinerary of the best places of a city
+    return plan_itinerary(get_place_index().iter_ranked(city, category), days, hours_per_day)
 
 
 def select_info(places): # This will return the required information like place name, category and rating
@@ -42,41 +234,32 @@ def select_info(places): # This will return the required information like place
 
 
 
-def group_places_by_day(places, days): # This function creates an itenary which will list the locations to visit per day
-    itinerary = {f"Day {i+1}": [] for i in range(days)} # This creates an empty itenary list to store the locations
-    
-    for idx, place in enumerate(places): # This will loop through the places dictionary (idx=index, place=actual place dictionary)
-        day = f"Day {(idx % days) + 1}" # This will equally seperate the places for each day
-        itinerary[day].append(place) # This will add the place to the correct day
-    
-    return itinerary
-
-
-
-
 from langchain.tools import tool
 @tool # we will wrap this tool just like other tools
 
-def location_search_tool(city: str, category: str, max_days: int):
+@telemetry.traced("location_search_tool")
+def location_search_tool(city: str, category: str, max_days: Annotated[int, Field(ge=1, le=MAX_TRIP_DAYS)]):
     """
-    This shows the maximum number of locations could be visited based on the city and category
+    Builds a day-wise itinerary of the best rated locations in a city for the given category
+    (or every category, if the category is empty or "all"), with several locations per day.
     """
-    places = filter_locations(city, category)
-    best_locations = rank_places(places)
-    limited = max_places(best_locations, max_days)
-    result = select_info(limited)
-    day_wise_itinerary = group_places_by_day(result, max_days)
+    if normalize(category) in ("", "all", "any"):
+        category = None
+    ranked = get_place_index().iter_ranked(city, category) # the index keeps every (city, category) ranked by rating
+    itinerary = plan_itinerary(ranked, max_days) # several places per day, within the daily time budget
+    day_wise_itinerary = {day: select_info(places) for day, places in itinerary.items()}
 
     return {
        "itinerary": day_wise_itinerary
     }
 
 
-# Here we can test the logic of the tool
-output = location_search_tool.run({
-    "city": "Goa",
-    "category": "market",
-    "max_days": 3,
-})
+if __name__ == "__main__":
+    # Here we can test the logic of the tool
+    output = location_search_tool.run({
+        "city": "Goa",
+        "category": "market",
+        "max_days": 3,
+    })
 
-print(output)
\ No newline at end of file
+    print(output)
@@ -0,0 +1,341 @@
+"""
+Parallel planning orchestrator for the travel tools.
+
+The tool-calling agent in the notebook and the app call the tools one after
+another. But once the trip (source, destination, days, hotel budget) is
+known, most of the calls do not depend on each other:
+
+    flight  --+
+              +--> budget
+    hotel   --+
+    weather
+    places
+
+This module runs such a dependency graph of tool calls, starting every call
+as soon as the calls it depends on have finished. The I/O-bound weather call
+is awaited on the asyncio event loop, and the CPU-bound calls run on a thread
+pool, so a whole plan takes about as long as its slowest branch. The results
+are merged into one plan in the notebook agent's output format
+({"status", "data", "message"}).
+
+The LLM only reads the trip out of a free-text request (and, if asked,
+writes a summary), so any LangChain chat model works, including the fake
+models of langchain_core for tests:
+
+    from langchain_core.language_models import FakeListChatModel
+
+    llm = FakeListChatModel(responses=['{"source": "Hyderabad", "destination": "Delhi", "days": 3}'])
+    plan = plan_from_text("Three days in Delhi, flying from Hyderabad", llm)
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+import telemetry
+from budget import MAX_TRIP_DAYS, budget_estimation_tool
+from flight import MAX_FLEXIBILITY_DAYS, flight_search_tool
+from hotels import hotel_search_tool
+from places import location_search_tool
+from weather import weather_lookup_tool
+
+PLAN_WORKERS = 4 # threads for the CPU-bound tool calls, shared by all plans of the process
+
+# The trip fields, and their values when a request does not give them
+TRIP_DEFAULTS = {
+    "source": None,
+    "destination": None,
+    "preference": "cheapest", # flight: cheapest or fastest
+    "days": 3,
+    "start_date": None, # ISO date of the flight and the first day; any flight date and today's weather if not given
+    "flexibility_days": 0, # days the flight may leave before or after start_date
+    "hotel_price": 5000, # highest price per night
+    "hotel_rating": 1, # lowest number of stars
+    "hotel_preference": "cheapest", # cheapest or highest_rating
+    "amenities": [],
+    "category": "all" # kind of places for the itinerary
+}
+
+_pool = ThreadPoolExecutor(max_workers=PLAN_WORKERS, thread_name_prefix="plan") # the threads start on first use
+
+
+class Step: # One tool call of a plan
+    def __init__(self, name, tool, arguments, succeeded, after=(), io=False):
+        self.name = name
+        self.tool = tool # a LangChain tool
+        self.arguments = arguments # results of the steps in after -> the tool arguments
+        self.succeeded = succeeded # tool result -> True if the tool found what we asked for
+        self.after = tuple(after) # names of the steps this one needs
+        self.io = io # awaited on the event loop instead of taking a pool thread
+
+
+def _ordered(steps): # This returns the steps so that every step comes after the steps it needs
+    by_name = {step.name: step for step in steps}
+    ordered, state = [], {}
+
+    def visit(step):
+        if state.get(step.name) == "done":
+            return
+        if state.get(step.name) == "visiting":
+            raise ValueError(f"the steps depend on each other in a cycle, at {step.name!r}")
+        state[step.name] = "visiting"
+        for name in step.after:
+            if name not in by_name:
+                raise ValueError(f"step {step.name!r} needs unknown step {name!r}")
+            visit(by_name[name])
+        state[step.name] = "done"
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+async def _run_step(step, needed, pool):
+    outcomes = await asyncio.gather(*needed.values())
+    if any(outcome["status"] != "ok" for outcome in outcomes):
+        return {"status": "skipped", "result": None, "seconds": 0.0}
+
+    started = time.perf_counter()
+    with telemetry.span("plan_step", step=step.name) as span:
+        try:
+            arguments = step.arguments({name: outcome["result"] for name, outcome in zip(needed, outcomes)})
+            if step.io:
+                result = await step.tool.ainvoke(arguments)
+            else:
+                # the context is copied, so the tool's spans nest under this one on the pool thread too
+                call = partial(contextvars.copy_context().run, step.tool.invoke, arguments)
+                result = await asyncio.get_running_loop().run_in_executor(pool, call)
+        except Exception as error: # one failing tool fails its own branch, the others still finish
+            span.set("status", "error")
+            return {"status": "error", "result": {"message": f"{type(error).__name__}: {error}"}, "seconds": time.perf_counter() - started}
+        status = "ok" if step.succeeded(result) else "failed"
+        span.set("status", status)
+    return {"status": status, "result": result, "seconds": time.perf_counter() - started}
+
+
+async def run_steps(steps, pool=None):
+    """
+    Runs a dependency graph of tool calls, each as soon as the steps it needs are done.
+
+    A step whose needed steps did not all succeed is skipped.
+
+    Args:
+        steps (list): Step objects
+        pool (Executor | None): Runs the steps that are not io (default: the shared pool)
+
+    Returns:
+        dict: step name -> {"status": "ok" | "failed" | "error" | "skipped", "result", "seconds"}, in step order
+
+    Raises:
+        ValueError: If a step needs an unknown step, or the steps depend on each other in a cycle
+    """
+    tasks = {}
+    for step in _ordered(steps):
+        needed = {name: tasks[name] for name in step.after}
+        tasks[step.name] = asyncio.ensure_future(_run_step(step, needed, pool or _pool))
+    outcomes = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+    return {step.name: outcomes[step.name] for step in steps}
+
+
+# ----------------------------------
+# Trip plans
+# ----------------------------------
+def flight_price(flight): # The fare of the direct flight, or of the best connecting itinerary
+    if "flight" in flight:
+        return flight["flight"]["price"]
+    return flight["connections"][0]["total_price"]
+
+
+def trip_steps(trip): # This builds the tool calls of a trip (a dict with the TRIP_DEFAULTS keys)
+    start = date.fromisoformat(trip["start_date"]) if trip["start_date"] else date.today()
+    end = start + timedelta(days=trip["days"] - 1)
+    return [
+        Step(
+            "flight", flight_search_tool,
+            lambda _: {
+                "source": trip["source"], "destination": trip["destination"], "preference": trip["preference"],
+                "departure_date": trip["start_date"], "flexibility_days": trip["flexibility_days"]
+            },
+            lambda result: "flight" in result or "connections" in result
+        ),
+        Step(
+            "hotel", hotel_search_tool,
+            lambda _: {
+                "city": trip["destination"], "price": trip["hotel_price"], "rating": trip["hotel_rating"],
+                "preference": trip["hotel_preference"], "amenities": trip["amenities"] or None
+            },
+            lambda result: "hotel" in result
+        ),
+        Step(
+            "weather", weather_lookup_tool,
+            lambda _: {"city": trip["destination"], "start_date": start.isoformat(), "end_date": end.isoformat()},
+            lambda result: isinstance(result, list), # a forecast list, or a dict with a message
+            io=True
+        ),
+        Step(
+            "places", location_search_tool,
+            lambda _: {"city": trip["destination"], "category": trip["category"], "max_days": trip["days"]},
+            lambda result: "itinerary" in result
+        ),
+        Step(
+            "budget", budget_estimation_tool,
+            lambda found: {
+                "flight_price": flight_price(found["flight"]),
+                "hotel_price_per_night": found["hotel"]["hotel"]["price"],
+                "number_of_days": trip["days"]
+            },
+            lambda result: "total_cost" in result,
+            after=("flight", "hotel")
+        )
+    ]
+
+
+def _whole_number(trip, key, low, high): # This checks an integer trip field (numeric strings from an LLM are fine)
+    value = trip[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number, not {value!r}")
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a whole number, not {value!r}") from None
+    if not low <= number <= high:
+        raise ValueError(f"{key} must be between {low} and {high}, not {number}")
+    return number
+
+
+def make_trip(request): # This fills in the defaults of a trip request, and checks the fields we cannot plan without
+    unknown = set(request) - set(TRIP_DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown trip fields: {sorted(unknown)}")
+    trip = {**TRIP_DEFAULTS, **{key: value for key, value in request.items() if value is not None}}
+    if not trip["source"] or not trip["destination"]:
+        raise ValueError("a trip needs a source and a destination")
+    for key in ("source", "destination", "preference", "hotel_preference", "category"):
+        if not isinstance(trip[key], str):
+            raise ValueError(f"{key} must be a string, not {trip[key]!r}")
+    if trip["start_date"] is not None:
+        if not isinstance(trip["start_date"], str):
+            raise ValueError(f"start_date must be a YYYY-MM-DD string, not {trip['start_date']!r}")
+        date.fromisoformat(trip["start_date"]) # raises ValueError for anything else
+    if not isinstance(trip["amenities"], list) or not all(isinstance(amenity, str) for amenity in trip["amenities"]):
+        raise ValueError(f"amenities must be a list of strings, not {trip['amenities']!r}")
+    trip["days"] = _whole_number(trip, "days", 1, MAX_TRIP_DAYS)
+    trip["flexibility_days"] = _whole_number(trip, "flexibility_days", 0, MAX_FLEXIBILITY_DAYS)
+    trip["hotel_price"] = _whole_number(trip, "hotel_price", 0, 10 ** 9)
+    trip["hotel_rating"] = _whole_number(trip, "hotel_rating", 0, 5)
+    return trip
+
+
+def merge_plan(trip, outcomes): # This merges the step outcomes into one plan, in the notebook agent's output format
+    problems = []
+    for name, outcome in outcomes.items():
+        if outcome["status"] == "skipped":
+            problems.append(f"{name}: skipped")
+        elif outcome["status"] != "ok":
+            result = outcome["result"]
+            problems.append(f"{name}: {result.get('message', outcome['status']) if isinstance(result, dict) else outcome['status']}")
+
+    if problems:
+        message = "Could not plan the whole trip. " + " ".join(problems)
+    else:
+        message = (
+            f"{trip['days']} days in {trip['destination']} from {trip['source']}, "
+            f"total cost {outcomes['budget']['result']['total_cost']}."
+        )
+    return {
+        "status": "failed" if problems else "success",
+        "data": {"trip": trip, **{name: outcome["result"] for name, outcome in outcomes.items()}},
+        "message": message,
+        "seconds": {name: outcome["seconds"] for name, outcome in outcomes.items()}
+    }
+
+
+@telemetry.traced("plan_trip")
+async def aplan_trip(request, pool=None):
+    """
+    Plans a trip, running the independent tool calls concurrently.
+
+    Args:
+        request (dict): Trip fields (see TRIP_DEFAULTS); source and destination are required
+        pool (Executor | None): Runs the CPU-bound tool calls (default: the shared pool)
+
+    Returns:
+        dict: {"status": "success" | "failed", "data": {"trip", "flight", "hotel", "weather", "places", "budget"},
+               "message", "seconds": per tool call}
+    """
+    trip = make_trip(request)
+    return merge_plan(trip, await run_steps(trip_steps(trip), pool))
+
+
+def plan_trip(request, pool=None): # The same as aplan_trip, for callers without an event loop
+    return asyncio.run(aplan_trip(request, pool))
+
+
+# ----------------------------------
+# Free-text requests
+# ----------------------------------
+EXTRACT_PROMPT = """
+You read travel requests. Answer with one JSON object and nothing else, with these keys:
+source, destination (city names), preference ("cheapest" or "fastest" flight), days (number),
+start_date (YYYY-MM-DD or null), flexibility_days (days the flight date may move), hotel_price (highest price per night), hotel_rating (lowest stars, 1-5),
+hotel_preference ("cheapest" or "highest_rating"), amenities (list of strings), category (kind of places, or "all").
+Use null for anything the request does not say.
+"""
+
+SUMMARY_PROMPT = """
+You are a travel planning assistant. Summarize this trip plan for the traveler in a few sentences.
+Use only the facts in the plan. If its status is "failed", explain what could not be found.
+"""
+
+
+def _content(reply): # Chat models return a message, plain LLMs a string
+    return getattr(reply, "content", reply)
+
+
+def read_trip(text, llm): # This asks the LLM for the trip fields of a free-text request
+    reply = _content(llm.invoke([("system", EXTRACT_PROMPT), ("human", text)]))
+    start, end = reply.find("{"), reply.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError(f"the LLM did not answer with a JSON object: {reply!r}")
+    fields = json.loads(reply[start:end + 1])
+    return {key: value for key, value in fields.items() if key in TRIP_DEFAULTS} # we ignore keys we did not ask for
+
+
+async def aplan_from_text(text, llm, summarize=False, pool=None):
+    """
+    Plans a trip from a free-text request: one LLM call reads the trip, then the tools run concurrently.
+
+    Args:
+        text (str): The traveler's request
+        llm: A LangChain chat model (or fake model)
+        summarize (bool): Replace the message with a summary written by the LLM
+        pool (Executor | None): Runs the CPU-bound tool calls (default: the shared pool)
+
+    Returns:
+        dict: The plan, like aplan_trip
+    """
+    request = await asyncio.to_thread(read_trip, text, llm)
+    plan = await aplan_trip(request, pool)
+    if summarize:
+        reply = await llm.ainvoke([("system", SUMMARY_PROMPT), ("human", json.dumps(plan, default=str))])
+        plan["message"] = _content(reply)
+    return plan
+
+
+def plan_from_text(text, llm, summarize=False, pool=None): # The same as aplan_from_text, for callers without an event loop
+    return asyncio.run(aplan_from_text(text, llm, summarize, pool))
+
+
+if __name__ == "__main__":
+    # A fake LLM, so the orchestration can be tried without an API key
+    from langchain_core.language_models import FakeListChatModel
+
+    fake_llm = FakeListChatModel(responses=[
+        '{"source": "Hyderabad", "destination": "Delhi", "preference": "cheapest", "days": 3, "hotel_price": 6000}'
+    ])
+    print(json.dumps(plan_from_text("Plan 3 days in Delhi from Hyderabad, hotels up to 6000 a night", fake_llm), indent=2))
@@ -0,0 +1,134 @@
+"""
+Slotted record types for the rows of flights.json, hotels.json and places.json.
+
+The indexes keep every row of the catalog in memory, and a dict per row
+stores all of its keys again for every flight, hotel and place. These
+records keep only the values, in __slots__. Strings that repeat across
+rows (cities, airlines, names) and amenity lists are interned, so equal
+values share one object.
+
+The records can still be read like the original dicts (flight["price"],
+hotel["amenities"]), and to_dict() gives back exactly the JSON row. They
+are shared by every caller of an index, so please treat them as read-only.
+"""
+
+import sys
+from dataclasses import dataclass, fields
+from functools import cache
+from typing import ClassVar
+
+
+_amenity_lists = {} # amenity tuple -> the one shared copy of it
+
+
+def intern_amenities(amenities): # This returns one shared tuple per distinct amenity list (the file order is kept)
+    amenities = tuple(sys.intern(amenity) for amenity in amenities)
+    return _amenity_lists.setdefault(amenities, amenities)
+
+
+@cache
+def _layout(cls): # This returns the JSON keys of a record type in file order, JSON key -> attribute, and the interned positions
+    attributes = [field.name for field in fields(cls)]
+    keys = [cls.json_names.get(name, name) for name in attributes]
+    interned = [attributes.index(name) for name in cls.interned]
+    interned_lists = [attributes.index(name) for name in cls.interned_lists]
+    return keys, dict(zip(keys, attributes)), interned, interned_lists
+
+
+class Record:
+    __slots__ = ()
+    json_names: ClassVar[dict] = {} # attribute -> key in the JSON file, where they differ
+    interned: ClassVar[tuple] = () # string attributes that repeat across rows
+    interned_lists: ClassVar[tuple] = () # list attributes, stored as interned tuples
+
+    @classmethod
+    def from_dict(cls, record): # This builds a record from one row of the JSON file
+        keys, attributes, interned, interned_lists = _layout(cls)
+        if list(record) != keys: # rows with the keys in another order are reordered, other keys are an error
+            unknown = set(record) - set(attributes)
+            if unknown:
+                raise KeyError(f"unknown {cls.__name__} fields: {sorted(unknown)}")
+            record = {key: record[key] for key in keys}
+        values = list(record.values())
+        for i in interned:
+            values[i] = sys.intern(values[i])
+        for i in interned_lists:
+            values[i] = intern_amenities(values[i])
+        return cls(*values)
+
+    @classmethod
+    def check(cls, record):
+        """
+        Checks that a JSON row can become a record of this type: every field there, each with the field's type.
+
+        Raises:
+            ValueError: If a field is missing, unknown or of the wrong type
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"a {cls.__name__} must be a JSON object, not {record!r}")
+        keys, attributes, _, _ = _layout(cls)
+        missing, unknown = set(keys) - set(record), set(record) - set(keys)
+        if missing or unknown:
+            raise ValueError(f"{cls.__name__} fields missing: {sorted(missing)}, unknown: {sorted(unknown)}")
+        for field in fields(cls):
+            key = cls.json_names.get(field.name, field.name)
+            value = record[key]
+            if field.type is tuple: # a list of strings in the JSON
+                valid = isinstance(value, list) and all(isinstance(item, str) for item in value)
+            elif field.type is float:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            else:
+                valid = isinstance(value, field.type) and not isinstance(value, bool)
+            if not valid:
+                raise ValueError(f"{cls.__name__} field {key!r} must be {field.type.__name__}, not {value!r}")
+
+    def keys(self): # The JSON keys, in file order (with __getitem__, this makes dict(record) work)
+        return _layout(type(self))[0]
+
+    def __getitem__(self, key): # Dict-style access by JSON key, for code written against the plain dicts
+        try:
+            value = getattr(self, _layout(type(self))[1][key])
+        except KeyError:
+            raise KeyError(key) from None
+        return list(value) if isinstance(value, tuple) else value
+
+    def to_dict(self): # This gives back the row exactly as it is in the JSON file
+        return {key: self[key] for key in self.keys()}
+
+
+@dataclass(slots=True)
+class Flight(Record):
+    flight_id: str
+    airline: str
+    from_city: str
+    to_city: str
+    departure_time: str
+    arrival_time: str
+    price: int
+
+    json_names: ClassVar[dict] = {"from_city": "from", "to_city": "to"}
+    interned: ClassVar[tuple] = ("airline", "from_city", "to_city")
+
+
+@dataclass(slots=True)
+class Hotel(Record):
+    hotel_id: str
+    name: str
+    city: str
+    stars: int
+    price_per_night: int
+    amenities: tuple # interned, see intern_amenities
+
+    interned: ClassVar[tuple] = ("name", "city")
+    interned_lists: ClassVar[tuple] = ("amenities",)
+
+
+@dataclass(slots=True)
+class Place(Record):
+    place_id: str
+    name: str
+    city: str
+    type: str
+    rating: float
+
+    interned: ClassVar[tuple] = ("name", "city", "type")
@@ -0,0 +1,258 @@
+"""
+Compact binary snapshots of flights.json, hotels.json and places.json.
+
+A snapshot stores every dataset column by column: numbers as fixed-width
+NumPy arrays, repeated strings (cities, airlines, names, amenity lists) as
+integer codes into a small dictionary, and unique strings (ids, times) as
+fixed-width byte arrays. The arrays are saved as .npy files, so the indexes
+can open them memory-mapped (zero-copy) instead of parsing JSON.
+
+A snapshot records the size and modification time of the JSON file it was
+built from, and is ignored as soon as that file changes.
+
+Usage:
+    python snapshot.py            # builds snapshot/ next to the data files
+"""
+
+import json
+import os
+import shutil
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+from datastore import data_path
+from records import Flight, intern_amenities
+
+SNAPSHOT_DIR = os.environ.get("TRAVEL_PLANNER_SNAPSHOT_DIR", data_path("snapshot"))
+FORMAT_VERSION = 2 # 2: flights store the per-route departure order
+
+
+# ----------------------------------
+# Reading
+# ----------------------------------
+class SnapshotRecords(Sequence): # The rows of a snapshot as a read-only sequence, decoded only when accessed
+    def __init__(self, snapshot, record_type=None):
+        self._rows = snapshot.rows
+        self._record_type = record_type # a records.py type built from the values in field order, or None for dicts
+        self._fields = []
+        for name, kind, column, dictionary in snapshot.meta["fields"]:
+            values = snapshot.column(column)
+            words = snapshot.dictionary(dictionary) if dictionary else None
+            if kind == "list":
+                words = [intern_amenities(word) for word in words] # one shared tuple per distinct list
+            self._fields.append((name, kind, values, words))
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self._rows))]
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError("snapshot row out of range")
+        decoded = []
+        for name, kind, values, words in self._fields:
+            value = values[row]
+            if kind == "bytes":
+                decoded.append(value.decode("utf-8"))
+            elif kind == "dict" or kind == "list":
+                decoded.append(words[value])
+            else: # "int" and "float"
+                decoded.append(value.item())
+        if self._record_type is not None:
+            return self._record_type(*decoded)
+        return {name: list(value) if kind == "list" else value for (name, kind, _, _), value in zip(self._fields, decoded)}
+
+
+class Snapshot: # One dataset of a snapshot directory
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.rows = meta["rows"]
+        self._columns = {}
+
+    def column(self, name): # The column as a read-only memory-mapped array (nothing is read until it is used)
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.directory, name + ".npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def dictionary(self, name):
+        return self.meta["dictionaries"][name]
+
+    def records(self, record_type=None):
+        return SnapshotRecords(self, record_type)
+
+
+def open_snapshot(dataset, source_path, snapshot_dir=None):
+    """
+    Opens the snapshot of a dataset, if there is an up-to-date one.
+
+    Args:
+        dataset (str): "flights", "hotels" or "places"
+        source_path (str): The JSON file the snapshot must have been built from
+        snapshot_dir (str | None): Snapshot directory (default SNAPSHOT_DIR)
+
+    Returns:
+        Snapshot | None: None if there is no snapshot, or the JSON file changed since it was built
+    """
+    directory = os.path.join(snapshot_dir or SNAPSHOT_DIR, dataset)
+    try:
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+        source = os.stat(source_path)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        meta.get("format") != FORMAT_VERSION
+        or meta.get("source_size") != source.st_size
+        or meta.get("source_mtime_ns") != source.st_mtime_ns
+    ):
+        return None
+    return Snapshot(directory, meta)
+
+
+# ----------------------------------
+# Building
+# ----------------------------------
+def _bytes_column(values): # Unique strings are stored as fixed-width utf-8 bytes
+    return np.array([value.encode("utf-8") for value in values], dtype=bytes) if values else np.zeros(0, dtype="S1")
+
+
+def _dictionary_column(values): # Repeated values are stored as int32 codes into a dictionary (in order of first appearance)
+    words, codes = {}, []
+    for value in values:
+        codes.append(words.setdefault(value, len(words)))
+    return np.array(codes, dtype=np.int32), list(words)
+
+
+def _generic_columns(records, fields):
+    """
+    Encodes records into columns.
+
+    Args:
+        records (list): Records from a JSON data file
+        fields (list): (name, kind) pairs, kind is "bytes", "dict", "list", "int" or "float"
+
+    Returns:
+        tuple: (field specs for meta.json, columns, dictionaries)
+    """
+    names = [name for name, _ in fields]
+    for record in records: # a snapshot must give back exactly the records of the file
+        if list(record) != names:
+            raise ValueError(f"cannot snapshot {record!r}: expected exactly the fields {names}")
+
+    specs, columns, dictionaries = [], {}, {}
+    for name, kind in fields:
+        values = [record[name] for record in records]
+        dictionary = None
+        if kind == "float" and all(type(value) is int for value in values):
+            kind = "int" # whole numbers stay whole numbers
+        if kind == "bytes":
+            columns[name] = _bytes_column(values)
+        elif kind == "dict":
+            columns[name], dictionaries[name] = _dictionary_column(values)
+            dictionary = name
+        elif kind == "list":
+            columns[name], words = _dictionary_column([tuple(value) for value in values])
+            dictionaries[name] = [list(value) for value in words]
+            dictionary = name
+        elif kind == "int":
+            if not all(type(value) is int for value in values):
+                raise ValueError(f"cannot snapshot {name!r}: not every value is an integer")
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            if not all(type(value) is float for value in values):
+                raise ValueError(f"cannot snapshot {name!r}: mixes integers and decimals")
+            columns[name] = np.array(values, dtype=np.float64)
+        specs.append([name, kind, name, dictionary])
+    return specs, columns, dictionaries
+
+
+def _flight_columns(records):
+    from flight import FlightTable, ROUTE_COLUMNS, route_arrays # flight.py pulls in langchain, so it is only imported for building
+
+    specs, columns, dictionaries = _generic_columns(records, [
+        ("flight_id", "bytes"), ("airline", "dict"), ("from", "dict"), ("to", "dict"),
+        ("departure_time", "bytes"), ("arrival_time", "bytes"), ("price", "int")
+    ])
+
+    # the FlightTable columns (and its city dictionary) are stored as they are, so loading does not parse any date
+    table = FlightTable([Flight.from_dict(record) for record in records])
+    dictionaries["cities"], dictionaries["city_names"] = table.cities, table.city_names
+    columns.update({
+        "from_code": table.from_code,
+        "to_code": table.to_code,
+        "departure": table.departure,
+        "arrival": table.arrival,
+        "duration": table.duration
+    })
+    # the route grouping is stored too, so loading does not sort anything either
+    columns.update(zip(ROUTE_COLUMNS, route_arrays(table)))
+    return specs, columns, dictionaries
+
+
+DATASETS = {
+    "flights": ("flights.json", _flight_columns),
+    "hotels": ("hotels.json", lambda records: _generic_columns(records, [
+        ("hotel_id", "bytes"), ("name", "dict"), ("city", "dict"), ("stars", "int"),
+        ("price_per_night", "int"), ("amenities", "list")
+    ])),
+    "places": ("places.json", lambda records: _generic_columns(records, [
+        ("place_id", "bytes"), ("name", "dict"), ("city", "dict"), ("type", "dict"), ("rating", "float")
+    ]))
+}
+
+
+def build_snapshot(dataset, source_path=None, snapshot_dir=None):
+    """
+    Compiles one JSON data file into a snapshot directory.
+
+    Args:
+        dataset (str): "flights", "hotels" or "places"
+        source_path (str | None): JSON file (default: the dataset's file in the data directory)
+        snapshot_dir (str | None): Snapshot directory (default SNAPSHOT_DIR)
+
+    Returns:
+        str: The directory the snapshot was written to
+    """
+    file_name, encode = DATASETS[dataset]
+    source_path = source_path or data_path(file_name)
+    source = os.stat(source_path)
+    with open(source_path, "r") as f:
+        records = json.load(f)
+    specs, columns, dictionaries = encode(records)
+
+    directory = os.path.join(snapshot_dir or SNAPSHOT_DIR, dataset)
+    building = directory + ".building"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    for name, values in columns.items():
+        np.save(os.path.join(building, name + ".npy"), np.ascontiguousarray(values))
+    with open(os.path.join(building, "meta.json"), "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "rows": len(records),
+            "source_size": source.st_size,
+            "source_mtime_ns": source.st_mtime_ns,
+            "fields": specs,
+            "dictionaries": dictionaries
+        }, f)
+
+    # the finished directory replaces the old one, so readers never open a half written snapshot
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(building, directory)
+    return directory
+
+
+def build_all(snapshot_dir=None): # This builds the snapshots of all three datasets
+    return [build_snapshot(dataset, snapshot_dir=snapshot_dir) for dataset in DATASETS]
+
+
+if __name__ == "__main__":
+    for directory in build_all(sys.argv[1] if len(sys.argv) > 1 else None):
+        print(f"wrote {directory}")
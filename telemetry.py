@@ -0,0 +1,331 @@
+"""
+Lightweight instrumentation for the tools: timing spans and counters.
+
+Telemetry is off unless TRAVEL_PLANNER_TELEMETRY=1 is set (or enable() is
+called). While it is off, span() returns one shared no-op object and
+traced() functions call straight through, so the instrumented code pays
+about one attribute lookup per call.
+
+While it is on, every span is timed, nested under the span that was open
+when it started (per thread and per asyncio task), kept in a bounded
+buffer of recent spans, and added to a per-name latency histogram.
+Counters track cache hits and misses, rows scanned and reloads.
+
+Export formats:
+    prometheus_text()  Prometheus text exposition format
+    otlp_traces()      OpenTelemetry OTLP/JSON traces payload
+    otlp_metrics()     OpenTelemetry OTLP/JSON metrics payload
+"""
+
+import contextvars
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+SERVICE_NAME = "travel-planner"
+METRIC_PREFIX = "travel_planner"
+MAX_SPANS = 2000 # recent finished spans kept for the debug panel and the OTLP export
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class _State:
+    def __init__(self):
+        self.enabled = os.environ.get("TRAVEL_PLANNER_TELEMETRY", "").lower() in ("1", "true", "yes", "on")
+        self.lock = threading.Lock()
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.histograms = {} # span name -> [bucket counts..., +Inf count, sum of seconds]
+        self.counters = {} # (name, sorted label items) -> value
+        self.started_ns = time.time_ns()
+
+
+_state = _State()
+_current = contextvars.ContextVar("travel_planner_span", default=None)
+
+
+def enabled():
+    return _state.enabled
+
+
+def enable():
+    _state.enabled = True
+
+
+def disable():
+    _state.enabled = False
+
+
+def reset(): # This forgets every recorded span and counter
+    with _state.lock:
+        _state.spans.clear()
+        _state.histograms.clear()
+        _state.counters.clear()
+        _state.started_ns = time.time_ns()
+
+
+# ----------------------------------
+# Spans
+# ----------------------------------
+class _NoopSpan: # Returned by span() while telemetry is off
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key, value): # This adds an attribute, like the number of rows scanned
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current.get()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = os.urandom(8).hex()
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _record(self)
+        return False
+
+    @property
+    def seconds(self):
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+def span(name, **attributes):
+    """
+    Times a block of code.
+
+        with telemetry.span("filter_flights", source=source) as s:
+            ...
+            s.set("rows", len(found))
+
+    Returns a no-op context manager while telemetry is off.
+    """
+    if not _state.enabled:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def traced(name=None): # Decorator form of span(), named after the function unless a name is given (works on async functions too)
+    def decorate(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _state.enabled:
+                    return await func(*args, **kwargs)
+                with Span(span_name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current_span(): # The innermost open span, or the no-op span, so callers can always .set() on it
+    return (_current.get() if _state.enabled else None) or _NOOP
+
+
+def _record(finished):
+    seconds = finished.seconds
+    with _state.lock:
+        _state.spans.append(finished)
+        histogram = _state.histograms.get(finished.name)
+        if histogram is None:
+            histogram = _state.histograms[finished.name] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[len(BUCKETS)] += 1 # +Inf, which is also the count
+        histogram[-1] += seconds
+
+
+# ----------------------------------
+# Counters
+# ----------------------------------
+def count(name, value=1, **labels):
+    """
+    Adds to a counter, like count("geocode_cache", result="hit") or count("rows_scanned", 120, dataset="flights").
+    """
+    if not _state.enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _state.lock:
+        _state.counters[key] = _state.counters.get(key, 0) + value
+
+
+# ----------------------------------
+# Reading and exporting
+# ----------------------------------
+def recent_spans(limit=None): # Finished spans, oldest first
+    with _state.lock:
+        spans = list(_state.spans)
+    return spans[-limit:] if limit else spans
+
+
+def span_summary(): # span name -> {"count", "total_seconds", "mean_ms"}, for the debug panel
+    with _state.lock:
+        histograms = {name: list(values) for name, values in _state.histograms.items()}
+    return {
+        name: {
+            "count": values[len(BUCKETS)],
+            "total_seconds": values[-1],
+            "mean_ms": values[-1] / values[len(BUCKETS)] * 1000 if values[len(BUCKETS)] else 0.0
+        }
+        for name, values in sorted(histograms.items())
+    }
+
+
+def counters(): # [(name, labels dict, value)], sorted
+    with _state.lock:
+        items = sorted(_state.counters.items())
+    return [(name, dict(labels), value) for (name, labels), value in items]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(): # This renders all counters and span histograms in the Prometheus text format
+    with _state.lock:
+        histograms = {name: list(values) for name, values in _state.histograms.items()}
+        counter_items = sorted(_state.counters.items())
+
+    lines = []
+    metric = f"{METRIC_PREFIX}_span_duration_seconds"
+    lines.append(f"# HELP {metric} Duration of instrumented tool operations.")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, values in sorted(histograms.items()):
+        for bound, bucket_count in zip(BUCKETS, values):
+            lines.append(f"{metric}_bucket{_labels([('span', name), ('le', repr(bound))])} {bucket_count}")
+        lines.append(f"{metric}_bucket{_labels([('span', name), ('le', '+Inf')])} {values[len(BUCKETS)]}")
+        lines.append(f"{metric}_sum{_labels([('span', name)])} {values[-1]}")
+        lines.append(f"{metric}_count{_labels([('span', name)])} {values[len(BUCKETS)]}")
+
+    typed = set()
+    for (name, labels), value in counter_items:
+        metric = f"{METRIC_PREFIX}_{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)} # OTLP/JSON encodes 64-bit integers as strings
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(items):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in items]
+
+
+_RESOURCE = {"attributes": _otlp_attributes([("service.name", SERVICE_NAME)])}
+_SCOPE = {"name": "travel_planner.telemetry"}
+
+
+def otlp_traces(): # This returns the recent spans as an OTLP/JSON ExportTraceServiceRequest
+    spans = []
+    for finished in recent_spans():
+        item = {
+            "traceId": finished.trace_id,
+            "spanId": finished.span_id,
+            "name": finished.name,
+            "kind": 1, # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(finished.start_ns),
+            "endTimeUnixNano": str(finished.end_ns),
+            "attributes": _otlp_attributes(finished.attributes.items()),
+            "status": {"code": 2, "message": finished.error} if finished.error else {"code": 0}
+        }
+        if finished.parent_id:
+            item["parentSpanId"] = finished.parent_id
+        spans.append(item)
+    return {"resourceSpans": [{"resource": _RESOURCE, "scopeSpans": [{"scope": _SCOPE, "spans": spans}]}]}
+
+
+def otlp_metrics(): # This returns the counters and span histograms as an OTLP/JSON ExportMetricsServiceRequest
+    now = str(time.time_ns())
+    start = str(_state.started_ns)
+    with _state.lock:
+        histograms = {name: list(values) for name, values in _state.histograms.items()}
+        counter_items = sorted(_state.counters.items())
+
+    metrics = []
+    if histograms:
+        points = []
+        for name, values in sorted(histograms.items()):
+            cumulative = values[:len(BUCKETS)] + [values[len(BUCKETS)]]
+            # OTLP bucket counts are per bucket, not cumulative like Prometheus
+            per_bucket = [cumulative[0]] + [b - a for a, b in zip(cumulative, cumulative[1:])]
+            points.append({
+                "attributes": _otlp_attributes([("span", name)]),
+                "startTimeUnixNano": start,
+                "timeUnixNano": now,
+                "count": str(values[len(BUCKETS)]),
+                "sum": values[-1],
+                "bucketCounts": [str(c) for c in per_bucket],
+                "explicitBounds": list(BUCKETS)
+            })
+        metrics.append({
+            "name": f"{METRIC_PREFIX}.span.duration",
+            "unit": "s",
+            "histogram": {"dataPoints": points, "aggregationTemporality": 2} # CUMULATIVE
+        })
+
+    by_name = {}
+    for (name, labels), value in counter_items:
+        by_name.setdefault(name, []).append({
+            "attributes": _otlp_attributes(labels),
+            "startTimeUnixNano": start,
+            "timeUnixNano": now,
+            ("asDouble" if isinstance(value, float) else "asInt"): value if isinstance(value, float) else str(value)
+        })
+    for name, points in by_name.items():
+        metrics.append({
+            "name": f"{METRIC_PREFIX}.{name}",
+            "sum": {"dataPoints": points, "aggregationTemporality": 2, "isMonotonic": True}
+        })
+    return {"resourceMetrics": [{"resource": _RESOURCE, "scopeMetrics": [{"scope": _SCOPE, "metrics": metrics}]}]}
@@ -0,0 +1,104 @@
+"""
+Tests for the connection search (connections.py), against a brute-force search of small random flight graphs.
+
+Usage:
+    python -m pytest tests
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connections import ConnectionGraph # noqa: E402
+from flight import FlightTable # noqa: E402
+from records import Flight # noqa: E402
+
+MIN_CONNECTION = 30 # minutes
+
+
+def flight(number, source, destination, departure, minutes, price):
+    return Flight.from_dict({
+        "flight_id": f"F{number}", "airline": "X", "from": source, "to": destination,
+        "departure_time": departure.isoformat(), "arrival_time": (departure + timedelta(minutes=minutes)).isoformat(),
+        "price": price
+    })
+
+
+def random_flights(rng, n, cities=5, span_minutes=4 * 24 * 60):
+    names = [f"C{i}" for i in range(cities)]
+    start = datetime(2025, 1, 1)
+    flights = []
+    for number in range(n):
+        source, destination = rng.sample(names, 2)
+        departure = start + timedelta(minutes=rng.randint(0, span_minutes))
+        flights.append(flight(number, source, destination, departure, rng.randint(60, 400), rng.randint(1000, 9000)))
+    return flights
+
+
+def brute_force(table, source, destination, objective, max_layover, max_legs):
+    # every itinerary that never visits a city twice, by walking all flights from every city
+    costs = []
+    start, goal = table.code(source), table.code(destination)
+
+    def walk(rows, visited):
+        last = rows[-1]
+        if table.to_code[last] == goal:
+            if objective == "price":
+                costs.append(sum(int(table.price[row]) for row in rows))
+            else:
+                costs.append((table.arrival[last] - table.departure[rows[0]]) / 60)
+            return
+        if len(rows) == max_legs:
+            return
+        for row in range(len(table)):
+            gap = table.departure[row] - table.arrival[last]
+            if (table.from_code[row] == table.to_code[last] and table.to_code[row] not in visited
+                    and gap >= MIN_CONNECTION * 60 and (max_layover is None or gap <= max_layover * 60)):
+                walk(rows + [row], visited | {table.to_code[row]})
+
+    for row in range(len(table)):
+        if table.from_code[row] == start:
+            walk([row], {start, table.to_code[row]})
+    return sorted(costs)
+
+
+# ----------------------------------
+# Against brute force
+# ----------------------------------
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("max_legs", [3, 4])
+def test_search_matches_brute_force(seed, max_legs):
+    rng = random.Random(seed * 10 + max_legs)
+    table = FlightTable(random_flights(rng, 120 if max_legs == 3 else 60))
+    graph = ConnectionGraph(table)
+    for objective in ("price", "elapsed"):
+        for max_layover in (None, 600):
+            found = graph.search(
+                "C0", "C1", k=4, objective=objective, max_legs=max_legs,
+                min_connection_minutes=MIN_CONNECTION, max_layover_minutes=max_layover
+            )
+            key = "total_price" if objective == "price" else "total_duration_minutes"
+            expected = brute_force(table, "C0", "C1", objective, max_layover, max_legs)[:4]
+            assert [itinerary[key] for itinerary in found] == expected, (objective, max_layover)
+
+
+# ----------------------------------
+# Pruning
+# ----------------------------------
+def test_a_label_is_not_pruned_by_one_that_visited_other_cities():
+    # S-X-Y is cheaper and lands as early as S-Z-Y, but the only way on from Y goes back through X
+    at = lambda hour: datetime(2025, 1, 1, hour) # noqa: E731
+    flights = [
+        flight(1, "S", "X", at(1), 60, 100), flight(2, "X", "Y", at(3), 120, 100),
+        flight(3, "S", "Z", at(1), 60, 200), flight(4, "Z", "Y", at(3), 120, 200),
+        flight(5, "Y", "X", at(6), 60, 100), flight(6, "X", "T", at(8), 60, 100)
+    ]
+    found = ConnectionGraph(FlightTable(flights)).search(
+        "S", "T", k=1, max_legs=4, min_connection_minutes=MIN_CONNECTION, max_layover_minutes=120
+    )
+    assert [[leg["to"] for leg in itinerary["legs"]] for itinerary in found] == [["Z", "Y", "X", "T"]]
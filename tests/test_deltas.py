@@ -0,0 +1,155 @@
+"""
+Tests for the change-data deltas (deltas.py) and how the indexes apply and compact them (datastore.py),
+on copies of the data files in a temporary TRAVEL_PLANNER_DATA_DIR.
+
+Usage:
+    python -m pytest tests
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datastore # noqa: E402
+import flight # noqa: E402
+import hotels # noqa: E402
+import places # noqa: E402
+import snapshot # noqa: E402
+from datastore import data_path # noqa: E402
+from deltas import DATASETS, append_deltas, delta_path, delta_size # noqa: E402
+
+NEW_FLIGHT = {
+    "flight_id": "FL9001", "airline": "DeltaAir", "from": "Hyderabad", "to": "Delhi",
+    "departure_time": "2025-01-04T06:00:00", "arrival_time": "2025-01-04T08:00:00", "price": 999
+}
+NEW_HOTEL = {
+    "hotel_id": "HOT9001", "name": "Delta Inn", "city": "Delhi", "stars": 3, "price_per_night": 1001,
+    "amenities": ["wifi", "rooftop bar"] # an amenity no hotel in the file has
+}
+NEW_PLACE = {"place_id": "PLC9001", "name": "Delta Beach", "city": "Goa", "type": "beach", "rating": 5.0}
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    # copies of the data files, and fresh indexes over them in place of the shared ones
+    for name, _, _ in DATASETS.values():
+        shutil.copy(os.path.join(ROOT, name), tmp_path / name)
+    monkeypatch.setenv("TRAVEL_PLANNER_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(datastore, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setattr(flight, "_flight_index", flight.FlightIndex())
+    monkeypatch.setattr(hotels, "_hotel_index", hotels.HotelIndex())
+    monkeypatch.setattr(places, "_place_index", places.PlaceIndex())
+    return tmp_path
+
+
+def append(dataset, *ops):
+    file_name, id_field, record_type = DATASETS[dataset]
+    return append_deltas(data_path(file_name), ops, id_field, record_type)
+
+
+def find_flight():
+    return flight.flight_search_tool.func("Hyderabad", "Delhi", "cheapest")
+
+
+def find_hotel(amenities=None):
+    return hotels.hotel_search_tool.func("Delhi", 1500, 1, "cheapest", amenities)
+
+
+def best_place():
+    return places.location_search_tool.func("Goa", "all", 1)["itinerary"]["Day 1"][0]["name"]
+
+
+# ----------------------------------
+# Upserts and deletes, through the tools
+# ----------------------------------
+def test_flight_upsert_and_delete():
+    before = find_flight()
+    append("flights", {"op": "upsert", "record": NEW_FLIGHT})
+    assert find_flight()["flight"]["price"] == 999
+
+    append("flights", {"op": "upsert", "record": {**NEW_FLIGHT, "price": 1999}}) # replaces the row, does not add one
+    assert find_flight()["flight"]["price"] == 1999
+    assert sum(f["flight_id"] == "FL9001" for f in flight.load_flights()) == 1
+
+    append("flights", {"op": "delete", "id": "FL9001"})
+    assert find_flight() == before
+
+
+def test_fare_calendar_follows_the_deltas():
+    def january():
+        return {day["date"]: day for day in flight.fare_calendar_tool.func("Hyderabad", "Delhi", "2025-01")["calendar"]}
+
+    before = january()
+    append("flights", {"op": "upsert", "record": NEW_FLIGHT})
+    assert january()["2025-01-04"]["min_price"] == 999
+    assert january()["2025-01-04"]["flights"] == before["2025-01-04"]["flights"] + 1
+
+    append("flights", {"op": "upsert", "record": {**NEW_FLIGHT, "departure_time": "2025-01-20T06:00:00", "arrival_time": "2025-01-20T08:00:00"}})
+    assert january()["2025-01-04"] == before["2025-01-04"] # the flight moved to another day
+    assert january()["2025-01-20"]["min_price"] == 999
+
+
+def test_hotel_delta_with_a_new_amenity():
+    assert "hotel" not in find_hotel(["rooftop bar"])
+    append("hotels", {"op": "upsert", "record": NEW_HOTEL})
+    assert "rooftop bar" in hotels.get_hotel_index().amenities
+    assert find_hotel(["Rooftop Bar"])["hotel"]["name"] == "Delta Inn"
+    assert find_hotel(["wifi"])["hotel"]["name"] == "Delta Inn" # the old amenities still match
+
+    append("hotels", {"op": "delete", "id": "HOT9001"})
+    assert "hotel" not in find_hotel(["rooftop bar"])
+
+
+def test_place_upsert_and_delete():
+    before = best_place()
+    append("places", {"op": "upsert", "record": NEW_PLACE})
+    assert best_place() == "Delta Beach"
+
+    append("places", {"op": "delete", "id": "PLC9001"})
+    assert best_place() == before
+
+
+# ----------------------------------
+# Compaction
+# ----------------------------------
+def test_compact_writes_the_deltas_into_the_file():
+    append("flights", {"op": "upsert", "record": NEW_FLIGHT}, {"op": "delete", "id": "FL0001"})
+    index = flight.get_flight_index()
+    assert index.compact()
+
+    assert delta_size(delta_path(data_path("flights.json"))) == 0
+    with open(data_path("flights.json"), "r") as f:
+        ids = [record["flight_id"] for record in json.load(f)]
+    assert "FL9001" in ids and "FL0001" not in ids
+    assert find_flight()["flight"]["price"] == 999
+    assert not index.compact() # nothing left to compact
+
+    fresh = flight.FlightIndex().refresh() # a new process reads the compacted file
+    assert [f.flight_id for f in fresh.live_records()] == ids
+
+
+# ----------------------------------
+# Malformed lines
+# ----------------------------------
+def test_a_bad_line_is_skipped():
+    with open(delta_path(data_path("places.json")), "a") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"op": "upsert", "record": {**NEW_PLACE, "rating": "five"}}) + "\n") # wrong type
+        f.write(json.dumps({"op": "upsert", "record": NEW_PLACE}) + "\n")
+
+    with pytest.warns(UserWarning, match="skipped delta"):
+        assert best_place() == "Delta Beach"
+    assert best_place() == "Delta Beach" # the bad lines are not read again
+
+
+def test_append_rejects_a_bad_record():
+    with pytest.raises(ValueError):
+        append("hotels", {"op": "upsert", "record": {**NEW_HOTEL, "stars": "3"}})
+    assert delta_size(delta_path(data_path("hotels.json"))) == 0
@@ -0,0 +1,77 @@
+"""
+Tests for the trip optimizer (optimizer.py): the Pareto frontier against a brute-force one, and optimize_trips on the bundled data.
+
+Usage:
+    python -m pytest tests
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optimizer import optimize_trips, pareto_frontier # noqa: E402
+
+
+def dominates(a, b): # a is at least as good as b on cost, duration, stars and days, and better on one
+    at_least = a[0] <= b[0] and a[1] <= b[1] and a[2] >= b[2] and a[3] >= b[3]
+    return at_least and a[:4] != b[:4]
+
+
+def brute_force_frontier(candidates): # the distinct (cost, duration, stars, days) that nothing dominates
+    return {c[:4] for c in candidates if not any(dominates(other, c) for other in candidates)}
+
+
+# ----------------------------------
+# pareto_frontier
+# ----------------------------------
+@pytest.mark.parametrize("seed", range(10))
+def test_frontier_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(30):
+        # few distinct values, so there are plenty of ties on every axis
+        candidates = [
+            (rng.randint(1, 8), rng.randint(1, 8), rng.randint(1, 5), rng.randint(1, 4), i)
+            for i in range(rng.randint(0, 40))
+        ]
+        frontier = pareto_frontier(candidates)
+
+        points = [c[:4] for c in frontier]
+        assert len(points) == len(set(points)) # one candidate per point
+        assert set(points) == brute_force_frontier(candidates), candidates
+        assert [c[0] for c in frontier] == sorted(c[0] for c in frontier) # cheapest first
+
+
+def test_frontier_keeps_a_longer_trip_that_costs_more():
+    short = (1000, 120, 3, 2, "short")
+    longer = (1500, 120, 3, 4, "longer")
+    assert pareto_frontier([longer, short]) == [short, longer]
+    assert pareto_frontier([short, (1500, 120, 3, 2, "dearer")]) == [short]
+
+
+# ----------------------------------
+# optimize_trips
+# ----------------------------------
+def test_optimize_trips_over_several_lengths():
+    trips = optimize_trips("Hyderabad", 30000, range(2, 6))
+    assert trips
+    for trip in trips:
+        assert 2 <= trip["days"] <= 5
+        assert trip["budget"]["total_cost"] <= 30000
+
+    points = [
+        (t["budget"]["total_cost"], t["flight"]["duration_minutes"], t["hotel"]["rating"], t["days"], None) for t in trips
+    ]
+    assert {p[:4] for p in points} == brute_force_frontier(points)
+    one_length = {(t["destination"], t["budget"]["total_cost"]) for t in optimize_trips("Hyderabad", 30000, 5)}
+    assert one_length >= {(t["destination"], t["budget"]["total_cost"]) for t in trips if t["days"] == 5}
+
+
+def test_optimize_trips_rejects_no_lengths():
+    with pytest.raises(ValueError):
+        optimize_trips("Hyderabad", 30000, [])
+    with pytest.raises(ValueError):
+        optimize_trips("Hyderabad", 30000, 0)
@@ -0,0 +1,132 @@
+"""
+Tests for the planning orchestrator (planner.py), with fake tools and a fake LLM, so they need no network.
+
+Usage:
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.tools import StructuredTool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import planner # noqa: E402
+from planner import Step, read_trip, run_steps # noqa: E402
+
+
+def fake_tool(name, answer, calls): # A tool that records when it was called and returns answer(arguments)
+    def run(value: int = 0):
+        calls.append(name)
+        return answer(value)
+    return StructuredTool.from_function(func=run, name=name, description=f"fake {name}")
+
+
+def step(name, calls, after=(), answer=lambda value: {"value": value}, succeeded=lambda result: "value" in result):
+    return Step(name, fake_tool(name, answer, calls), lambda found: {"value": sum(r["value"] for r in found.values())}, succeeded, after)
+
+
+# ----------------------------------
+# run_steps
+# ----------------------------------
+def test_steps_run_after_the_steps_they_need():
+    calls = []
+    steps = [
+        step("total", calls, after=("a", "b")), # listed first, but needs a and b
+        step("a", calls, answer=lambda value: {"value": 1}),
+        step("b", calls, answer=lambda value: {"value": 2})
+    ]
+    outcomes = asyncio.run(run_steps(steps))
+
+    assert list(outcomes) == ["total", "a", "b"] # in step order
+    assert calls.index("total") > calls.index("a") and calls.index("total") > calls.index("b")
+    assert outcomes["total"] == {"status": "ok", "result": {"value": 3}, "seconds": outcomes["total"]["seconds"]}
+
+
+def test_a_step_after_a_failed_step_is_skipped():
+    calls = []
+    steps = [
+        step("flight", calls, answer=lambda value: {"message": "No flights found"}),
+        step("hotel", calls, answer=lambda value: {"value": 5}),
+        step("budget", calls, after=("flight", "hotel"))
+    ]
+    outcomes = asyncio.run(run_steps(steps))
+
+    assert outcomes["flight"]["status"] == "failed"
+    assert outcomes["hotel"]["status"] == "ok"
+    assert outcomes["budget"]["status"] == "skipped"
+    assert "budget" not in calls
+
+
+def test_a_raising_tool_fails_only_its_branch():
+    calls = []
+
+    def explode(value):
+        raise RuntimeError("boom")
+
+    outcomes = asyncio.run(run_steps([step("broken", calls, answer=explode), step("fine", calls)]))
+
+    assert outcomes["broken"]["status"] == "error"
+    assert "RuntimeError: boom" in outcomes["broken"]["result"]["message"]
+    assert outcomes["fine"]["status"] == "ok"
+
+
+def test_cycles_and_unknown_steps_are_rejected():
+    calls = []
+    with pytest.raises(ValueError, match="cycle"):
+        asyncio.run(run_steps([step("a", calls, after=("b",)), step("b", calls, after=("a",))]))
+    with pytest.raises(ValueError, match="unknown step"):
+        asyncio.run(run_steps([step("a", calls, after=("missing",))]))
+    assert calls == []
+
+
+# ----------------------------------
+# Reading trips with a fake LLM
+# ----------------------------------
+def test_read_trip_takes_the_json_out_of_the_reply():
+    llm = FakeListChatModel(responses=['Sure! {"source": "Hyderabad", "destination": "Goa", "days": 2, "bogus": 1} Enjoy.'])
+    assert read_trip("2 days in Goa from Hyderabad", llm) == {"source": "Hyderabad", "destination": "Goa", "days": 2}
+
+
+def test_read_trip_rejects_a_reply_without_json():
+    llm = FakeListChatModel(responses=["I cannot help with that."])
+    with pytest.raises(ValueError, match="JSON object"):
+        read_trip("somewhere nice", llm)
+
+
+def test_make_trip_checks_the_fields():
+    assert planner.make_trip({"source": "Hyderabad", "destination": "Delhi", "days": "4"})["days"] == 4
+    for request in (
+        {"source": "Hyderabad"},
+        {"source": "Hyderabad", "destination": "Delhi", "category": 5},
+        {"source": "Hyderabad", "destination": "Delhi", "days": 100000000},
+        {"source": "Hyderabad", "destination": "Delhi", "start_date": "04/01/2025"},
+        {"source": "Hyderabad", "destination": "Delhi", "hotel": "any"}
+    ):
+        with pytest.raises(ValueError):
+            planner.make_trip(request)
+
+
+def test_plan_from_text_with_a_fake_llm(monkeypatch):
+    # the weather step gets a fake tool, so the plan needs no network; the other tools use the bundled data
+    forecast = [{"date": "2025-01-04", "condition": "Clear sky", "temp_range": "20–30 °C"}]
+    weather = StructuredTool.from_function(
+        func=lambda city, start_date, end_date: forecast, name="weather_lookup_tool", description="fake weather"
+    )
+    monkeypatch.setattr(planner, "weather_lookup_tool", weather)
+    llm = FakeListChatModel(responses=[
+        '{"source": "Hyderabad", "destination": "Delhi", "days": 3, "start_date": "2025-01-04", "hotel_price": 6000}',
+        "Three days in Delhi."
+    ])
+
+    plan = planner.plan_from_text("3 days in Delhi from Hyderabad on 2025-01-04", llm, summarize=True)
+
+    assert plan["status"] == "success", plan["message"]
+    assert plan["message"] == "Three days in Delhi."
+    assert plan["data"]["weather"] == forecast
+    assert plan["data"]["budget"]["total_cost"] > 0
+    assert set(plan["seconds"]) == {"flight", "hotel", "weather", "places", "budget"}
@@ -0,0 +1,114 @@
+"""
+Tests for the weather HTTP client, circuit breaker and caches (weather.py), against the local stub server (weather_stub.py).
+
+Usage:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weather # noqa: E402
+from weather import CircuitBreaker, ForecastCache, GeocodeCache, WeatherHttpClient, WeatherServiceError # noqa: E402
+from weather_stub import start_stub_server # noqa: E402
+
+DATES = {"start_date": "2025-12-17", "end_date": "2025-12-19"}
+RESET_SECONDS = 0.2 # breaker reset timeout in these tests
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    # a fresh client (no backoff, a quick breaker) and fresh caches, all pointed at the stub
+    server = start_stub_server()
+    client = WeatherHttpClient(backoff=0)
+    client._breakers[server.url.split("//")[1]] = CircuitBreaker(failure_threshold=2, reset_timeout=RESET_SECONDS)
+    monkeypatch.setattr(weather, "GEOCODING_URL", server.geocoding_url)
+    monkeypatch.setattr(weather, "FORECAST_URL", server.forecast_url)
+    monkeypatch.setattr(weather, "http_client", client)
+    monkeypatch.setattr(weather, "geocode_cache", GeocodeCache(str(tmp_path / "geocode.sqlite"), negative_ttl=0))
+    monkeypatch.setattr(weather, "forecast_cache", ForecastCache(ttl=0)) # every lookup asks the API, stale days are the fallback
+    yield server
+    server.stop()
+
+
+def breaker(stub):
+    return weather.http_client.breaker(stub.url)
+
+
+def lookup(city):
+    return weather.weather_lookup_tool.invoke({"city": city, **DATES})
+
+
+# ----------------------------------
+# HTTP client
+# ----------------------------------
+def test_a_503_is_retried(stub):
+    stub.fail_requests = 2 # the client retries twice
+    assert "results" in weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert stub.request_count == 3
+    assert breaker(stub).failures == 0
+
+
+def test_a_503_after_the_retries_is_an_error(stub):
+    stub.fail_requests = 3
+    with pytest.raises(WeatherServiceError):
+        weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert breaker(stub).failures == 1
+
+
+def test_a_body_that_is_not_json_is_an_error(stub):
+    stub.invalid_json_requests = 1
+    with pytest.raises(WeatherServiceError, match="not JSON"):
+        weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert breaker(stub).failures == 1
+
+    stub.invalid_json_requests = 1
+    assert lookup("Delhi") == weather.UNAVAILABLE_MESSAGE
+
+
+# ----------------------------------
+# Circuit breaker
+# ----------------------------------
+def test_the_breaker_opens_and_half_opens(stub):
+    stub.fail_requests = 6 # two calls, each with two retries
+    for _ in range(2):
+        with pytest.raises(WeatherServiceError):
+            weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert breaker(stub).state == "open"
+
+    sent = stub.request_count
+    with pytest.raises(WeatherServiceError, match="circuit open"):
+        weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert stub.request_count == sent # an open circuit fails fast, without a request
+
+    time.sleep(RESET_SECONDS)
+    assert breaker(stub).state == "half-open"
+    stub.fail_requests = 3 # the one trial request fails, so the circuit opens again
+    with pytest.raises(WeatherServiceError):
+        weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"})
+    assert breaker(stub).state == "open"
+
+    time.sleep(RESET_SECONDS)
+    assert "results" in weather.http_client.get_json(stub.geocoding_url, {"name": "Delhi"}) # a good trial closes it
+    assert breaker(stub).state == "closed"
+
+
+def test_stale_data_is_served_while_the_breaker_is_open(stub):
+    forecast = lookup("Delhi")
+    assert isinstance(forecast, list) and len(forecast) == 3
+    assert lookup("Atlantis") == {"message": "City not found"} # cached as unknown, and expired at once (negative_ttl=0)
+
+    stub.fail_requests = 10 ** 6
+    breaker(stub).failures = breaker(stub).failure_threshold
+    breaker(stub).opened_at = time.monotonic()
+    sent = stub.request_count
+
+    assert lookup("Delhi") == forecast # expired forecast days, and the cached coordinates
+    assert lookup("Atlantis") == {"message": "City not found"} # the expired "not found"
+    assert lookup("Mumbai") == weather.UNAVAILABLE_MESSAGE # nothing cached to fall back on
+    assert stub.request_count == sent
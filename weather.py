@@ -1,15 +1,246 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_city_coordinates(city): # This function uses the open metep api, to return the city coordinates (latitude and longitude)
-    url = "https://geocoding-api.open-meteo.com/v1/search" # This is the url for the api
+import telemetry
+from datastore import data_path
+
+# ----------------------------------
+# HTTP client for the Open-Meteo APIs
+# One pooled session (keep-alive connections), connect/read timeouts, a few
+# retries with backoff, and a circuit breaker per upstream host so a stalled
+# API fails fast instead of blocking Streamlit workers.
+# The base urls can be pointed at a local stub server (see weather_stub.py).
+# ----------------------------------
+GEOCODING_URL = os.environ.get("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+
+HTTP_TIMEOUT = (3.05, 10) # (connect, read) timeout in seconds
+HTTP_RETRIES = 2
+HTTP_BACKOFF_SECONDS = 0.3 # waits 0.3s, 0.6s, ... between retries
+HTTP_POOL_SIZE = 20
+BREAKER_FAILURE_THRESHOLD = 5 # consecutive failures before the circuit opens
+BREAKER_RESET_SECONDS = 30 # how long an open circuit waits before letting one trial request through
+
+
+class WeatherServiceError(Exception): # Raised when the weather API cannot be reached or keeps failing
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None # None while the circuit is closed
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self): # This returns True if a request may be sent now
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running: # one trial request decides whether we close again
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class WeatherHttpClient:
+    def __init__(self, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF_SECONDS, pool_size=HTTP_POOL_SIZE):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",)
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._breakers = {} # host -> CircuitBreaker
+        self._lock = threading.Lock()
+
+    def breaker(self, url): # This returns the circuit breaker of the url's host
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+    def get_json(self, url, params):
+        """
+        Sends a GET request and returns the decoded JSON body.
+
+        Raises:
+            WeatherServiceError: if the circuit is open, the request fails after
+            its retries, the server answers with a 5xx status, or the body is not JSON
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            telemetry.count("http_requests", host=host, outcome="circuit_open")
+            raise WeatherServiceError(f"{host} is unavailable (circuit open)")
+
+        with telemetry.span("http_get", host=host, path=urlsplit(url).path) as span:
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as error: # connection errors, timeouts and exhausted retries
+                breaker.record_failure()
+                telemetry.count("http_requests", host=host, outcome="error")
+                raise WeatherServiceError(str(error)) from error
+
+            span.set("status", response.status_code)
+            if response.status_code >= 500:
+                breaker.record_failure()
+                telemetry.count("http_requests", host=host, outcome="5xx")
+                raise WeatherServiceError(f"{url} answered with status {response.status_code}")
+
+            try:
+                data = response.json() # 4xx answers still carry a JSON body (e.g. {"error": true, "reason": ...})
+            except ValueError as error: # a proxy's HTML page or a cut off body
+                breaker.record_failure()
+                telemetry.count("http_requests", host=host, outcome="invalid_json")
+                raise WeatherServiceError(f"{url} answered with a body that is not JSON: {error}") from error
+
+            breaker.record_success()
+            telemetry.count("http_requests", host=host, outcome="ok")
+            return data
+
+
+http_client = WeatherHttpClient()
+
+# ----------------------------------
+# Geocoding cache
+# A city's coordinates never change, so every answer from the geocoding API
+# is kept in a small SQLite file, with an in-process LRU in front of it.
+# Unknown names are cached too (as "not found"), but only for a while.
+# ----------------------------------
+GEOCODE_CACHE_PATH = data_path("geocode_cache.sqlite")
+GEOCODE_LRU_SIZE = 1024
+NEGATIVE_TTL_SECONDS = 24 * 60 * 60 # how long an unknown city name stays "not found" before we ask the API again
+
+
+class GeocodeCache:
+    def __init__(self, path=GEOCODE_CACHE_PATH, lru_size=GEOCODE_LRU_SIZE, negative_ttl=NEGATIVE_TTL_SECONDS):
+        self.path = path
+        self.lru_size = lru_size
+        self.negative_ttl = negative_ttl
+        self._lru = OrderedDict() # normalized name -> ((lat, lon) or None, time it was stored)
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def key(city): # This gives one cache key for "Delhi", " delhi" and "DELHI"
+        return city.strip().lower()
+
+    def _connection(self): # The SQLite file is opened on first use, and shared between threads behind the lock
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS coordinates ("
+                "name TEXT PRIMARY KEY, latitude REAL, longitude REAL, stored_at REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, entry): # This puts an entry at the front of the LRU, evicting the oldest one if full
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _fresh(self, entry):
+        coords, stored_at = entry
+        return coords is not None or time.time() - stored_at < self.negative_ttl
+
+    def get(self, city, allow_stale=False):
+        """
+        Looks up a city in the cache.
+
+        Args:
+            city (str): City name
+            allow_stale (bool): Also return an expired "not found" entry
+
+        Returns:
+            tuple: (found, coords) where found is False on a miss, and
+            coords is (latitude, longitude), or None for a cached unknown city
+        """
+        key = self.key(city)
+        with self._lock:
+            entry = self._lru.get(key)
+            layer = "lru"
+            if entry is None:
+                layer = "sqlite"
+                row = self._connection().execute(
+                    "SELECT latitude, longitude, stored_at FROM coordinates WHERE name = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    latitude, longitude, stored_at = row
+                    entry = (None if latitude is None else (latitude, longitude), stored_at)
+            if entry is None or not (allow_stale or self._fresh(entry)):
+                telemetry.count("geocode_cache", result="miss")
+                return False, None
+            telemetry.count("geocode_cache", result=f"{layer}_hit")
+            self._remember(key, entry)
+            return True, entry[0]
+
+    def put(self, city, coords): # coords is (latitude, longitude), or None for a city the API does not know
+        key = self.key(city)
+        entry = (None if coords is None else tuple(coords), time.time())
+        latitude, longitude = entry[0] if entry[0] is not None else (None, None)
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO coordinates (name, latitude, longitude, stored_at) VALUES (?, ?, ?, ?)",
+                (key, latitude, longitude, entry[1])
+            )
+            self._connection().commit()
+            self._remember(key, entry)
+
+
+geocode_cache = GeocodeCache()
+
+
+@telemetry.traced()
+def geocode_city(city): # This function asks the Open-Meteo geocoding API for the city coordinates (latitude and longitude)
     params = {
         "name": city,
         "count": 1 # Count = 1 will only return the one best match
     }
 
-    response = requests.get(url, params=params) # we sent the response to the API and store the data in a json file
-    data = response.json()
+    data = http_client.get_json(GEOCODING_URL, params) # we sent the request through the pooled client and decode the json answer
 
     if "results" not in data:
         return None
@@ -18,22 +249,252 @@ def get_city_coordinates(city): # This function uses the open metep api, to retu
     return location["latitude"], location["longitude"] # here we will return the city coordinates
 
 
+@telemetry.traced()
+def get_city_coordinates(city): # This function returns the city coordinates, from the cache when we have looked the city up before
+    found, coords = geocode_cache.get(city)
+    if found:
+        return coords
+
+    try:
+        coords = geocode_city(city)
+    except WeatherServiceError:
+        found, coords = geocode_cache.get(city, allow_stale=True) # while the API is down, an expired answer is better than none
+        if found:
+            return coords
+        raise
+    geocode_cache.put(city, coords) # unknown cities are cached as None, so they do not cost a request every time
+    return coords
+
+
+def seed_geocode_cache(data_files=("flights.json", "hotels.json", "places.json")):
+    """
+    Pre-seeds the geocoding cache with every city mentioned in the data files.
+
+    Args:
+        data_files (tuple): JSON files with "from"/"to" or "city" fields
+
+    Returns:
+        dict: city -> coordinates (or None) for every city that was seeded
+    """
+    cities = set()
+    for name in data_files:
+        with open(data_path(name), "r") as f:
+            for record in json.load(f):
+                cities.update(record[field] for field in ("from", "to", "city") if field in record)
+
+    return {city: get_city_coordinates(city) for city in sorted(cities)}
+
+
+
+@telemetry.traced()
+def request_forecasts(locations, start_date, end_date): # This function asks the forecast API directly, without any cache
+    results = []
+    # the API takes comma separated latitude/longitude lists, so one request covers FORECAST_BATCH_SIZE locations
+    for i in range(0, len(locations), FORECAST_BATCH_SIZE):
+        batch = locations[i:i + FORECAST_BATCH_SIZE]
+        params = {
+            "latitude": ",".join(str(lat) for lat, _ in batch),
+            "longitude": ",".join(str(lon) for _, lon in batch),
+            "start_date": start_date,
+            "end_date": end_date,
+            "daily": list(DAILY_FIELDS),
+            "timezone": "auto"
+        }
+
+        data = http_client.get_json(FORECAST_URL, params)
+        if isinstance(data, list): # several locations come back as a list, one location as a single object
+            results.extend(data)
+        else:
+            results.extend([data] * len(batch)) # a single object is also how the API reports an error for the whole batch
+
+    return results  # this will returm the data for every location between the given start and end dates
+
+
+def request_forecast(lat, lon, start_date, end_date): # The same request for one location
+    return request_forecasts([(lat, lon)], start_date, end_date)[0]
+
 
+# ----------------------------------
+# Forecast cache
+# Streamlit reruns ask for the same forecast again and again, so every day of a
+# forecast is cached per location for FORECAST_TTL_SECONDS. A shifted date window
+# only fetches the days we do not have yet, and identical requests that arrive
+# at the same time share one fetch. Expired days are kept a while longer, and
+# served when the forecast API is unavailable.
+# ----------------------------------
+DAILY_FIELDS = ("temperature_2m_max", "temperature_2m_min", "weathercode")
+FORECAST_TTL_SECONDS = 30 * 60
+FORECAST_STALE_SECONDS = 24 * 60 * 60 # expired days older than this are dropped, even during an outage
+FORECAST_MAX_LOCATIONS = 256
+FORECAST_BATCH_SIZE = 50 # locations per forecast request, which keeps the url short
+
+
+class _InFlight: # One upstream fetch that other threads can wait for
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ForecastCache:
+    def __init__(self, fetch=request_forecasts, ttl=FORECAST_TTL_SECONDS, max_locations=FORECAST_MAX_LOCATIONS, stale_ttl=FORECAST_STALE_SECONDS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_locations = max_locations
+        self._locations = OrderedDict() # (lat, lon) -> {"meta": top level fields, "days": {date: (values, stored_at)}}
+        self._inflight = {} # (locations, start, end) -> _InFlight
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(lat, lon): # coordinates are rounded, so tiny float differences still hit the same entry
+        return round(float(lat), 4), round(float(lon), 4)
+
+    def _missing_days(self, key, days, now, ttl): # This returns the days that are not cached (or older than ttl) for a location
+        location = self._locations.get(key)
+        if location is None:
+            return list(days)
+        cached = location["days"]
+        return [day for day in days if day not in cached or now - cached[day][1] >= ttl]
+
+    def _fetch_coalesced(self, keys, start_date, end_date): # Only one thread fetches a given request, the others wait for it
+        request_key = (tuple(keys), start_date, end_date)
+        with self._lock:
+            pending = self._inflight.get(request_key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[request_key] = _InFlight()
+
+        if not leader:
+            telemetry.count("forecast_fetches", result="coalesced")
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = self.fetch(list(keys), start_date, end_date)
+            return pending.result
+        except Exception as error:
+            pending.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[request_key]
+            pending.done.set()
+
+    def _store(self, key, data, now): # This splits a forecast response into per-day entries
+        daily = data["daily"]
+        meta = {name: value for name, value in data.items() if name not in ("daily", "daily_units")}
+        meta["daily_units"] = data.get("daily_units", {})
+        with self._lock:
+            location = self._locations.get(key)
+            if location is None:
+                location = self._locations[key] = {"meta": meta, "days": {}}
+            location["meta"] = meta
+            days = location["days"]
+            for i, day in enumerate(daily["time"]):
+                days[day] = (tuple(daily[field][i] for field in DAILY_FIELDS), now)
+            for day in [day for day, (_, stored_at) in days.items() if now - stored_at >= self.stale_ttl]:
+                del days[day] # expired days are dropped whenever we write, so a location never grows without bound
+            self._locations.move_to_end(key)
+            while len(self._locations) > self.max_locations:
+                self._locations.popitem(last=False)
+
+    def _assemble(self, key, days): # This rebuilds an API shaped response from the cached days, or returns None if the location was evicted
+        with self._lock:
+            location = self._locations.get(key)
+            if location is None:
+                return None
+            self._locations.move_to_end(key)
+            cached = [(day, location["days"][day][0]) for day in days if day in location["days"]]
+            data = dict(location["meta"])
+        data["daily"] = {"time": [day for day, _ in cached]}
+        for i, field in enumerate(DAILY_FIELDS):
+            data["daily"][field] = [values[i] for _, values in cached]
+        return data
+
+    def get(self, lat, lon, start_date, end_date):
+        """
+        Returns the forecast for a location and date range, fetching only the days that are missing.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            start_date (str): Start date (YYYY-MM-DD)
+            end_date (str): End date (YYYY-MM-DD)
+
+        Returns:
+            dict: Weather data in the same shape as the forecast API returns it
+        """
+        return self.get_many([(lat, lon)], start_date, end_date)[0]
+
+    def get_many(self, locations, start_date, end_date):
+        """
+        Returns the forecasts for several locations, with one request for all the missing days.
+
+        Args:
+            locations (list): (latitude, longitude) pairs
+            start_date (str): Start date (YYYY-MM-DD)
+            end_date (str): End date (YYYY-MM-DD)
+
+        Returns:
+            list: Weather data for every location, in the same order
+
+        Raises:
+            ValueError: If a date is not YYYY-MM-DD, or the end date is before the start date
+        """
+        keys = [self.key(lat, lon) for lat, lon in locations]
+        first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        if last < first:
+            raise ValueError(f"the end date {end_date} is before the start date {start_date}")
+        days = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+        now = time.time()
+        with self._lock:
+            missing = {key: self._missing_days(key, days, now, self.ttl) for key in dict.fromkeys(keys)}
+        to_fetch = [key for key, missing_days in missing.items() if missing_days]
+        telemetry.count("forecast_cache", len(missing) - len(to_fetch), result="hit")
+        telemetry.count("forecast_cache", len(to_fetch), result="miss")
+
+        errors = {}
+        if to_fetch:
+            # one window that covers the missing days of every location
+            window_start = min(missing[key][0] for key in to_fetch)
+            window_end = max(missing[key][-1] for key in to_fetch)
+            try:
+                responses = self._fetch_coalesced(to_fetch, window_start, window_end)
+            except WeatherServiceError:
+                with self._lock:
+                    stale_missing = any(self._missing_days(key, days, now, self.stale_ttl) for key in to_fetch)
+                if stale_missing: # nothing (recent enough) to fall back on
+                    raise
+                telemetry.count("forecast_cache", len(to_fetch), result="stale_served")
+                responses = []
+            for key, data in zip(to_fetch, responses):
+                if "daily" in data:
+                    self._store(key, data, time.time())
+                else: # an error from the API is passed through as it is, and not cached
+                    errors[key] = data
+
+        results = {key: errors[key] if key in errors else self._assemble(key, days) for key in dict.fromkeys(keys)}
+        evicted = [key for key, data in results.items() if data is None]
+        if evicted: # other threads filled the cache in between; these are fetched once more, for exactly these days
+            results.update(zip(evicted, self._fetch_coalesced(evicted, start_date, end_date)))
+        return [results[key] for key in keys]
+
+
+forecast_cache = ForecastCache()
+
+
+@telemetry.traced()
 def fetch_weather(lat, lon, start_date, end_date): # The next step is to fetch the weather report
-    url = "https://api.open-meteo.com/v1/forecast" # this url is for the API, which provides weather forecast
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "start_date": start_date,
-        "end_date": end_date,
-        "daily": ["temperature_2m_max", "temperature_2m_min", "weathercode"],
-        "timezone": "auto"
-    }
+    return forecast_cache.get(lat, lon, start_date, end_date) # repeated and overlapping requests are served from the forecast cache
 
-    response = requests.get(url, params=params)
-    data = response.json()
 
-    return data  # this will returm the data for the particular coordiantes between the given start and end dates 
+@telemetry.traced()
+def fetch_weather_many(locations, start_date, end_date): # The same for a list of (lat, lon), in one request
+    return forecast_cache.get_many(locations, start_date, end_date)
 
 
 # The next to step is to create a text file which contains weather code with their respective description
@@ -50,11 +511,21 @@ def load_weather_codes(file_path): # this function is used to load the text file
                     print(f"Skipping invalid line: {line}")
     return codes
 
-# this will store the codes in the variable WEATHER_CODES
-WEATHER_CODES = load_weather_codes("weather.txt")
+# the code table is read the first time it is needed (not when the module is imported), from the file next to this module
+@lru_cache(maxsize=None)
+def get_weather_codes():
+    return load_weather_codes(data_path("weather.txt"))
+
 
+def __getattr__(name): # keeps "from weather import WEATHER_CODES" working, while still loading the table lazily
+    if name == "WEATHER_CODES":
+        return get_weather_codes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@telemetry.traced()
 def format_weather(data): # This function will return the weather forecast data
     daily_forecast = []
+    codes = get_weather_codes()
     times = data["daily"]["time"]
     max_temps = data["daily"]["temperature_2m_max"]
     min_temps = data["daily"]["temperature_2m_min"]
@@ -63,38 +534,134 @@ def format_weather(data): # This function will return the weather forecast data
     for i in range(len(times)):
         daily_forecast.append({
             "date": times[i],
-            "condition": WEATHER_CODES.get(weathercodes[i], "Unknown"), # here we will get the weather codes from the text file
+            "condition": codes.get(weathercodes[i], "Unknown"), # here we will get the weather codes from the text file
             "temp_range": f"{min_temps[i]}–{max_temps[i]} °C" # here we will return the temperature range
         })
 
     return daily_forecast
 
 
+def forecast_answer(data): # The formatted forecast, or a tool message for an error the API answered with
+    if "daily" not in data: # e.g. {"error": true, "reason": "..."} for dates past the forecast range
+        return {"message": data.get("reason", "The weather service could not give a forecast for these dates")}
+    return format_weather(data)
+
+
+def date_range_error(start_date, end_date): # This returns a tool message for dates we cannot ask the API for, or None
+    try:
+        first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return {"message": f"Dates must look like YYYY-MM-DD, not {start_date!r} and {end_date!r}"}
+    if last < first:
+        return {"message": f"The end date {end_date} is before the start date {start_date}"}
+    return None
+
 
 from langchain.tools import tool
 @tool # This is the lang chain framework to wrap the tool
+@telemetry.traced("weather_lookup_tool")
 def weather_lookup_tool(city: str, start_date: str, end_date: str):
     """
     Provides daily weather forecast for a city between given dates.
     """
 
-    
-    coords = get_city_coordinates(city)
-    if not coords:
-        return {"message": "City not found"}
+    error = date_range_error(start_date, end_date)
+    if error:
+        return error
+
+    try:
+        coords = get_city_coordinates(city)
+        if not coords:
+            return {"message": "City not found"}
 
-    lat, lon = coords
-    raw_data = fetch_weather(lat, lon, start_date, end_date)
-    formatted = format_weather(raw_data)
+        lat, lon = coords
+        raw_data = fetch_weather(lat, lon, start_date, end_date)
+    except WeatherServiceError:
+        return {"message": "Weather service is unavailable, please try again later"}
+    formatted = forecast_answer(raw_data)
 
     return formatted
 
 
-# This is to test the tool
-result = weather_lookup_tool.run({
-    "city": "Delhi",
-    "start_date": "2025-12-17",
-    "end_date": "2025-12-19"
-})
+# ----------------------------------
+# Weather for several cities at once
+# Geocoding runs concurrently (one request per city, most of them answered by the
+# geocoding cache), then all forecasts come from one batched forecast request.
+# ----------------------------------
+UNAVAILABLE_MESSAGE = {"message": "Weather service is unavailable, please try again later"}
+
+
+def _format_cities(cities, coords, start_date, end_date): # This fetches and formats the forecasts of the cities we could geocode
+    results = {}
+    found = []
+    for city, city_coords in zip(cities, coords):
+        if isinstance(city_coords, WeatherServiceError):
+            results[city] = UNAVAILABLE_MESSAGE
+        elif not city_coords:
+            results[city] = {"message": "City not found"}
+        else:
+            found.append((city, city_coords))
+
+    if found:
+        try:
+            raw = fetch_weather_many([city_coords for _, city_coords in found], start_date, end_date)
+        except WeatherServiceError:
+            raw = [None] * len(found)
+        for (city, _), data in zip(found, raw):
+            results[city] = UNAVAILABLE_MESSAGE if data is None else forecast_answer(data)
+
+    return {city: results[city] for city in cities} # same order as the request
+
+
+def _geocode_or_error(city):
+    try:
+        return get_city_coordinates(city)
+    except WeatherServiceError as error:
+        return error
+
+
+@telemetry.traced()
+def lookup_weather_for_cities(cities: list[str], start_date: str, end_date: str):
+    """
+    Provides daily weather forecasts for several cities between given dates, with one forecast request.
+    """
+    cities = list(dict.fromkeys(cities)) # duplicates would only cost extra work
+    error = date_range_error(start_date, end_date)
+    if error:
+        return {city: error for city in cities}
+    coords = [_geocode_or_error(city) for city in cities]
+    return _format_cities(cities, coords, start_date, end_date)
+
+
+@telemetry.traced("lookup_weather_for_cities")
+async def alookup_weather_for_cities(cities: list[str], start_date: str, end_date: str):
+    """
+    Provides daily weather forecasts for several cities between given dates, geocoding them concurrently.
+    """
+    cities = list(dict.fromkeys(cities))
+    error = date_range_error(start_date, end_date)
+    if error:
+        return {city: error for city in cities}
+    coords = await asyncio.gather(*(asyncio.to_thread(_geocode_or_error, city) for city in cities))
+    return await asyncio.to_thread(_format_cities, cities, coords, start_date, end_date)
+
+
+from langchain_core.tools import StructuredTool
+# This tool has a normal and an async version, so an async agent (ainvoke) does not block its event loop
+multi_city_weather_tool = StructuredTool.from_function(
+    func=lookup_weather_for_cities,
+    coroutine=alookup_weather_for_cities,
+    name="multi_city_weather_tool",
+    description="Provides daily weather forecasts for a list of cities between given dates, keyed by city."
+)
+
+
+if __name__ == "__main__":
+    # This is to test the tool
+    result = weather_lookup_tool.run({
+        "city": "Delhi",
+        "start_date": "2025-12-17",
+        "end_date": "2025-12-19"
+    })
 
-print(result)
\ No newline at end of file
+    print(result)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# ----------------------------------
+# Local stub of the Open-Meteo geocoding and forecast APIs
+# Answers are deterministic, so the weather module can be tested (and benchmarked)
+# without network access. Point weather.py at it with:
+#   OPEN_METEO_GEOCODING_URL=<stub url>/v1/search
+#   OPEN_METEO_FORECAST_URL=<stub url>/v1/forecast
+# ----------------------------------
+
+KNOWN_CITIES = {
+    "delhi": (28.65195, 77.23149),
+    "mumbai": (19.07283, 72.88261),
+    "goa": (15.50000, 74.00000),
+    "bangalore": (12.97194, 77.59369),
+    "chennai": (13.08784, 80.27847),
+    "hyderabad": (17.38405, 78.45636),
+    "kolkata": (22.56263, 88.36304),
+    "jaipur": (26.91962, 75.78781)
+}
+
+
+def _number(*parts): # A stable pseudo random number in [0, 1) for the given values
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def stub_coordinates(city): # Known cities get their real coordinates, any other name a made up but stable one
+    key = city.strip().lower()
+    if key in KNOWN_CITIES:
+        return KNOWN_CITIES[key]
+    return round(-60 + 120 * _number(key, "lat"), 5), round(-180 + 360 * _number(key, "lon"), 5)
+
+
+def stub_forecast(lat, lon, start_date, end_date): # A forecast in the shape of the Open-Meteo answer
+    first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    days = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+    low = [round(10 + 15 * _number(lat, lon, day, "min"), 1) for day in days]
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": "GMT",
+        "daily_units": {"time": "iso8601", "temperature_2m_max": "°C", "temperature_2m_min": "°C", "weathercode": "wmo code"},
+        "daily": {
+            "time": days,
+            "temperature_2m_max": [round(t + 5 + 10 * _number(lat, lon, day, "max"), 1) for t, day in zip(low, days)],
+            "temperature_2m_min": low,
+            "weathercode": [(0, 1, 2, 3, 45, 61, 80, 95)[int(8 * _number(lat, lon, day, "code"))] for day in days]
+        }
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            fail = server.fail_requests > 0
+            if fail:
+                server.fail_requests -= 1
+            garble = not fail and server.invalid_json_requests > 0
+            if garble:
+                server.invalid_json_requests -= 1
+        if server.delay:
+            time.sleep(server.delay)
+        if fail:
+            return self._send(503, {"error": True, "reason": "stub failure"})
+        if garble: # like a proxy's error page
+            return self._send(200, "<html>Bad Gateway</html>", raw=True)
+
+        url = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/v1/search":
+            return self._search(query)
+        if url.path == "/v1/forecast":
+            return self._forecast(query)
+        return self._send(404, {"error": True, "reason": "not found"})
+
+    def _search(self, query):
+        name = query.get("name", "")
+        if not name or name.strip().lower() in self.server.unknown_cities:
+            return self._send(200, {"generationtime_ms": 0.1})
+        latitude, longitude = stub_coordinates(name)
+        return self._send(200, {"results": [{"name": name, "latitude": latitude, "longitude": longitude}]})
+
+    def _forecast(self, query):
+        try:
+            # like the real API, comma separated lists give one forecast per location, returned as a list
+            latitudes = [float(value) for value in query["latitude"].split(",")]
+            longitudes = [float(value) for value in query["longitude"].split(",")]
+            if len(latitudes) != len(longitudes):
+                raise ValueError("latitude and longitude lists differ in length")
+            data = [
+                stub_forecast(lat, lon, query["start_date"], query["end_date"])
+                for lat, lon in zip(latitudes, longitudes)
+            ]
+        except (KeyError, ValueError) as error:
+            return self._send(400, {"error": True, "reason": f"invalid request: {error}"})
+        return self._send(200, data if len(data) > 1 else data[0])
+
+    def _send(self, status, body, raw=False):
+        payload = body.encode() if raw else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html" if raw else "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args): # keep the test and benchmark output quiet
+        pass
+
+
+class StubWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.fail_requests = 0 # the next N requests answer with 503
+        self.invalid_json_requests = 0 # the next N requests answer with a body that is not JSON
+        self.delay = 0 # seconds to wait before every answer
+        self.unknown_cities = {"atlantis"} # names the geocoder does not find
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def geocoding_url(self):
+        return self.url + "/v1/search"
+
+    @property
+    def forecast_url(self):
+        return self.url + "/v1/forecast"
+
+    def start(self): # This serves requests on a background thread
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_stub_server(host="127.0.0.1", port=0): # This starts a stub server on a free port and returns it
+    return StubWeatherServer(host, port).start()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = StubWeatherServer(port=port)
+    print(f"OPEN_METEO_GEOCODING_URL={server.geocoding_url}")
+    print(f"OPEN_METEO_FORECAST_URL={server.forecast_url}")
+    server.serve_forever()